@@ -1,12 +1,15 @@
+import time
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 # --- IMPORTAMOS TU LÓGICA EXISTENTE ---
 # Asegúrate de que tu archivo original se llame 'mauricia_v3.py'
 # y que 'obtener_respuesta_agente' esté disponible.
-from mauricia_v3 import obtener_respuesta_agente, SESSION_ID
+from mauricia_v3 import aobtener_respuesta_agente, astream_respuesta_agente, estadisticas_cache, SESSION_ID
+from tiempos_etapas import cabecera_server_timing, iniciar
+from eventos_sse import respuesta_sse
 
 # 1. Crear la APP
 app = FastAPI(title="API MauricIA USACH", version="3.0")
@@ -19,8 +22,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# 2b. Tiempos por etapa (embedding, búsqueda, LLM...) en la cabecera Server-Timing
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    etapas = iniciar()
+    inicio = time.perf_counter()
+    respuesta = await call_next(request)
+    # En /chat/stream las cabeceras salen antes que los tokens: ahí solo vale el total hasta el primer byte
+    respuesta.headers["Server-Timing"] = cabecera_server_timing(etapas, (time.perf_counter() - inicio) * 1000)
+    return respuesta
+
 # 3. Modelo de datos (Qué esperamos recibir del usuario)
 class ConsultaUsuario(BaseModel):
     mensaje: str
@@ -31,17 +45,23 @@ class ConsultaUsuario(BaseModel):
 def home():
     return {"status": "online", "bot": "MauricIA v3"}
 
+# 4b. ENDPOINT: Métricas de caché (para monitoreo)
+@app.get("/metricas")
+def metricas():
+    return estadisticas_cache()
+
 # 5. ENDPOINT: Chat (El corazón del sistema)
 @app.post("/chat")
-def chat_endpoint(consulta: ConsultaUsuario):
+async def chat_endpoint(consulta: ConsultaUsuario):
     """
     Recibe el mensaje del frontend, lo pasa a MauricIA, y devuelve la respuesta.
+    Es async: mientras esperamos a OpenAI el worker sigue atendiendo otras consultas.
     """
     try:
         print(f"📩 Recibido: {consulta.mensaje}")
         
         # Llamamos a tu función maestra (la que ya tienes programada)
-        respuesta = obtener_respuesta_agente(consulta.mensaje)
+        respuesta = await aobtener_respuesta_agente(consulta.mensaje, consulta.session_id)
         
         return {"respuesta": respuesta}
     
@@ -49,7 +69,17 @@ def chat_endpoint(consulta: ConsultaUsuario):
         print(f"❌ Error API: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# 6. Arrancar el servidor automáticamente si ejecutas este archivo
+# 6. ENDPOINT: Chat en streaming (Server-Sent Events)
+@app.post("/chat/stream")
+async def chat_stream_endpoint(consulta: ConsultaUsuario):
+    """
+    Igual que /chat, pero devuelve los tokens a medida que el LLM los genera.
+    Cada evento trae {"token": "..."}; al final se envía 'event: fin'.
+    """
+    print(f"📩 Recibido (stream): {consulta.mensaje}")
+    return respuesta_sse(astream_respuesta_agente(consulta.mensaje, consulta.session_id))
+
+# 7. Arrancar el servidor automáticamente si ejecutas este archivo
 if __name__ == "__main__":
     print("🚀 Iniciando Servidor API MauricIA...")
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -8,7 +8,8 @@ from pydantic import BaseModel
 # y que 'obtener_respuesta_agente' esté disponible.
 
 # from mauricia_v4_local import obtener_respuesta_agente, SESSION_ID
-from mauricia_local_v4 import obtener_respuesta_agente, SESSION_ID
+from mauricia_local_v4 import obtener_respuesta_agente, astream_respuesta_agente, SESSION_ID
+from eventos_sse import respuesta_sse
 
 # 1. Crear la APP
 app = FastAPI(title="API MauricIA USACH", version="3.0")
@@ -43,7 +44,7 @@ def chat_endpoint(consulta: ConsultaUsuario):
         print(f"📩 Recibido: {consulta.mensaje}")
         
         # Llamamos a tu función maestra (la que ya tienes programada)
-        respuesta = obtener_respuesta_agente(consulta.mensaje)
+        respuesta = obtener_respuesta_agente(consulta.mensaje, consulta.session_id)
         
         return {"respuesta": respuesta}
     
@@ -51,7 +52,17 @@ def chat_endpoint(consulta: ConsultaUsuario):
         print(f"❌ Error API: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# 6. Arrancar el servidor automáticamente si ejecutas este archivo
+# 6. ENDPOINT: Chat en streaming (Server-Sent Events)
+@app.post("/chat/stream")
+async def chat_stream_endpoint(consulta: ConsultaUsuario):
+    """
+    Igual que /chat, pero devuelve los tokens a medida que el LLM los genera.
+    Cada evento trae {"token": "..."}; al final se envía 'event: fin'.
+    """
+    print(f"📩 Recibido (stream): {consulta.mensaje}")
+    return respuesta_sse(astream_respuesta_agente(consulta.mensaje, consulta.session_id))
+
+# 7. Arrancar el servidor automáticamente si ejecutas este archivo
 if __name__ == "__main__":
     print("🚀 Iniciando Servidor API MauricIA...")
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,167 @@
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import xxhash
+from langchain_core.embeddings import Embeddings
+
+# =============================================================================
+# CACHÉ PERSISTENTE DE EMBEDDINGS (LRU EN RAM + SQLITE EN DISCO)
+# =============================================================================
+# Cada similarity_search embebe la query con un viaje de red a
+# text-embedding-3-small, aunque sea la misma pregunta de hace cinco minutos
+# (o la misma expansión " arancel matrícula costo valor" de es_consulta_dinero).
+# Este envoltorio responde desde RAM, luego desde disco, y solo en último caso
+# llama al modelo. El disco sobrevive a los reinicios del pod.
+#
+# solo_lectura=True (MAURICIA_MODO_LLM=reproducir): el disco hace de grabación
+# de los embeddings y no se toca; lo que no está grabado lo responde `base`
+# (el sustituto determinista de llm_grabado.py) y queda solo en RAM.
+
+
+def clave_embedding(modelo: str, texto: str) -> str:
+    return xxhash.xxh3_128_hexdigest(f"{modelo}\x00{texto}".encode("utf-8"))
+
+
+class EmbeddingsConCache(Embeddings):
+    """Envuelve cualquier Embeddings de LangChain (OpenAI, HuggingFace...) con caché en dos niveles."""
+
+    def __init__(self, base: Embeddings, modelo: str, ruta_db: str = "cache_embeddings.sqlite3",
+                 max_memoria: int = 2048, solo_lectura: bool = False):
+        self.base = base
+        self.modelo = modelo
+        self.max_memoria = max_memoria
+        self.solo_lectura = solo_lectura
+        self._memoria = OrderedDict()  # clave -> list[float]
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(ruta_db, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (clave TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+    # --- Niveles de caché -----------------------------------------------------
+    def _recordar(self, clave: str, vector: list) -> None:
+        self._memoria[clave] = vector
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _desde_memoria(self, clave: str):
+        """Solo RAM (sin tocar SQLite): seguro de llamar desde el event loop."""
+        with self._lock:
+            if clave not in self._memoria:
+                return None
+            self._memoria.move_to_end(clave)
+            self.aciertos_memoria += 1
+            return list(self._memoria[clave])
+
+    def _buscar(self, claves: list) -> dict:
+        """Devuelve {clave: vector} para las claves que ya estaban en RAM o disco."""
+        encontrados = {}
+        with self._lock:
+            faltantes = []
+            for clave in claves:
+                if clave in self._memoria:
+                    self._memoria.move_to_end(clave)
+                    encontrados[clave] = self._memoria[clave]
+                    self.aciertos_memoria += 1
+                else:
+                    faltantes.append(clave)
+
+            for i in range(0, len(faltantes), 500):  # Límite de parámetros de SQLite
+                lote = faltantes[i:i + 500]
+                filas = self._conn.execute(
+                    f"SELECT clave, vector FROM embeddings WHERE clave IN ({','.join('?' * len(lote))})",
+                    lote,
+                ).fetchall()
+                for clave, blob in filas:
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    encontrados[clave] = vector
+                    self._recordar(clave, vector)
+                    self.aciertos_disco += 1
+            self.fallos += len(set(claves) - set(encontrados))
+        return encontrados
+
+    def _guardar(self, nuevos: dict) -> None:
+        if not nuevos:
+            return
+        with self._lock:
+            if not self.solo_lectura:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (clave, vector) VALUES (?, ?)",
+                    [(c, np.asarray(v, dtype=np.float32).tobytes()) for c, v in nuevos.items()],
+                )
+                self._conn.commit()
+            for clave, vector in nuevos.items():
+                self._recordar(clave, list(vector))
+
+    def _pendientes(self, textos: list):
+        claves = [clave_embedding(self.modelo, t) for t in textos]
+        encontrados = self._buscar(claves)
+        # Textos únicos que hay que pedirle al modelo (sin repetir duplicados)
+        pendientes = list(dict.fromkeys(
+            (c, t) for c, t in zip(claves, textos) if c not in encontrados
+        ))
+        return claves, encontrados, pendientes
+
+    # --- Interfaz Embeddings --------------------------------------------------
+    def embed_documents(self, texts: list) -> list:
+        claves, encontrados, pendientes = self._pendientes(texts)
+        if pendientes:
+            vectores = self.base.embed_documents([t for _, t in pendientes])
+            nuevos = {c: v for (c, _), v in zip(pendientes, vectores)}
+            self._guardar(nuevos)
+            encontrados.update(nuevos)
+        return [list(encontrados[c]) for c in claves]
+
+    def embed_query(self, text: str) -> list:
+        clave = clave_embedding(self.modelo, text)
+        encontrado = self._buscar([clave])
+        if clave in encontrado:
+            return list(encontrado[clave])
+        vector = self.base.embed_query(text)
+        self._guardar({clave: vector})
+        return vector
+
+    # Versiones async: SQLite bloquea, así que el disco se lee y escribe en un
+    # hilo (asyncio.to_thread) y el event loop sigue atendiendo otras consultas
+    async def aembed_documents(self, texts: list) -> list:
+        claves, encontrados, pendientes = await asyncio.to_thread(self._pendientes, texts)
+        if pendientes:
+            vectores = await self.base.aembed_documents([t for _, t in pendientes])
+            nuevos = {c: v for (c, _), v in zip(pendientes, vectores)}
+            await asyncio.to_thread(self._guardar, nuevos)
+            encontrados.update(nuevos)
+        return [list(encontrados[c]) for c in claves]
+
+    async def aembed_query(self, text: str) -> list:
+        clave = clave_embedding(self.modelo, text)
+        vector = self._desde_memoria(clave)  # Acierto en RAM: sin saltar a un hilo
+        if vector is not None:
+            return vector
+        encontrado = await asyncio.to_thread(self._buscar, [clave])
+        if clave in encontrado:
+            return list(encontrado[clave])
+        vector = await self.base.aembed_query(text)
+        await asyncio.to_thread(self._guardar, {clave: vector})
+        return vector
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            total = self.aciertos_memoria + self.aciertos_disco + self.fallos
+            return {
+                "en_memoria": len(self._memoria),
+                "aciertos_memoria": self.aciertos_memoria,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "tasa_aciertos": round((total - self.fallos) / total, 4) if total else 0.0,
+            }
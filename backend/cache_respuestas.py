@@ -0,0 +1,217 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import xxhash
+
+from programas import sin_tildes
+from versiones_indice import version_activa
+
+# =============================================================================
+# CACHÉ DE RESPUESTAS (PREGUNTA NORMALIZADA + CHUNKS RECUPERADOS + VERSIÓN DEL CORPUS)
+# =============================================================================
+# La mayor parte del tráfico son las mismas decenas de preguntas (arancel,
+# matrícula, requisitos, correo). Si la pregunta normalizada, los chunks que
+# devolvió la búsqueda y el corpus son los mismos, el LLM respondería lo mismo:
+# nos saltamos esa llamada.
+
+
+def normalizar_pregunta(texto: str) -> str:
+    """Minúsculas, sin tildes, sin puntuación y con espacios colapsados."""
+    texto = sin_tildes(texto).lower()
+    texto = re.sub(r"[^\w\s]", " ", texto)
+    return " ".join(texto.split())
+
+
+def version_corpus(carpeta_db: str) -> str:
+    """
+    Versión del índice para invalidar la caché: el nombre publicado en el puntero
+    (ver versiones_indice.py) o, en carpetas antiguas, una huella barata (un stat).
+    """
+    nombre = version_activa(carpeta_db)
+    if nombre:
+        return nombre
+    ruta = os.path.join(carpeta_db, "chroma.sqlite3")
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return ""
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def ids_documentos(docs) -> tuple:
+    return tuple(
+        getattr(d, "id", None) or xxhash.xxh3_64_hexdigest(d.page_content.encode("utf-8")) for d in docs
+    )
+
+
+class CacheRespuestas:
+    """Caché LRU + TTL, con contadores de aciertos para monitoreo."""
+
+    def __init__(self, max_entradas: int = 500, ttl_segundos: float = 6 * 3600):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._entradas = OrderedDict()  # clave -> (instante, respuesta)
+        self._version = None
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    @staticmethod
+    def clave(pregunta: str, docs) -> tuple:
+        return (normalizar_pregunta(pregunta), ids_documentos(docs))
+
+    def _verificar_version(self, version: str) -> None:
+        if version != self._version:
+            if self._entradas:
+                self.invalidaciones += 1
+            self._entradas.clear()
+            self._version = version
+
+    def obtener(self, clave: tuple, version: str):
+        ahora = time.monotonic()
+        with self._lock:
+            self._verificar_version(version)
+            entrada = self._entradas.get(clave)
+            if entrada is None or ahora - entrada[0] > self.ttl_segundos:
+                if entrada is not None:
+                    del self._entradas[clave]
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave: tuple, version: str, respuesta: str) -> None:
+        with self._lock:
+            self._verificar_version(version)
+            self._entradas[clave] = (time.monotonic(), respuesta)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / total, 4) if total else 0.0,
+                "invalidaciones": self.invalidaciones,
+                "version_corpus": self._version,
+            }
+
+
+# =============================================================================
+# CACHÉ SEMÁNTICA (PARÁFRASIS POR SIMILITUD COSENO DEL EMBEDDING DE LA PREGUNTA)
+# =============================================================================
+# "cuánto cuesta el doctorado" y "valor del doctorado en informática" no calzan
+# en la caché exacta, pero sus embeddings son casi iguales. Guardamos los
+# embeddings de las preguntas ya respondidas en una matriz NumPy contigua y
+# buscamos con un solo producto matriz-vector.
+
+
+class CacheSemantica:
+    """
+    Caché por similitud coseno, con umbral por intención: las preguntas de dinero
+    exigen un calce más estricto porque un monto equivocado es peor que no responder.
+    """
+
+    def __init__(self, max_entradas: int = 256, umbral: float = 0.92,
+                 umbrales_por_intencion: dict = None, ttl_segundos: float = 6 * 3600):
+        self.max_entradas = max_entradas
+        self.umbral = umbral
+        self.umbrales_por_intencion = dict(umbrales_por_intencion or {})
+        self.ttl_segundos = ttl_segundos
+        self._matriz = None                        # (max_entradas, dim) float32, filas normalizadas
+        self._ocupadas = np.zeros(max_entradas, dtype=bool)
+        self._ultimo_uso = np.zeros(max_entradas, dtype=np.float64)
+        self._creada = np.zeros(max_entradas, dtype=np.float64)
+        self._intenciones = np.empty(max_entradas, dtype=object)
+        self._grupos = np.empty(max_entradas, dtype=object)
+        self._respuestas = [None] * max_entradas
+        self._version = None
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    @staticmethod
+    def _normalizar(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norma = np.linalg.norm(v)
+        return v / norma if norma > 0 else v
+
+    def _verificar_version(self, version: str) -> None:
+        if version != self._version:
+            if self._ocupadas.any():
+                self.invalidaciones += 1
+            self._ocupadas[:] = False
+            self._respuestas = [None] * self.max_entradas
+            self._version = version
+
+    def buscar(self, vector, intencion: str, version: str, grupo: str = ""):
+        q = self._normalizar(vector)
+        ahora = time.monotonic()
+        with self._lock:
+            self._verificar_version(version)
+            if self._matriz is None or not self._ocupadas.any():
+                self.fallos += 1
+                return None
+
+            # Las filas vencidas, vacías, de otra intención o de otro grupo (programa) no compiten
+            validas = self._ocupadas & (ahora - self._creada <= self.ttl_segundos)
+            validas &= (self._intenciones == intencion) & (self._grupos == grupo)
+            similitudes = self._matriz @ q
+            similitudes[~validas] = -1.0
+
+            idx = int(np.argmax(similitudes))
+            umbral = self.umbrales_por_intencion.get(intencion, self.umbral)
+            if similitudes[idx] < umbral:
+                self.fallos += 1
+                return None
+
+            self._ultimo_uso[idx] = ahora
+            self.aciertos += 1
+            return self._respuestas[idx]
+
+    def guardar(self, vector, intencion: str, version: str, respuesta: str, grupo: str = "") -> None:
+        q = self._normalizar(vector)
+        ahora = time.monotonic()
+        with self._lock:
+            self._verificar_version(version)
+            if self._matriz is None:
+                self._matriz = np.zeros((self.max_entradas, q.shape[0]), dtype=np.float32)
+
+            libres = np.flatnonzero(~self._ocupadas)
+            # Si no hay espacio, reemplazamos la entrada usada hace más tiempo (LRU)
+            idx = int(libres[0]) if libres.size else int(np.argmin(self._ultimo_uso))
+
+            self._matriz[idx] = q
+            self._ocupadas[idx] = True
+            self._ultimo_uso[idx] = ahora
+            self._creada[idx] = ahora
+            self._intenciones[idx] = intencion
+            self._grupos[idx] = grupo
+            self._respuestas[idx] = respuesta
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "entradas": int(self._ocupadas.sum()),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / total, 4) if total else 0.0,
+                "invalidaciones": self.invalidaciones,
+            }
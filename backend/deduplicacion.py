@@ -0,0 +1,181 @@
+import re
+
+import numpy as np
+import xxhash
+
+from programas import sin_tildes
+
+# =============================================================================
+# DEDUPLICACIÓN: CHUNKS CASI IDÉNTICOS (INGESTA) Y CONTEXTO SIN REPETICIONES
+# =============================================================================
+# Con chunk_overlap=400 sobre chunks de 1500 caracteres, y páginas del crawler
+# que repiten el mismo header, footer y bloque de contacto, el top-k traía el
+# mismo texto varias veces: se gastaba MAX_CONTEXT_CHARS y tokens del LLM.
+#
+# - Al ingerir: SimHash de 64 bits sobre shingles de palabras; un chunk cuya
+#   huella está a <= UMBRAL_HAMMING bits de otra ya vista se descarta.
+# - Al responder: ensamblar_contexto une chunks contiguos del mismo documento
+#   (usando start_index) y omite las líneas que ya aparecieron.
+
+BITS_SIMHASH = 64
+TAM_SHINGLE = 3
+UMBRAL_HAMMING = 3
+BANDAS = 4  # 4 bandas de 16 bits: dos huellas a <= 3 bits coinciden en al menos una
+MIN_CHARS_LINEA_REPETIDA = 20  # Líneas más cortas ("---", "Correo:") no se deduplican
+MAX_HUECO_UNION = 5  # El splitter recorta espacios en los bordes: chunks "pegados" quedan a 1-3 chars
+
+_re_palabra = re.compile(r"\w+")
+_re_numero = re.compile(r"\d[\d.,]*")
+
+
+def _normalizar(texto: str) -> str:
+    return " ".join(sin_tildes(texto).lower().split())
+
+
+def simhash(texto: str) -> int:
+    palabras = _re_palabra.findall(_normalizar(texto))
+    if len(palabras) < TAM_SHINGLE:
+        shingles = [" ".join(palabras)]
+    else:
+        shingles = [" ".join(palabras[i:i + TAM_SHINGLE]) for i in range(len(palabras) - TAM_SHINGLE + 1)]
+
+    hashes = np.fromiter(
+        (xxhash.xxh3_64_intdigest(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    # Cada shingle vota por bit (+1 si está en 1, -1 si está en 0); el bit final es el signo
+    bits = np.unpackbits(hashes.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votos = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return sum(1 << int(bit) for bit in np.flatnonzero(votos > 0))
+
+
+def distancia_hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def firma_numerica(texto: str) -> int:
+    """Huella de los números del texto: dos chunks con distinto monto nunca son duplicados."""
+    numeros = sorted(set(re.sub(r"[.,]", "", n) for n in _re_numero.findall(texto)))
+    return xxhash.xxh3_64_intdigest(" ".join(numeros).encode("utf-8"))
+
+
+class DeduplicadorCercano:
+    """
+    Detecta chunks casi idénticos a uno ya visto. Solo compara dentro del mismo
+    programa y con los mismos números: "arancel del doctorado $X" y "arancel del
+    magíster $Y" se parecen mucho en palabras, pero no son el mismo dato.
+    """
+
+    def __init__(self, umbral_hamming: int = UMBRAL_HAMMING):
+        self.umbral_hamming = umbral_hamming
+        self._bandas = {}  # (grupo, banda, valor) -> [(huella, origen)]
+        self.descartados = 0
+
+    def _claves(self, texto: str, grupo: str):
+        grupo = f"{grupo}|{firma_numerica(texto)}"
+        huella = simhash(texto)
+        ancho = BITS_SIMHASH // BANDAS
+        return huella, [(grupo, b, (huella >> (b * ancho)) & ((1 << ancho) - 1)) for b in range(BANDAS)]
+
+    def registrar(self, texto: str, grupo: str = "", origen: str = "") -> None:
+        """Registra un chunk que ya está en el índice (no cuenta como descartado)."""
+        huella, claves = self._claves(texto, grupo)
+        for clave in claves:
+            self._bandas.setdefault(clave, []).append((huella, origen))
+
+    def original(self, texto: str, grupo: str = "", origen: str = ""):
+        """
+        Registra el texto si es nuevo y devuelve None; si ya había uno casi igual,
+        devuelve el origen (archivo fuente) de ese primero.
+        """
+        huella, claves = self._claves(texto, grupo)
+        for clave in claves:
+            for otra, origen_otra in self._bandas.get(clave, ()):
+                if distancia_hamming(huella, otra) <= self.umbral_hamming:
+                    self.descartados += 1
+                    return origen_otra
+        for clave in claves:
+            self._bandas.setdefault(clave, []).append((huella, origen))
+        return None
+
+    def es_duplicado(self, texto: str, grupo: str = "") -> bool:
+        """Registra el texto si es nuevo; devuelve True si ya había uno casi igual."""
+        return self.original(texto, grupo) is not None
+
+
+def sin_duplicados(chunks, deduplicador: DeduplicadorCercano, al_descartar=None):
+    """
+    Etapa de ingesta: deja pasar solo los chunks que no son casi-duplicados.
+    `al_descartar(fuente, original)` recibe la fuente del chunk descartado y la del que se quedó.
+    """
+    for chunk in chunks:
+        fuente = chunk.metadata.get("source", "")
+        original = deduplicador.original(chunk.page_content, chunk.metadata.get("programa", ""), fuente)
+        if original is None:
+            yield chunk
+        elif al_descartar is not None:
+            al_descartar(fuente, original)
+
+
+# --- Ensamblado del contexto (tiempo de respuesta) -----------------------------
+def _origen(doc):
+    """Chunks con el mismo origen comparten el texto base sobre el que se mide start_index."""
+    return (doc.metadata.get("source"), doc.metadata.get("page"))
+
+
+def unir_contiguos(docs) -> list:
+    """
+    Une chunks del mismo documento cuyos rangos se solapan o se tocan. El
+    resultado conserva el orden de relevancia (cada grupo va donde estaba su
+    mejor chunk). Devuelve una lista de textos.
+    """
+    grupos = {}  # origen -> [(inicio, texto, rango)]
+    orden = []
+    for rango, doc in enumerate(docs):
+        inicio = doc.metadata.get("start_index")
+        if inicio is None or doc.metadata.get("source") is None:
+            orden.append((rango, doc.page_content))
+            continue
+        grupos.setdefault(_origen(doc), []).append((int(inicio), doc.page_content, rango))
+
+    for piezas in grupos.values():
+        piezas.sort()
+        inicio, texto, mejor = piezas[0]
+        for sig_inicio, sig_texto, sig_rango in piezas[1:]:
+            fin = inicio + len(texto)
+            if sig_inicio <= fin:
+                texto += sig_texto[fin - sig_inicio:]  # Solo lo que no estaba ya
+                mejor = min(mejor, sig_rango)
+            elif sig_inicio - fin <= MAX_HUECO_UNION:
+                texto += "\n" + sig_texto
+                inicio = sig_inicio - len(texto) + len(sig_texto)  # Mantiene inicio + len(texto) = fin real
+                mejor = min(mejor, sig_rango)
+            else:
+                orden.append((mejor, texto))
+                inicio, texto, mejor = sig_inicio, sig_texto, sig_rango
+        orden.append((mejor, texto))
+
+    return [texto for _, texto in sorted(orden, key=lambda x: x[0])]
+
+
+def quitar_lineas_repetidas(textos: list) -> list:
+    vistas = set()
+    resultado = []
+    for texto in textos:
+        lineas = []
+        for linea in texto.split("\n"):
+            clave = _normalizar(linea)
+            if len(clave) >= MIN_CHARS_LINEA_REPETIDA:
+                if clave in vistas:
+                    continue
+                vistas.add(clave)
+            lineas.append(linea)
+        limpio = re.sub(r"\n{3,}", "\n\n", "\n".join(lineas)).strip()
+        if limpio:
+            resultado.append(limpio)
+    return resultado
+
+
+def ensamblar_contexto(docs, max_chars: int) -> str:
+    """Reemplaza el "\\n\\n".join(...) de los chunks: sin solapes ni bloques repetidos."""
+    contexto = "\n\n".join(quitar_lineas_repetidas(unir_contiguos(docs)))
+    return contexto[:max_chars]
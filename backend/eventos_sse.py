@@ -0,0 +1,33 @@
+import json
+
+from fastapi.responses import StreamingResponse
+
+# =============================================================================
+# RESPUESTA EN STREAMING (SERVER-SENT EVENTS)
+# =============================================================================
+# /chat/stream de api.py (nube) y de api_local.py (Ollama) hablan el mismo
+# protocolo con el frontend:
+#
+#   data: {"token": "..."}      uno por token, a medida que llegan
+#   event: fin                  la respuesta terminó
+#   event: error                falló a mitad de camino (data: {"detail": ...})
+
+
+async def eventos(tokens):
+    """Convierte el generador async de tokens del agente en eventos SSE."""
+    try:
+        async for token in tokens:
+            yield f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n"
+        yield "event: fin\ndata: {}\n\n"
+    except Exception as e:
+        print(f"❌ Error API (stream): {e}")
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False)}\n\n"
+
+
+def respuesta_sse(tokens) -> StreamingResponse:
+    # Sin caché ni buffer del proxy (nginx): cada token sale apenas se genera
+    return StreamingResponse(
+        eventos(tokens),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,292 @@
+import os
+import re
+import sqlite3
+import threading
+from typing import NamedTuple
+
+from programas import PROGRAMA_GENERAL, sin_tildes
+
+# =============================================================================
+# HECHOS ESTRUCTURADOS: ARANCEL, MATRÍCULA, DURACIÓN Y CONTACTOS
+# =============================================================================
+# "¿Cuál es el arancel del doctorado?" es la consulta más frecuente y la más
+# lenta: embedding + búsqueda con k alto + LLM leyendo diez chunks para copiar
+# un monto que está en una línea de la ficha del programa.
+#
+# Al ingerir, las fichas del crawler (#### ARANCEL / #### DURACIÓN / ...) se
+# convierten en hechos (programa, campo, valor, url) en un SQLite que vive junto
+# a la colección de cada versión del índice. Al responder, si la pregunta pide
+# solo un dato puntual de un programa conocido y el hecho es inequívoco, se
+# contesta con una plantilla: sin búsqueda ni LLM. Cualquier duda -> RAG normal.
+
+ARCHIVO_HECHOS = "hechos.sqlite3"
+MAX_PALABRAS_PREGUNTA = 14  # Preguntas más largas suelen pedir algo más que el dato
+
+# Encabezado de la ficha (sin tildes, minúsculas, empieza con...) -> campo
+ENCABEZADOS_CAMPO = {
+    "arancel": "arancel",
+    "matricula": "matricula",
+    "duracion": "duracion",
+    "director": "director",
+    "contacto": "contacto",
+    "telefono": "telefono",
+}
+
+ETIQUETAS_CAMPO = {
+    "matricula": "💰 Matrícula",
+    "arancel": "💰 Arancel",
+    "duracion": "⏳ Duración",
+    "director": "👤 Director/a",
+    "contacto": "📧 Contacto",
+    "telefono": "📞 Teléfono",
+}
+
+# Qué campos pide cada palabra de la pregunta (texto sin tildes, minúsculas)
+PREGUNTAS_CAMPO = {
+    ("arancel", "colegiatura"): ("arancel",),
+    ("matricula",): ("matricula",),
+    ("cuesta", "sale", "vale", "cobran", "precio", "costo", "valor"): ("matricula", "arancel"),
+    ("duracion", "dura", "semestres", "anos"): ("duracion",),
+    ("director", "directora", "dirige"): ("director",),
+    ("contacto", "correo", "email", "mail"): ("contacto", "telefono"),
+    ("telefono", "fono"): ("telefono",),
+}
+# La pregunta tiene que pedir el valor en sí: "¿cuál es el arancel...?", "¿cuánto
+# cuesta...?", "¿cuánto dura...?" o directamente "arancel del doctorado".
+_re_pide_valor = re.compile(
+    r"^(?:y |hola |oye )?(?:me (?:puedes|podrias) (?:decir|dar) |quisiera saber |necesito saber |sabes )?"
+    r"(?:cual(?:es)? (?:es|son|seria)|cuanto (?:cuesta|sale|vale|es|cobran|dura)|cuantos (?:semestres|anos) dura"
+    r"|cuanto tiempo dura|que (?:duracion|precio|costo|valor) tiene|quien (?:es|dirige)"
+    r"|(?:el |la )?(?:arancel|colegiatura|matricula|duracion|precio|costo|valor|director|directora|contacto"
+    r"|correo|email|mail|telefono|fono)\b)"
+)
+# Y no puede traer nada más que eso: cualquier palabra fuera de esta lista ("tesis",
+# "tengo", "cuando"...) significa que pregunta otra cosa -> RAG
+PALABRAS_PERMITIDAS = {
+    # Formas de preguntar
+    "y", "hola", "oye", "me", "puedes", "podrias", "decir", "dar", "quisiera", "saber", "necesito", "sabes",
+    "cual", "cuales", "es", "son", "seria", "cuanto", "cuantos", "tiempo", "que", "tiene", "quien",
+    # Relleno
+    "el", "la", "los", "las", "del", "de", "al", "a", "en", "para", "por", "favor", "un", "una", "su", "sus",
+    "actual", "anual", "semestral", "oficial", "programa", "postgrado", "posgrado", "usach", "consultas",
+    "electronico", "numero",
+    # Programas
+    "doctorado", "magister", "master", "maestria", "phd", "doctor", "informatica", "ingenieria",
+    "computacion", "ciencia", "ciencias",
+} | {clave for claves in PREGUNTAS_CAMPO for clave in claves}
+# Si aparece cualquiera de estas, la pregunta necesita razonamiento (o es de
+# fechas y trámites, no del valor): va al LLM
+PALABRAS_COMPLEJAS = (
+    "beca", "descuento", "rebaja", "cuota", "extranjer", "financ", "paga", "pago", "total", "suma",
+    "mensual", "compar", "diferencia", "por que", "porque", "requisito", "credito", "dolar", " uf",
+    "cuando", "hasta", "plazo", "fecha", "postul", "inscri", "vence",
+)
+
+_re_encabezado = re.compile(r"^#{1,6}[ \t]*([^\n:]*?)[ \t]*(?::[ \t]*(.*))?$", re.MULTILINE)
+_re_titulo = re.compile(r"^[ \t*]*#[ \t]+(.+)$", re.MULTILINE)
+_re_imagen = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_re_monto = re.compile(r"\$\s*\d{1,3}(?:\.\d{3})+(?:\s+(?:anual|semestral|mensual|total))?", re.IGNORECASE)
+_re_duracion = re.compile(r"\d+\s+(?:semestres|años|anos|trimestres|meses)", re.IGNORECASE)
+_re_correo = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_re_telefono = re.compile(r"\+?\d[\d ]{7,}\d")
+
+
+class Hecho(NamedTuple):
+    programa: str
+    campo: str
+    valor: str
+    url_fuente: str = ""
+    fuente: str = ""
+
+
+# --- Extracción (ingesta) --------------------------------------------------------
+def _normalizar_valor(campo: str, lineas: list):
+    """Valor canónico del campo, o None si el texto no tiene la forma esperada."""
+    texto = " ".join(lineas)
+    if campo in ("arancel", "matricula"):
+        m = _re_monto.search(texto)
+        return re.sub(r"\$\s*", "$", m.group(0)) if m else None
+    if campo == "duracion":
+        m = _re_duracion.search(texto)
+        return m.group(0) if m else None
+    if campo == "telefono":
+        m = _re_telefono.search(texto)
+        return m.group(0) if m else None
+    # director / contacto: nombre + correo
+    m = _re_correo.search(texto)
+    if not m:
+        return None
+    nombre = " ".join(l for l in lineas if not _re_correo.search(l)).strip()
+    return f"{nombre} ({m.group(0)})" if nombre else m.group(0)
+
+
+def extraer_hechos(texto: str, metadata: dict) -> list:
+    """
+    Hechos de la ficha de un programa (markdown del crawler, ya pasado por
+    limpiar_texto_maestro: "#### ARANCEL: $ 3.836.655 anual" o el valor en las
+    líneas siguientes al encabezado).
+    """
+    programa = metadata.get("programa", PROGRAMA_GENERAL)
+    if programa == PROGRAMA_GENERAL:
+        return []
+    url = metadata.get("url_fuente", "")
+    fuente = metadata.get("source", "")
+    hechos = []
+
+    titulo = _re_titulo.search(texto)
+    if titulo:
+        hechos.append(Hecho(programa, "nombre", " ".join(titulo.group(1).split()), url, fuente))
+
+    encabezados = list(_re_encabezado.finditer(texto))
+    for i, m in enumerate(encabezados):
+        nombre = sin_tildes(m.group(1)).lower().strip(" *")
+        campo = next((c for prefijo, c in ENCABEZADOS_CAMPO.items() if nombre.startswith(prefijo)), None)
+        if campo is None:
+            continue
+        fin = encabezados[i + 1].start() if i + 1 < len(encabezados) else len(texto)
+        lineas = [m.group(2) or ""] + texto[m.end():fin].splitlines()
+        lineas = [l.strip(" *") for l in (_re_imagen.sub("", l) for l in lineas)]
+        valor = _normalizar_valor(campo, [l for l in lineas if l][:3])
+        if valor:
+            hechos.append(Hecho(programa, campo, valor, url, fuente))
+    return hechos
+
+
+def con_hechos(docs, almacen):
+    """Etapa de ingesta: registra los hechos de cada documento y lo deja pasar."""
+    for documento in docs:
+        almacen.agregar(extraer_hechos(documento.page_content, documento.metadata))
+        yield documento
+
+
+# --- Almacén (SQLite) -----------------------------------------------------------
+class AlmacenHechos:
+    """
+    Tabla (programa, campo, valor, url) indexada por (programa, campo). Las consultas
+    se responden desde una copia en memoria (son pocas filas): la API las hace en el
+    event loop y no debe tocar SQLite en cada petición.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.respondidas = 0
+        self._lock = threading.Lock()
+        self._memoria = None  # (programa, campo) -> [Hecho]; None = hay que leer la tabla
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hechos (programa TEXT NOT NULL, campo TEXT NOT NULL, "
+            "valor TEXT NOT NULL, url_fuente TEXT, fuente TEXT, UNIQUE (programa, campo, valor, fuente))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_hechos ON hechos (programa, campo)")
+        self._conn.commit()
+
+    @classmethod
+    def crear(cls, ruta: str):
+        """Almacén vacío (la ingesta lo rearma completo: extraer hechos es solo regex)."""
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        return cls(ruta)
+
+    def conservar(self, fuentes) -> None:
+        """Borra los hechos de toda fuente que no esté en `fuentes` (ingesta incremental)."""
+        with self._lock:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS conservar (fuente TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM conservar")
+            self._conn.executemany("INSERT OR IGNORE INTO conservar VALUES (?)", [(f,) for f in fuentes])
+            self._conn.execute("DELETE FROM hechos WHERE fuente IS NULL OR fuente NOT IN (SELECT fuente FROM conservar)")
+            self._conn.commit()
+            self._memoria = None
+
+    def agregar(self, hechos: list) -> None:
+        if not hechos:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO hechos VALUES (?, ?, ?, ?, ?)", hechos)
+            self._conn.commit()
+            self._memoria = None
+
+    def _en_memoria(self) -> dict:
+        """Copia en memoria de la tabla (se llama con self._lock tomado)."""
+        if self._memoria is None:
+            memoria = {}
+            for fila in self._conn.execute("SELECT programa, campo, valor, url_fuente, fuente FROM hechos"):
+                memoria.setdefault((fila[0], fila[1]), []).append(Hecho(*fila))
+            self._memoria = memoria
+        return self._memoria
+
+    def precargar(self) -> None:
+        """Lee la tabla ahora (al abrir el índice), no en la primera consulta."""
+        with self._lock:
+            self._en_memoria()
+
+    def buscar(self, programa: str, campo: str) -> list:
+        with self._lock:
+            return list(self._en_memoria().get((programa, campo), ()))
+
+    def confiable(self, programa: str, campo: str):
+        """El hecho si todas las fuentes dicen lo mismo; None si falta o hay valores distintos."""
+        hechos = self.buscar(programa, campo)
+        return hechos[0] if hechos and len({h.valor for h in hechos}) == 1 else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM hechos").fetchone()[0]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._memoria = None
+            self._conn.close()
+
+    # --- Respuesta rápida ---------------------------------------------------
+    def responder(self, user_input: str, programa):
+        """Respuesta con plantilla para una consulta puntual, o None para seguir al RAG."""
+        campos = campos_consultados(user_input)
+        if not campos or not programa:
+            return None
+        hechos = [self.confiable(programa, campo) for campo in campos]
+        if not all(hechos):
+            return None
+
+        nombre = self.confiable(programa, "nombre")
+        titulo = nombre.valor if nombre else programa.capitalize()
+        lineas = [f"Estos son los datos oficiales del {titulo}:"]
+        lineas += [f"- {ETIQUETAS_CAMPO[h.campo]}: {h.valor}" for h in hechos]
+        if {"matricula", "arancel"} <= set(campos):
+            lineas.append("\nLa matrícula y el arancel son cobros distintos.")
+        url = next((h.url_fuente for h in hechos if h.url_fuente), "")
+        if url:
+            lineas.append(f"\n🔗 Más información: {url}")
+        with self._lock:
+            self.respondidas += 1
+        return "\n".join(lineas)
+
+
+def campos_consultados(user_input: str) -> tuple:
+    """Campos que pide una pregunta corta y puntual; () si no es una consulta de un dato."""
+    texto = " ".join(re.sub(r"[^\w\s]", " ", sin_tildes(user_input).lower()).split())
+    palabras = texto.split()
+    if len(palabras) > MAX_PALABRAS_PREGUNTA or any(p in f" {texto} " for p in PALABRAS_COMPLEJAS):
+        return ()
+    if not _re_pide_valor.match(texto) or any(p not in PALABRAS_PERMITIDAS for p in palabras):
+        return ()
+    campos = []
+    for claves, pedidos in PREGUNTAS_CAMPO.items():
+        if any(clave in palabras for clave in claves):
+            campos += [c for c in pedidos if c not in campos]
+    # "¿cuánto cuesta la matrícula?" pide solo la matrícula, no también el arancel (y al revés)
+    nombra_arancel = "arancel" in palabras or "colegiatura" in palabras
+    nombra_matricula = "matricula" in palabras
+    if nombra_matricula != nombra_arancel:
+        campos = [c for c in campos if c != ("arancel" if nombra_matricula else "matricula")]
+    return tuple(campos)
+
+
+def cargar_hechos(carpeta_db: str):
+    """Almacén de hechos de la versión del índice, o None si la ingesta no lo generó."""
+    ruta = os.path.join(carpeta_db, ARCHIVO_HECHOS)
+    if not os.path.exists(ruta):
+        return None
+    almacen = AlmacenHechos(ruta)
+    almacen.precargar()
+    print(f"   - [HECHOS] {len(almacen)} hechos cargados.")
+    return almacen
@@ -0,0 +1,157 @@
+import json
+import re
+
+import numpy as np
+from langchain_core.documents import Document
+
+from indice_numpy import cumple_filtro
+from programas import sin_tildes
+
+# =============================================================================
+# ÍNDICE LÉXICO BM25 (ÍNDICE INVERTIDO PRECALCULADO)
+# =============================================================================
+# Los embeddings densos son malos para tokens exactos como "3.836.655",
+# "matrícula" o "ANID". BM25 los encuentra sin problema. El índice se construye
+# al ingerir, se guarda junto a la colección de Chroma en formato CSR
+# (offsets + postings en arreglos NumPy comprimidos) y se carga al arrancar.
+
+ARCHIVO_BM25 = "bm25_index.npz"
+
+STOPWORDS = {
+    "a", "al", "como", "con", "cual", "cuales", "de", "del", "el", "en", "es", "esta",
+    "este", "hay", "la", "las", "le", "lo", "los", "me", "mi", "o", "para", "por", "que",
+    "se", "si", "su", "sus", "un", "una", "uno", "y", "ya",
+}
+
+_re_token = re.compile(r"\d+(?:[.,]\d+)*|[a-zñ]+")
+
+
+def tokenizar(texto: str) -> list:
+    """Minúsculas sin tildes; los montos se indexan tal cual ("3.836.655") y sin puntos."""
+    tokens = []
+    for t in _re_token.findall(sin_tildes(texto).lower()):
+        if t in STOPWORDS:
+            continue
+        tokens.append(t)
+        if t[0].isdigit() and ("." in t or "," in t):
+            tokens.append(re.sub(r"[.,]", "", t))
+    return tokens
+
+
+class IndiceBM25:
+    """BM25 Okapi sobre un índice invertido en formato CSR."""
+
+    def __init__(self, ids, textos, metadatas, vocabulario, offsets, postings_doc, postings_tf,
+                 largos, k1: float = 1.5, b: float = 0.75):
+        self.ids = list(ids)
+        self.posiciones = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self.textos = list(textos)
+        self.metadatas = [m or {} for m in metadatas]
+        self.vocabulario = {t: i for i, t in enumerate(vocabulario)}
+        self.offsets = offsets
+        self.postings_doc = postings_doc
+        self.postings_tf = postings_tf.astype(np.float32)
+        self.largos = largos.astype(np.float32)
+        self.k1 = k1
+        self.b = b
+
+        n = len(self.ids)
+        self._promedio = float(self.largos.mean()) if n else 0.0
+        df = np.diff(offsets).astype(np.float64)
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        # Parte del denominador que no depende de la consulta
+        self._norma = (k1 * (1 - b + b * self.largos / max(self._promedio, 1e-9))).astype(np.float32)
+        self._mascaras = {}
+
+    # --- Construcción y persistencia -----------------------------------------
+    @classmethod
+    def construir(cls, ids, textos, metadatas):
+        vocab, postings = {}, []  # postings[termino] = [(doc, tf), ...]
+        largos = np.zeros(len(textos), dtype=np.int32)
+        for doc, texto in enumerate(textos):
+            conteo = {}
+            for t in tokenizar(texto):
+                conteo[t] = conteo.get(t, 0) + 1
+            largos[doc] = sum(conteo.values())
+            for t, tf in conteo.items():
+                if t not in vocab:
+                    vocab[t] = len(postings)
+                    postings.append([])
+                postings[vocab[t]].append((doc, tf))
+
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in postings])
+        planos = [par for p in postings for par in p]
+        postings_doc = np.array([d for d, _ in planos], dtype=np.int32)
+        postings_tf = np.array([tf for _, tf in planos], dtype=np.uint16)
+        return cls(ids, textos, metadatas, list(vocab), offsets, postings_doc, postings_tf, largos)
+
+    @classmethod
+    def desde_coleccion(cls, vector_db):
+        datos = vector_db.get(include=["documents", "metadatas"])
+        return cls.construir(datos["ids"], datos["documents"], datos["metadatas"])
+
+    def guardar(self, ruta: str) -> None:
+        vocab = sorted(self.vocabulario, key=self.vocabulario.get)
+        np.savez_compressed(
+            ruta,
+            ids=np.array(self.ids, dtype=str),
+            textos=np.array(self.textos, dtype=str),
+            metadatas=np.array([json.dumps(m, ensure_ascii=False) for m in self.metadatas], dtype=str),
+            vocabulario=np.array(vocab, dtype=str),
+            offsets=self.offsets,
+            postings_doc=self.postings_doc,
+            postings_tf=self.postings_tf.astype(np.uint16),
+            largos=self.largos.astype(np.int32),
+        )
+
+    @classmethod
+    def cargar(cls, ruta: str):
+        with np.load(ruta, allow_pickle=False) as datos:
+            return cls(
+                datos["ids"].tolist(),
+                datos["textos"].tolist(),
+                [json.loads(m) for m in datos["metadatas"].tolist()],
+                datos["vocabulario"].tolist(),
+                datos["offsets"], datos["postings_doc"], datos["postings_tf"], datos["largos"],
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- Búsqueda -------------------------------------------------------------
+    def _mascara(self, filtro: dict):
+        clave = json.dumps(filtro, sort_keys=True, ensure_ascii=False)
+        if clave not in self._mascaras:
+            self._mascaras[clave] = np.array([cumple_filtro(m, filtro) for m in self.metadatas], dtype=bool)
+        return self._mascaras[clave]
+
+    def puntajes(self, query: str) -> np.ndarray:
+        puntajes = np.zeros(len(self.ids), dtype=np.float32)
+        for t in set(tokenizar(query)):
+            i = self.vocabulario.get(t)
+            if i is None:
+                continue
+            desde, hasta = self.offsets[i], self.offsets[i + 1]
+            docs = self.postings_doc[desde:hasta]
+            tf = self.postings_tf[desde:hasta]
+            puntajes[docs] += self.idf[i] * tf * (self.k1 + 1) / (tf + self._norma[docs])
+        return puntajes
+
+    def buscar(self, query: str, k: int = 10, filter: dict = None) -> list:
+        """Lista de (índice, puntaje) de los k mejores con puntaje > 0."""
+        if not self.ids:
+            return []
+        puntajes = self.puntajes(query)
+        if filter:
+            puntajes = np.where(self._mascara(filter), puntajes, 0.0)
+        k = min(k, len(puntajes))
+        candidatos = np.argpartition(-puntajes, k - 1)[:k]
+        orden = candidatos[np.argsort(-puntajes[candidatos])]
+        return [(int(i), float(puntajes[i])) for i in orden if puntajes[i] > 0]
+
+    def documento(self, i: int) -> Document:
+        return Document(id=self.ids[i], page_content=self.textos[i], metadata=self.metadatas[i])
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs) -> list:
+        return [self.documento(i) for i, _ in self.buscar(query, k, filter)]
@@ -0,0 +1,159 @@
+import json
+
+import numpy as np
+from langchain_core.documents import Document
+
+# =============================================================================
+# ÍNDICE VECTORIAL EN MEMORIA (NUMPY) COMO ALTERNATIVA A CHROMA
+# =============================================================================
+# Nuestro corpus son unos pocos miles de chunks. Para ese tamaño, una matriz
+# contigua en RAM responde el top-k con un producto matriz-vector y un
+# argpartition, sin pasar por el cliente de Chroma, SQLite ni HNSW.
+# Expone la misma interfaz de búsqueda que usamos de Chroma (similarity_search,
+# similarity_search_by_vector y sus versiones async), así que es intercambiable.
+
+TAM_BLOQUE_FLOAT16 = 2048
+
+
+def cumple_filtro(metadata: dict, filtro: dict) -> bool:
+    """Evalúa un subconjunto de la sintaxis "where" de Chroma ($and, $or, $eq, $ne, $in, $nin)."""
+    for campo, condicion in filtro.items():
+        if campo == "$and":
+            if not all(cumple_filtro(metadata, f) for f in condicion): return False
+        elif campo == "$or":
+            if not any(cumple_filtro(metadata, f) for f in condicion): return False
+        elif isinstance(condicion, dict):
+            valor = metadata.get(campo)
+            for op, esperado in condicion.items():
+                if op == "$eq" and valor != esperado: return False
+                if op == "$ne" and valor == esperado: return False
+                if op == "$in" and valor not in esperado: return False
+                if op == "$nin" and valor in esperado: return False
+        elif metadata.get(campo) != condicion:
+            return False
+    return True
+
+
+class IndiceNumpy:
+    """Búsqueda exacta por fuerza bruta sobre embeddings cargados desde una colección Chroma."""
+
+    def __init__(self, ids: list, textos: list, metadatas: list, embeddings,
+                 embedding_function=None, espacio: str = "l2", dtype: str = "float32"):
+        self.ids = list(ids)
+        self.textos = list(textos)
+        self.metadatas = [m or {} for m in metadatas]
+        self.embedding_function = embedding_function
+        self.espacio = espacio
+
+        matriz = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if espacio == "cosine":
+            normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+            matriz = matriz / np.where(normas == 0, 1, normas)
+        # Para l2 ordenamos por ||x||² - 2·x·q (||q||² es constante para la consulta)
+        self._normas2 = np.einsum("ij,ij->i", matriz, matriz).astype(np.float32)
+        # float16 reduce la RAM a la mitad; el producto se hace igual en float32 (ver _productos)
+        self.matriz = matriz.astype(np.dtype(dtype))
+        self._mascaras = {}
+
+    @classmethod
+    def desde_chroma(cls, vector_db, embedding_function=None, dtype: str = "float32"):
+        """Carga todos los chunks de una instancia langchain_chroma.Chroma ya abierta."""
+        datos = vector_db.get(include=["embeddings", "documents", "metadatas"])
+        espacio = (vector_db._collection.metadata or {}).get("hnsw:space", "l2")
+        return cls(
+            datos["ids"], datos["documents"], datos["metadatas"], datos["embeddings"],
+            embedding_function=embedding_function or vector_db.embeddings,
+            espacio=espacio, dtype=dtype,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- Filtros de metadata ---------------------------------------------------
+    def _mascara(self, filtro: dict):
+        # Los filtros se repiten mucho (uno por programa): la máscara se calcula una vez
+        clave = json.dumps(filtro, sort_keys=True, ensure_ascii=False)
+        if clave not in self._mascaras:
+            self._mascaras[clave] = np.array(
+                [cumple_filtro(m, filtro) for m in self.metadatas], dtype=bool
+            )
+        return self._mascaras[clave]
+
+    # --- Búsqueda -------------------------------------------------------------
+    def _productos(self, q: np.ndarray) -> np.ndarray:
+        if self.matriz.dtype == np.float32:
+            return self.matriz @ q
+        # NumPy no tiene BLAS para float16: subimos a float32 por bloques (RAM acotada)
+        salida = np.empty(len(self.matriz), dtype=np.float32)
+        for inicio in range(0, len(self.matriz), TAM_BLOQUE_FLOAT16):
+            bloque = self.matriz[inicio:inicio + TAM_BLOQUE_FLOAT16].astype(np.float32)
+            salida[inicio:inicio + len(bloque)] = bloque @ q
+        return salida
+
+    def _puntajes(self, embedding) -> np.ndarray:
+        q = np.asarray(embedding, dtype=np.float32)
+        productos = self._productos(q)
+        if self.espacio == "cosine":
+            norma = np.linalg.norm(q)
+            return productos / norma if norma > 0 else productos
+        if self.espacio == "ip":
+            return productos
+        return 2 * productos - self._normas2  # Mayor = más cerca (equivale a menor distancia l2)
+
+    def _top_k(self, embedding, k: int, filter: dict = None):
+        if not self.ids:
+            return []
+        puntajes = self._puntajes(embedding)
+        if filter:
+            puntajes = np.where(self._mascara(filter), puntajes, -np.inf)
+
+        k = min(k, len(puntajes))
+        candidatos = np.argpartition(-puntajes, k - 1)[:k]
+        orden = candidatos[np.argsort(-puntajes[candidatos])]
+        return [(int(i), float(puntajes[i])) for i in orden if np.isfinite(puntajes[i])]
+
+    def _documento(self, i: int) -> Document:
+        return Document(id=self.ids[i], page_content=self.textos[i], metadata=self.metadatas[i])
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: dict = None, **kwargs) -> list:
+        return [self._documento(i) for i, _ in self._top_k(embedding, k, filter)]
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, filter: dict = None) -> list:
+        return [(self._documento(i), puntaje) for i, puntaje in self._top_k(embedding, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs) -> list:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k, filter)
+
+    async def asimilarity_search_by_vector(self, embedding, k: int = 4, filter: dict = None, **kwargs) -> list:
+        # Es CPU puro y toma microsegundos: no vale la pena mandarlo a un thread
+        return self.similarity_search_by_vector(embedding, k, filter)
+
+    async def asimilarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs) -> list:
+        embedding = await self.embedding_function.aembed_query(query)
+        return self.similarity_search_by_vector(embedding, k, filter)
+
+    def get(self, ids=None, where: dict = None, limit: int = None, include=None, **kwargs) -> dict:
+        """Lectura compatible con Chroma.get para los scripts que inspeccionan el índice."""
+        seleccion = range(len(self.ids))
+        if ids is not None:
+            buscados = {ids} if isinstance(ids, str) else set(ids)
+            seleccion = [i for i in seleccion if self.ids[i] in buscados]
+        if where:
+            mascara = self._mascara(where)
+            seleccion = [i for i in seleccion if mascara[i]]
+        if limit is not None:
+            seleccion = list(seleccion)[:limit]
+        return {
+            "ids": [self.ids[i] for i in seleccion],
+            "documents": [self.textos[i] for i in seleccion],
+            "metadatas": [self.metadatas[i] for i in seleccion],
+        }
+
+
+def cargar_motor_busqueda(vector_db, motor: str, embedding_function=None, dtype: str = "float32"):
+    """Devuelve el backend de búsqueda pedido por configuración ('chroma' o 'numpy')."""
+    if motor == "numpy":
+        indice = IndiceNumpy.desde_chroma(vector_db, embedding_function, dtype=dtype)
+        print(f"   - [ÍNDICE] NumPy en memoria: {len(indice)} chunks ({dtype}).")
+        return indice
+    return vector_db
@@ -0,0 +1,264 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+import numpy as np
+import xxhash
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from cache_embeddings import EmbeddingsConCache
+
+# =============================================================================
+# LLM GRABADO: GRABAR Y REPRODUCIR RESPUESTAS PARA BENCHMARKS
+# =============================================================================
+# Los benchmarks y optimizar_cerebro.py pasan por conversational_rag_chain, o
+# sea por GitHub Models u Ollama: la latencia medida trae el jitter de la red y
+# no se puede correr sin internet (ni en CI). Este envoltorio se pone en lugar
+# del LLM en inicializar_sistema() según MAURICIA_MODO_LLM:
+#
+#   real        el LLM de siempre (por defecto; no se envuelve)
+#   grabar      llama al LLM real y guarda prompt -> respuesta + tiempos en SQLite
+#   reproducir  responde desde las grabaciones, sin red; si el prompt no está
+#               grabado, contesta el sustituto determinista (y lo cuenta)
+#   simulado    siempre el sustituto determinista (no hace falta grabar nada)
+#
+# MAURICIA_FACTOR_LATENCIA_LLM escala el tiempo grabado al reproducir: 0 = al
+# instante (solo se mide el pipeline: búsqueda, prompt, historial), 1 = como
+# respondió el modelo real. Con streaming se respeta el tiempo al primer token.
+#
+# Los embeddings siguen el mismo modo (crear_embeddings): en real/grabar van al
+# modelo y la caché de disco (cache_embeddings.py) queda como grabación; en
+# reproducir esa caché se lee sin escribirla y lo que falta lo pone un
+# sustituto determinista; en simulado todo es sustituto. Así reproducir y
+# simulado corren sin GITHUB_TOKEN ni red.
+
+MODO_LLM = os.getenv("MAURICIA_MODO_LLM", "real")
+MODOS_LLM = ("real", "grabar", "reproducir", "simulado")
+MODOS_CON_LLM_REAL = ("real", "grabar")
+RUTA_GRABACIONES = os.getenv("MAURICIA_GRABACIONES_LLM", "grabaciones_llm.sqlite3")
+FACTOR_LATENCIA = float(os.getenv("MAURICIA_FACTOR_LATENCIA_LLM", "0"))
+MAX_CHARS_SUSTITUTO = 600
+# Debe coincidir con la dimensión del índice (text-embedding-3-small = 1536)
+DIMENSION_SUSTITUTO = int(os.getenv("MAURICIA_DIMENSION_EMBEDDINGS", "1536"))
+PREFIJO_SUSTITUTO = "[RESPUESTA SIMULADA] "
+
+
+def clave_prompt(modelo: str, mensajes: list) -> str:
+    partes = [(m.type, m.content if isinstance(m.content, str) else json.dumps(m.content)) for m in mensajes]
+    return xxhash.xxh3_128_hexdigest(f"{modelo}\x00{json.dumps(partes, ensure_ascii=False)}".encode("utf-8"))
+
+
+def respuesta_sustituta(mensajes: list) -> str:
+    """Determinista: el comienzo del último mensaje del usuario (contexto + pregunta)."""
+    humano = next((m for m in reversed(mensajes) if m.type == "human"), None)
+    texto = " ".join(str(humano.content).split()) if humano else ""
+    return PREFIJO_SUSTITUTO + texto[:MAX_CHARS_SUSTITUTO]
+
+
+class GrabacionesLLM:
+    """Tabla clave -> (respuesta, segundos totales, segundos al primer token) en SQLite."""
+
+    def __init__(self, ruta: str = RUTA_GRABACIONES):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS grabaciones (clave TEXT PRIMARY KEY, modelo TEXT, prompt TEXT, "
+            "respuesta TEXT NOT NULL, segundos REAL NOT NULL, primer_token REAL NOT NULL, fecha TEXT)"
+        )
+        self._conn.commit()
+
+    def guardar(self, clave: str, modelo: str, mensajes: list, respuesta: str,
+                segundos: float, primer_token: float) -> None:
+        prompt = json.dumps([(m.type, str(m.content)) for m in mensajes], ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO grabaciones VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (clave, modelo, prompt, respuesta, segundos, primer_token, time.strftime("%Y-%m-%d %H:%M:%S")),
+            )
+            self._conn.commit()
+
+    def buscar(self, clave: str):
+        """(respuesta, segundos, primer_token) o None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT respuesta, segundos, primer_token FROM grabaciones WHERE clave = ?", (clave,)
+            ).fetchone()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM grabaciones").fetchone()[0]
+
+
+class LLMGrabado(BaseChatModel):
+    """Chat model de LangChain que graba o reproduce al LLM real (misma interfaz para la cadena)."""
+
+    base: Optional[Any] = None  # El LLM real (solo en modo "grabar")
+    modelo: str = ""
+    modo: str = "reproducir"
+    grabaciones: Optional[Any] = None
+    factor_latencia: float = FACTOR_LATENCIA
+    aciertos: int = 0
+    fallos: int = 0
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)  # Los contadores se tocan desde hilos
+
+    @property
+    def _llm_type(self) -> str:
+        return f"grabado-{self.modo}"
+
+    # --- Reproducción -------------------------------------------------------
+    def _reproducir(self, mensajes: list):
+        """(respuesta, segundos, primer_token) de la grabación o del sustituto."""
+        if self.modo == "reproducir":
+            grabada = self.grabaciones.buscar(clave_prompt(self.modelo, mensajes))
+            with self._lock:
+                if grabada is not None:
+                    self.aciertos += 1
+                    return grabada
+                self.fallos += 1
+                fallos = self.fallos
+            print(f"⚠️ [LLM] Prompt sin grabación ({fallos}): se usa la respuesta simulada.")
+        return respuesta_sustituta(mensajes), 0.0, 0.0
+
+    async def _areproducir(self, mensajes: list):
+        """_reproducir fuera del event loop: la búsqueda en la grabación es SQLite síncrono."""
+        if self.modo == "reproducir":
+            return await asyncio.to_thread(self._reproducir, mensajes)
+        return self._reproducir(mensajes)
+
+    def _trozos(self, respuesta: str, segundos: float, primer_token: float):
+        """Palabras de la respuesta con la espera previa a cada una (escalada por factor_latencia)."""
+        palabras = respuesta.split(" ")
+        resto = max(segundos - primer_token, 0.0) / max(len(palabras) - 1, 1)
+        for i, palabra in enumerate(palabras):
+            espera = primer_token if i == 0 else resto
+            yield (palabra if i == 0 else " " + palabra), espera * self.factor_latencia
+
+    # --- Grabación ------------------------------------------------------------
+    def _grabar(self, mensajes: list, respuesta: str, inicio: float, primer_token: float = None) -> None:
+        segundos = time.perf_counter() - inicio
+        primer_token = segundos if primer_token is None else primer_token - inicio
+        self.grabaciones.guardar(clave_prompt(self.modelo, mensajes), self.modelo, mensajes,
+                                 respuesta, segundos, primer_token)
+
+    # --- Interfaz BaseChatModel ---------------------------------------------
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.modo == "grabar":
+            inicio = time.perf_counter()
+            respuesta = self.base.invoke(messages, stop=stop, **kwargs)
+            self._grabar(messages, str(respuesta.content), inicio)
+            return ChatResult(generations=[ChatGeneration(message=respuesta)])
+        respuesta, segundos, _ = self._reproducir(messages)
+        time.sleep(segundos * self.factor_latencia)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=respuesta))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.modo == "grabar":
+            inicio = time.perf_counter()
+            respuesta = await self.base.ainvoke(messages, stop=stop, **kwargs)
+            self._grabar(messages, str(respuesta.content), inicio)
+            return ChatResult(generations=[ChatGeneration(message=respuesta)])
+        respuesta, segundos, _ = await self._areproducir(messages)
+        await asyncio.sleep(segundos * self.factor_latencia)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=respuesta))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.modo == "grabar":
+            inicio, primer_token, partes = time.perf_counter(), None, []
+            for chunk in self.base.stream(messages, stop=stop, **kwargs):
+                primer_token = primer_token or time.perf_counter()
+                partes.append(str(chunk.content))
+                yield ChatGenerationChunk(message=chunk)
+            self._grabar(messages, "".join(partes), inicio, primer_token)
+            return
+        for trozo, espera in self._trozos(*self._reproducir(messages)):
+            time.sleep(espera)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=trozo))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.modo == "grabar":
+            inicio, primer_token, partes = time.perf_counter(), None, []
+            async for chunk in self.base.astream(messages, stop=stop, **kwargs):
+                primer_token = primer_token or time.perf_counter()
+                partes.append(str(chunk.content))
+                yield ChatGenerationChunk(message=chunk)
+            self._grabar(messages, "".join(partes), inicio, primer_token)
+            return
+        for trozo, espera in self._trozos(*await self._areproducir(messages)):
+            await asyncio.sleep(espera)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=trozo))
+
+    def estadisticas(self) -> dict:
+        return {"modo": self.modo, "grabadas": len(self.grabaciones), "aciertos": self.aciertos,
+                "fallos": self.fallos}
+
+
+def crear_llm(fabrica_real, modelo: str, modo: str = MODO_LLM, ruta: str = RUTA_GRABACIONES):
+    """
+    LLM para inicializar_sistema(). `fabrica_real()` crea el LLM de verdad y solo
+    se llama en los modos que lo usan: reproducir/simulado no necesitan red.
+    """
+    if modo not in MODOS_LLM:
+        raise ValueError(f"MAURICIA_MODO_LLM desconocido: {modo} (disponibles: {', '.join(MODOS_LLM)})")
+    if modo == "real":
+        return fabrica_real()
+    base = fabrica_real() if modo == "grabar" else None
+    llm = LLMGrabado(base=base, modelo=modelo, modo=modo, grabaciones=GrabacionesLLM(ruta))
+    print(f"   - [LLM] Modo {modo}: {len(llm.grabaciones)} respuestas grabadas en {ruta}")
+    return llm
+
+
+class EmbeddingsSustitutas(Embeddings):
+    """
+    Embeddings deterministas sin red: cada palabra suma ±1 en una coordenada
+    elegida por su hash. Textos con palabras en común quedan cerca, así la
+    búsqueda sigue teniendo sentido en reproducir/simulado.
+    """
+
+    def __init__(self, dimension: int = DIMENSION_SUSTITUTO):
+        self.dimension = dimension
+        self.fallos = 0  # Textos que no estaban grabados
+
+    def _vector(self, texto: str) -> list:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for palabra in texto.lower().split():
+            h = xxhash.xxh64_intdigest(palabra.encode("utf-8"))
+            vector[h % self.dimension] += 1.0 if (h >> 63) else -1.0
+        norma = np.linalg.norm(vector)
+        if norma == 0:
+            vector[0], norma = 1.0, 1.0
+        self.fallos += 1
+        return (vector / norma).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._vector(text)
+
+    def estadisticas(self) -> dict:
+        return {"modo": "sustituto", "dimension": self.dimension, "sustituidos": self.fallos}
+
+
+def crear_embeddings(fabrica_real, modelo: str, ruta_cache: str, modo: str = MODO_LLM):
+    """
+    Embeddings para inicializar_sistema(), con la caché de disco de siempre.
+    `fabrica_real()` solo se llama en real/grabar (los que tienen red).
+    """
+    if modo not in MODOS_LLM:
+        raise ValueError(f"MAURICIA_MODO_LLM desconocido: {modo} (disponibles: {', '.join(MODOS_LLM)})")
+    if modo in MODOS_CON_LLM_REAL:
+        return EmbeddingsConCache(fabrica_real(), modelo=modelo, ruta_db=ruta_cache)
+    if modo == "simulado":
+        return EmbeddingsSustitutas()
+    print(f"   - [EMBEDDINGS] Modo {modo}: {ruta_cache} de solo lectura (sustituto si falta)")
+    return EmbeddingsConCache(EmbeddingsSustitutas(), modelo=modelo, ruta_db=ruta_cache, solo_lectura=True)
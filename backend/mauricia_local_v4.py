@@ -2,6 +2,7 @@ import os
 import sys
 import re
 import time
+import asyncio
 from dotenv import load_dotenv
 
 from langchain_ollama import ChatOllama
@@ -10,7 +11,16 @@ from langchain_chroma import Chroma
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.output_parsers import StrOutputParser
-from langchain_community.chat_message_histories import ChatMessageHistory
+
+from memoria_sesiones import AlmacenSesiones
+from ventana_historial import VentanaHistorial
+from deduplicacion import ensamblar_contexto
+from hechos import cargar_hechos
+from llm_grabado import MODO_LLM, MODOS_CON_LLM_REAL, crear_llm
+from indice_numpy import cargar_motor_busqueda
+from recuperacion import RecuperadorHibrido, cargar_bm25
+from versiones_indice import ruta_activa
+from programas import filtro_programa, programa_de_conversacion
 
 # CONFIGURACIÓN
 load_dotenv()
@@ -18,16 +28,29 @@ CARPETA_DB = "chroma_db_local"
 MODELO_OLLAMA = "llama3.1"
 MODELO_EMBEDDINGS = "sentence-transformers/all-MiniLM-L6-v2"
 SESSION_ID = "sesion_usuario_local"
+MOTOR_BUSQUEDA = os.getenv("MAURICIA_MOTOR_BUSQUEDA", "chroma")  # "chroma" o "numpy"
+DTYPE_INDICE = os.getenv("MAURICIA_DTYPE_INDICE", "float32")
 
 MAX_CONTEXT_CHARS = 12000
 K_NORMAL = 4
 K_DINERO = 10
+K_DINERO_HIBRIDO = 5       # Con BM25 + RRF basta un k chico
+K_CANDIDATOS_HIBRIDO = 20
+
+MAX_SESIONES = 1000
+TTL_SESION_SEG = 1800
+MAX_MENSAJES_SESION = 20
+PRESUPUESTO_HISTORIAL_TOKENS = 1200
 
 # VARIABLES GLOBALES
 sistema_cargado = False
 vector_db = None
+recuperador = None
+almacen_hechos = None
+embedding_function = None
 conversational_rag_chain = None
-store = {}
+store = AlmacenSesiones(MAX_SESIONES, TTL_SESION_SEG, MAX_MENSAJES_SESION)
+_lock_inicializacion = asyncio.Lock()
 
 # PROMPT Y REGEX (Igual que antes...)
 SYSTEM_PROMPT_V3 = (
@@ -69,12 +92,10 @@ def es_saludo_puro(user_input: str) -> bool:
     return len(words) < 6 and any(w in SALUDOS_KW for w in words)
 
 def get_session_history(session_id: str):
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
+    return store.obtener(session_id)
 
 def inicializar_sistema():
-    global vector_db, conversational_rag_chain, sistema_cargado
+    global vector_db, recuperador, almacen_hechos, embedding_function, conversational_rag_chain, sistema_cargado
     
     # Evitar recargar si ya está listo
     if sistema_cargado: return True
@@ -90,19 +111,27 @@ def inicializar_sistema():
         print(f"   - [RAM] Cargando Embeddings: {MODELO_EMBEDDINGS}...")
         embedding_function = HuggingFaceEmbeddings(model_name=MODELO_EMBEDDINGS)
 
-        # 2. Conectar DB
+        # 2. Conectar DB (la versión publicada por la ingesta, ver versiones_indice.py)
         print(f"   - [IO] Conectando ChromaDB...")
+        ruta_db = ruta_activa(CARPETA_DB)
         vector_db = Chroma(
-            persist_directory=CARPETA_DB,
+            persist_directory=ruta_db,
             embedding_function=embedding_function
         )
+        vector_db = cargar_motor_busqueda(vector_db, MOTOR_BUSQUEDA, embedding_function, DTYPE_INDICE)
+        recuperador = RecuperadorHibrido(vector_db, cargar_bm25(ruta_db, vector_db), K_CANDIDATOS_HIBRIDO)
+        almacen_hechos = cargar_hechos(ruta_db)
 
         # 3. Conectar Ollama
         print(f"   - [LLM] Configurando Llama 3.1...")
-        llm = ChatOllama(
-            model=MODELO_OLLAMA,
-            temperature=0.0,
-            base_url="http://localhost:11434"
+        # MAURICIA_MODO_LLM=grabar/reproducir lo envuelve (llm_grabado.py): reproducir no necesita Ollama
+        llm = crear_llm(
+            lambda: ChatOllama(
+                model=MODELO_OLLAMA,
+                temperature=0.0,
+                base_url="http://localhost:11434"
+            ),
+            modelo=MODELO_OLLAMA,
         )
 
         # 4. Crear Cadena
@@ -112,7 +141,17 @@ def inicializar_sistema():
             ("human", "CONTEXTO:\n{context}\n\nPREGUNTA:\n{input}")
         ])
 
-        chain = qa_prompt | llm | StrOutputParser()
+        # Ventana de tokens sobre el historial; en local el resumen es extractivo
+        # para no pagar una segunda generación de Llama cuando la ventana se desplaza.
+        ventana_historial = VentanaHistorial(
+            presupuesto_tokens=PRESUPUESTO_HISTORIAL_TOKENS,
+            modelo=MODELO_OLLAMA,
+            max_sesiones=MAX_SESIONES,
+        )
+        # El resumen muere con la sesión: un id reutilizado no hereda turnos ajenos
+        store.al_descartar = ventana_historial.olvidar
+
+        chain = ventana_historial.como_runnable() | qa_prompt | llm | StrOutputParser()
 
         conversational_rag_chain = RunnableWithMessageHistory(
             chain,
@@ -144,13 +183,16 @@ def precalentar_motor():
 
         # 2. Forzar carga de Ollama (Generación falsa)
         # Esto obliga a Ollama a subir el modelo a la RAM/VRAM ahora, no después.
-        print("   - [WARM-UP] Enviando ping a Ollama (esto puede tardar unos segundos)...", end=" ")
-        
-        # Usamos invoke directo con el LLM base para no ensuciar el historial
-        llm_dummy = ChatOllama(model=MODELO_OLLAMA, base_url="http://localhost:11434")
-        llm_dummy.invoke("Responde solo la palabra: LISTO")
-        
-        print("✅ Listo.")
+        if MODO_LLM in MODOS_CON_LLM_REAL:
+            print("   - [WARM-UP] Enviando ping a Ollama (esto puede tardar unos segundos)...", end=" ")
+
+            # Usamos invoke directo con el LLM base para no ensuciar el historial
+            llm_dummy = ChatOllama(model=MODELO_OLLAMA, base_url="http://localhost:11434")
+            llm_dummy.invoke("Responde solo la palabra: LISTO")
+
+            print("✅ Listo.")
+        else:
+            print(f"   - [WARM-UP] LLM en modo {MODO_LLM}: no hace falta Ollama.")
         print("🚀 [MOTOR] ¡SISTEMA OPERATIVO Y CALIENTE! Esperando usuarios.\n")
         return True
         
@@ -158,25 +200,57 @@ def precalentar_motor():
         print(f"⚠️ [WARM-UP] Advertencia: {e}")
         return False
 
+def _respuesta_directa(user_input: str):
+    if not user_input: return "..."
+    
+    if _re_inyeccion.search(user_input): return RESP_BLOQUEO
+    if _re_noacad.search(user_input): return RESP_NO_ACADEMICO
+    if es_saludo_puro(user_input): return "¡Hola! 👋 Soy MauricIA."
+    return None
+
+def _parametros_busqueda(user_input: str):
+    es_dinero = any(k in user_input for k in KW_DINERO)
+    k_dinero = K_DINERO_HIBRIDO if recuperador is not None and recuperador.hibrido else K_DINERO
+    k_val = k_dinero if es_dinero else K_NORMAL
+    query = user_input + (" costo arancel" if es_dinero else "")
+    return query, k_val
+
+def _filtro_busqueda(user_input: str, session_id: str):
+    mensajes = store.obtener(session_id).messages if store.existe(session_id) else []
+    return filtro_programa(programa_de_conversacion(user_input, mensajes))
+
+def _desde_hechos(user_input: str, session_id: str):
+    """Arancel / duración / contacto de un programa conocido: plantilla, sin búsqueda ni Llama."""
+    if almacen_hechos is None: return None
+    mensajes = store.obtener(session_id).messages if store.existe(session_id) else []
+    respuesta = almacen_hechos.responder(user_input, programa_de_conversacion(user_input, mensajes))
+    if respuesta is not None:
+        historial = store.obtener(session_id)
+        historial.add_user_message(user_input)
+        historial.add_ai_message(respuesta)
+    return respuesta
+
 def obtener_respuesta_agente(user_input: str, session_id: str = SESSION_ID) -> str:
     # Si por alguna razón no se inició, intentar iniciar (Fallback)
     if not sistema_cargado:
         inicializar_sistema()
 
     user_input = (user_input or "").strip()
-    if not user_input: return "..."
-    
-    if _re_inyeccion.search(user_input): return RESP_BLOQUEO
-    if _re_noacad.search(user_input): return RESP_NO_ACADEMICO
-    if es_saludo_puro(user_input): return "¡Hola! 👋 Soy MauricIA."
+    directa = _respuesta_directa(user_input)
+    if directa is not None: return directa
 
     try:
+        desde_hechos = _desde_hechos(user_input, session_id)
+        if desde_hechos is not None: return desde_hechos
+
         # Búsqueda
-        k_val = K_DINERO if any(k in user_input for k in KW_DINERO) else K_NORMAL
-        query = user_input + (" costo arancel" if k_val == K_DINERO else "")
+        query, k_val = _parametros_busqueda(user_input)
         
-        docs = vector_db.similarity_search(query, k=k_val)
-        contexto = "\n\n".join([d.page_content for d in docs])[:MAX_CONTEXT_CHARS]
+        docs = recuperador.buscar(
+            query, embedding_function.embed_query(query), k=k_val,
+            filter=_filtro_busqueda(user_input, session_id)
+        )
+        contexto = ensamblar_contexto(docs, MAX_CONTEXT_CHARS)
 
         # Generación
         return conversational_rag_chain.invoke(
@@ -185,4 +259,45 @@ def obtener_respuesta_agente(user_input: str, session_id: str = SESSION_ID) -> s
         )
 
     except Exception as e:
-        return "Error técnico en el servidor local."
\ No newline at end of file
+        print(f"❌ [MOTOR] Error: {e}")
+        return "Error técnico en el servidor local."
+
+async def astream_respuesta_agente(user_input: str, session_id: str = SESSION_ID):
+    """Versión streaming para /chat/stream: entrega los tokens de Ollama apenas salen."""
+    # Saludos y bloqueos no necesitan el modelo: responden aunque el sistema no haya cargado
+    user_input = (user_input or "").strip()
+    directa = _respuesta_directa(user_input)
+    if directa is not None:
+        yield directa
+        return
+
+    if not sistema_cargado:
+        async with _lock_inicializacion:
+            if not sistema_cargado:
+                await asyncio.to_thread(inicializar_sistema)
+
+    try:
+        desde_hechos = _desde_hechos(user_input, session_id)
+        if desde_hechos is not None:
+            yield desde_hechos
+            return
+
+        query, k_val = _parametros_busqueda(user_input)
+
+        # Los embeddings de HuggingFace son CPU: la búsqueda async corre en el executor
+        docs = await recuperador.abuscar(
+            query, await embedding_function.aembed_query(query), k=k_val,
+            filter=_filtro_busqueda(user_input, session_id)
+        )
+        contexto = ensamblar_contexto(docs, MAX_CONTEXT_CHARS)
+
+        # Generación (el historial se guarda al terminar el stream)
+        async for token in conversational_rag_chain.astream(
+            {"input": user_input, "context": contexto},
+            config={"configurable": {"session_id": session_id}}
+        ):
+            if token: yield token
+
+    except Exception as e:
+        print(f"❌ [MOTOR] Error: {e}")
+        yield "Error técnico en el servidor local."
@@ -2,15 +2,29 @@ import os
 import time
 import re
 import sys
+import asyncio
+import threading
 from dotenv import load_dotenv
 
 # --- IMPORTS LIGEROS PARA PRODUCCIÓN ---
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings  # Cambio clave aquí
 from langchain_chroma import Chroma
+from chromadb.api.shared_system_client import SharedSystemClient
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.output_parsers import StrOutputParser
-from langchain_community.chat_message_histories import ChatMessageHistory
+
+from memoria_sesiones import AlmacenSesiones
+from ventana_historial import VentanaHistorial, crear_resumidor_llm
+from cache_respuestas import CacheRespuestas, CacheSemantica, version_corpus
+from deduplicacion import ensamblar_contexto
+from hechos import cargar_hechos
+from llm_grabado import MODO_LLM, MODOS_CON_LLM_REAL, LLMGrabado, crear_embeddings, crear_llm
+from tiempos_etapas import etapa, marcar_ruta
+from indice_numpy import cargar_motor_busqueda
+from recuperacion import RecuperadorHibrido, cargar_bm25
+from programas import detectar_programa, filtro_programa, historial_menciona_programa, programa_de_conversacion, sin_tildes
+from versiones_indice import VigilanteVersiones, ruta_activa
 
 # =============================================================================
 # 0. CONFIGURACIÓN INICIAL
@@ -19,21 +33,63 @@ load_dotenv()
 
 # Usamos la carpeta que generaste con OpenAI
 CARPETA_DB = "chroma_db_prod" 
+# Cada cuánto se revisa si la ingesta publicó una versión nueva del índice (0 = nunca)
+INTERVALO_RECARGA_INDICE_SEG = float(os.getenv("MAURICIA_INTERVALO_RECARGA_SEG", "30"))
+# Tras cambiar de versión, el índice anterior se cierra pasado este margen (peticiones en vuelo)
+GRACIA_CIERRE_INDICE_SEG = float(os.getenv("MAURICIA_GRACIA_CIERRE_INDICE_SEG", "60"))
 # Modelo de OpenAI: rápido, barato y no consume RAM en el servidor
 MODELO_EMBEDDINGS = "text-embedding-3-small"
+# Embeddings de consultas ya vistas (sobrevive reinicios: evita el viaje a OpenAI)
+RUTA_CACHE_EMBEDDINGS = "cache_embeddings_consultas.sqlite3"
+# Motor de búsqueda: "chroma" (por defecto) o "numpy" (matriz en RAM, float32/float16)
+MOTOR_BUSQUEDA = os.getenv("MAURICIA_MOTOR_BUSQUEDA", "chroma")
+DTYPE_INDICE = os.getenv("MAURICIA_DTYPE_INDICE", "float32")
 SESSION_ID = "sesion_usuario_local"  
 
 MAX_CONTEXT_CHARS = 12000  
 K_NORMAL = 4              
 K_DINERO = 10 
+# Con BM25 + vectorial fusionados por RRF, un k chico y bien ordenado reemplaza al k=10
+K_DINERO_HIBRIDO = 5
+K_CANDIDATOS_HIBRIDO = 20  # Candidatos que aporta cada índice antes de fusionar
+
+# Memoria de conversación: acotada para que la RAM del pod no crezca sin límite
+MAX_SESIONES = 1000
+TTL_SESION_SEG = 1800     # 30 min sin actividad -> la sesión se descarta
+MAX_MENSAJES_SESION = 20  # 10 turnos (pregunta + respuesta)
+PRESUPUESTO_HISTORIAL_TOKENS = 1200  # Turnos recientes que viajan literales al prompt
+PRESUPUESTO_RESUMEN_TOKENS = 300     # Tope del resumen de los turnos más antiguos
+
+# Caché de respuestas (se invalida sola cuando se publica otra versión de CARPETA_DB)
+MAX_CACHE_RESPUESTAS = 500
+TTL_CACHE_RESPUESTAS_SEG = 6 * 3600
+# Caché semántica: paráfrasis por similitud coseno (dinero exige más parecido)
+MAX_CACHE_SEMANTICA = 256
+UMBRAL_SEMANTICO = 0.92
+UMBRAL_SEMANTICO_DINERO = 0.96
 
 # =============================================================================
 # 1. LAZY LOADING: VARIABLES GLOBALES
 # =============================================================================
 sistema_cargado = False
 vector_db = None
+recuperador = None
+almacen_hechos = None    # Arancel, duración, contactos por programa (respuesta sin LLM)
+embedding_function = None
 conversational_rag_chain = None
-store = {} 
+llm = None               # ChatOpenAI, o LLMGrabado si MAURICIA_MODO_LLM != "real"
+version_indice = ""      # Versión publicada del índice (invalida las cachés al cambiar)
+ruta_indice = None       # Carpeta abierta por _abrir_indice (para cerrarla al recargar)
+vigilante_indice = None
+store = AlmacenSesiones(MAX_SESIONES, TTL_SESION_SEG, MAX_MENSAJES_SESION)
+cache_respuestas = CacheRespuestas(MAX_CACHE_RESPUESTAS, TTL_CACHE_RESPUESTAS_SEG)
+cache_semantica = CacheSemantica(
+    MAX_CACHE_SEMANTICA,
+    umbral=UMBRAL_SEMANTICO,
+    umbrales_por_intencion={"dinero": UMBRAL_SEMANTICO_DINERO},
+    ttl_segundos=TTL_CACHE_RESPUESTAS_SEG,
+)
+_lock_inicializacion = asyncio.Lock()
 
 # =============================================================================
 # 2. PROMPT DEL SISTEMA (Tu lógica original intacta)
@@ -66,6 +122,7 @@ INYECCION_PROHIBIDA = ["ignora", "ignore", "olvida", "jailbreak", "modo desarrol
 NO_ACADEMICO_KW = ["receta", "cocina", "pizza", "sushi", "chiste", "clima", "piscina", "gym", "casino"]
 SALUDOS_KW = {"hola", "holi", "buenas", "buenos", "dias", "saludos", "hey", "que", "tal", "mauricia"}
 KW_DINERO = ("cuanto", "precio", "valor", "costo", "sale", "arancel", "matricula")
+COBROS_DINERO = ("arancel", "matricula", "colegiatura")
 
 _re_inyeccion = re.compile("|".join(re.escape(x) for x in INYECCION_PROHIBIDA), re.IGNORECASE)
 _re_noacad = re.compile("|".join(re.escape(x) for x in NO_ACADEMICO_KW), re.IGNORECASE)
@@ -82,47 +139,117 @@ def es_consulta_dinero(user_input: str) -> bool:
     return any(k in (user_input or "").lower() for k in KW_DINERO)
 
 def get_session_history(session_id: str):
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
+    return store.obtener(session_id)
 
 # =============================================================================
 # 4. INICIALIZACIÓN LIGERA (OPENAI CLOUD)
 # =============================================================================
+def _abrir_indice(ruta: str):
+    """Abre la colección de `ruta` con el motor configurado, su BM25 y sus hechos."""
+    db = Chroma(persist_directory=ruta, embedding_function=embedding_function)
+    db = cargar_motor_busqueda(db, MOTOR_BUSQUEDA, embedding_function, DTYPE_INDICE)
+    return db, RecuperadorHibrido(db, cargar_bm25(ruta, db), K_CANDIDATOS_HIBRIDO), cargar_hechos(ruta)
+
+def _sistemas_chroma():
+    """
+    Registro carpeta -> System (SQLite, HNSW, hilos) que Chroma comparte entre clientes
+    y no suelta nunca. Dependencia CONOCIDA de un atributo privado: chromadb 1.4 no
+    tiene cómo cerrar un PersistentClient (clear_system_cache() olvida todos los
+    sistemas sin detenerlos y reset() borra los datos), por eso la versión está
+    fijada en requirements.txt. Devuelve None si una actualización lo quitó.
+    """
+    registro = getattr(SharedSystemClient, "_identifier_to_system", None)
+    return registro if isinstance(registro, dict) else None
+
+def _cerrar_indice(ruta: str, hechos):
+    """Libera lo que abrió _abrir_indice(ruta): la conexión de hechos y el sistema de Chroma."""
+    if hechos is not None:
+        hechos.cerrar()
+    sistemas = _sistemas_chroma()
+    if sistemas is None:
+        print("⚠️ [ÍNDICE] Esta versión de chromadb no expone sus sistemas: "
+              f"la versión anterior queda abierta ({ruta}). Revisa el pin en requirements.txt.")
+        return
+    sistema = sistemas.pop(ruta, None)
+    if sistema is not None:
+        sistema.stop()
+    print(f"🧹 [ÍNDICE] Versión anterior cerrada ({ruta}).")
+
+def _recargar_indice(nombre: str, ruta: str):
+    """
+    Llamado por el vigilante cuando la ingesta publica una versión nueva. Se carga
+    y precalienta aparte; recién al final se reemplazan las referencias globales.
+    Las peticiones en vuelo terminan con el recuperador viejo que ya tenían tomado,
+    y ese índice se cierra pasado GRACIA_CIERRE_INDICE_SEG.
+    """
+    global vector_db, recuperador, almacen_hechos, version_indice, ruta_indice
+    print(f"🔄 [ÍNDICE] Cargando versión {nombre}...")
+    inicio = time.perf_counter()
+    nuevo_db, nuevo_recuperador, nuevos_hechos = _abrir_indice(ruta)
+    # Una búsqueda de prueba carga HNSW/BM25 antes de recibir tráfico real
+    nuevo_recuperador.buscar("arancel", embedding_function.embed_query("arancel"), k=1)
+    anterior = (ruta_indice, almacen_hechos)
+    vector_db, recuperador, almacen_hechos = nuevo_db, nuevo_recuperador, nuevos_hechos
+    version_indice, ruta_indice = nombre, ruta
+    print(f"✅ [ÍNDICE] Versión {nombre} activa ({time.perf_counter() - inicio:.1f} s).")
+
+    if anterior[0] is None or anterior[0] == ruta: return
+    if GRACIA_CIERRE_INDICE_SEG > 0:
+        cierre = threading.Timer(GRACIA_CIERRE_INDICE_SEG, _cerrar_indice, anterior)
+        cierre.daemon = True
+        cierre.start()
+    else:
+        _cerrar_indice(*anterior)
+
 def inicializar_sistema():
-    global vector_db, conversational_rag_chain, sistema_cargado
+    global vector_db, recuperador, embedding_function, conversational_rag_chain, sistema_cargado
+    global almacen_hechos, version_indice, vigilante_indice, llm, ruta_indice
     
     print("☁️ Conectando con el cerebro en la nube (OpenAI Mode)...")
     
+    # reproducir/simulado no van a la red: no hace falta token (llm_grabado.py)
     api_key = os.getenv("GITHUB_TOKEN")
-    if not api_key:
+    if not api_key and MODO_LLM in MODOS_CON_LLM_REAL:
         print("❌ Error: GITHUB_TOKEN no configurado.")
         return False
     
     try:
-        # 1. Cargar LLM (GPT-4o mini)
-        llm = ChatOpenAI(
-            base_url=os.getenv("OPENAI_BASE_URL"),
-            model=os.getenv("MODEL_NAME"),
-            api_key=api_key,
-            temperature=0.0,
-            max_tokens=300
+        # 1. Cargar LLM (GPT-4o mini). MAURICIA_MODO_LLM=grabar/reproducir lo envuelve (llm_grabado.py)
+        llm = crear_llm(
+            lambda: ChatOpenAI(
+                base_url=os.getenv("OPENAI_BASE_URL"),
+                model=os.getenv("MODEL_NAME"),
+                api_key=api_key,
+                temperature=0.0,
+                max_tokens=300
+            ),
+            modelo=os.getenv("MODEL_NAME") or "gpt-4o-mini",
+            modo=MODO_LLM,
         )
 
-        # 2. Embeddings de OpenAI (No consumen RAM local)
-        embedding_function = OpenAIEmbeddings(
-            model=MODELO_EMBEDDINGS,
-            api_key=os.getenv("GITHUB_TOKEN"),
-            base_url="https://models.inference.ai.azure.com"
+        # 2. Embeddings de OpenAI (No consumen RAM local), con caché RAM + disco
+        #    (en reproducir, la caché es la grabación y un sustituto cubre lo que falte)
+        embedding_function = crear_embeddings(
+            lambda: OpenAIEmbeddings(
+                model=MODELO_EMBEDDINGS,
+                api_key=api_key,
+                base_url="https://models.inference.ai.azure.com"
+            ),
+            modelo=MODELO_EMBEDDINGS,
+            ruta_cache=RUTA_CACHE_EMBEDDINGS,
+            modo=MODO_LLM,
         )
         
-        # 3. Conectar ChromaDB
+        # 3. Conectar ChromaDB (la versión publicada por la ingesta)
         if os.path.exists(CARPETA_DB):
-            vector_db = Chroma(
-                persist_directory=CARPETA_DB,
-                embedding_function=embedding_function
-            )
-            print("✅ ChromaDB (OpenAI) conectado.")
+            version_indice = version_corpus(CARPETA_DB)
+            ruta_indice = ruta_activa(CARPETA_DB)
+            vector_db, recuperador, almacen_hechos = _abrir_indice(ruta_indice)
+            print(f"✅ ChromaDB (OpenAI) conectado (versión {version_indice or 'sin versión'}).")
+            if INTERVALO_RECARGA_INDICE_SEG > 0 and vigilante_indice is None:
+                vigilante_indice = VigilanteVersiones(
+                    CARPETA_DB, _recargar_indice, INTERVALO_RECARGA_INDICE_SEG, version_inicial=version_indice
+                ).iniciar()
         else:
             print(f"❌ Error: No existe la carpeta {CARPETA_DB}")
             return False
@@ -134,7 +261,20 @@ def inicializar_sistema():
             ("human", "CONTEXTO RECUPERADO:\n{context}\n\nPREGUNTA DEL USUARIO:\n{input}")
         ])
         
-        chain = qa_prompt | llm | StrOutputParser()
+        # El historial pasa primero por la ventana de tokens (turnos viejos -> resumen)
+        resumir, aresumir = crear_resumidor_llm(llm)
+        ventana_historial = VentanaHistorial(
+            presupuesto_tokens=PRESUPUESTO_HISTORIAL_TOKENS,
+            modelo=os.getenv("MODEL_NAME") or "gpt-4o-mini",
+            resumidor=resumir,
+            aresumidor=aresumir,
+            max_sesiones=MAX_SESIONES,
+            presupuesto_resumen=PRESUPUESTO_RESUMEN_TOKENS,
+        )
+        # El resumen muere con la sesión: un id reutilizado no hereda turnos ajenos
+        store.al_descartar = ventana_historial.olvidar
+
+        chain = ventana_historial.como_runnable() | qa_prompt | llm | StrOutputParser()
         
         conversational_rag_chain = RunnableWithMessageHistory(
             chain,
@@ -153,10 +293,8 @@ def inicializar_sistema():
 # =============================================================================
 # 5. OBTENER RESPUESTA (Con Lazy Loading)
 # =============================================================================
-def obtener_respuesta_agente(user_input: str, session_id: str = SESSION_ID) -> str:
-    global sistema_cargado
-    
-    user_input = (user_input or "").strip()
+def _respuesta_directa(user_input: str):
+    """Filtros baratos que responden sin tocar la DB ni el LLM. None = seguir al RAG."""
     if not user_input: return "..."
 
     if _re_inyeccion.search(user_input): return RESP_BLOQUEO
@@ -164,35 +302,253 @@ def obtener_respuesta_agente(user_input: str, session_id: str = SESSION_ID) -> s
     
     if es_saludo_puro(user_input):
         return "¡Hola! Soy MauricIA, tu asistente de Postgrados USACH. ¿Sobre qué programa te gustaría informarte hoy?"
+    return None
+
+def _parametros_busqueda(user_input: str):
+    k_dinero = K_DINERO_HIBRIDO if recuperador is not None and recuperador.hibrido else K_DINERO
+    k_val = k_dinero if es_consulta_dinero(user_input) else K_NORMAL
+    query_search = user_input
+    if es_consulta_dinero(user_input):
+        query_search += " arancel matrícula costo valor"
+    return query_search, k_val
+
+def _armar_contexto(docs) -> str:
+    # Une chunks solapados del mismo documento y omite bloques repetidos (header, footer, contacto)
+    return ensamblar_contexto(docs, MAX_CONTEXT_CHARS)
+
+def _filtro_busqueda(user_input: str, session_id: str):
+    """Filtro por programa (de la pregunta o del historial) para no buscar en todo el corpus."""
+    mensajes = store.obtener(session_id).messages if store.existe(session_id) else []
+    return filtro_programa(programa_de_conversacion(user_input, mensajes))
+
+def _contexto_cache(user_input: str, session_id: str):
+    """
+    Datos para consultar las cachés, o None si no aplican: cuando el historial
+    ya menciona un programa, la misma pregunta puede tener otra respuesta.
+    """
+    if store.existe(session_id) and historial_menciona_programa(store.obtener(session_id).messages):
+        return None
+    dinero = es_consulta_dinero(user_input)
+    programa = detectar_programa(user_input) or ""
+    # La clave semántica es el vector de la búsqueda, y en dinero todas comparten la
+    # expansión " arancel matrícula costo valor": el cobro que nombra la pregunta va en
+    # el grupo, para que "¿cuánto es la matrícula?" nunca calce con "¿cuánto es el arancel?"
+    cobros = [c for c in COBROS_DINERO if c in sin_tildes(user_input).lower()] if dinero else []
+    return {
+        "version": version_indice,
+        "intencion": "dinero" if dinero else "normal",
+        "programa": programa,
+        "grupo": "|".join([programa] + cobros),
+    }
+
+def _registrar_turno(session_id: str, user_input: str, respuesta: str):
+    # Sin pasar por la cadena, el turno igual debe quedar en la conversación
+    historial = store.obtener(session_id)
+    historial.add_user_message(user_input)
+    historial.add_ai_message(respuesta)
+
+def _desde_hechos(user_input: str, session_id: str):
+    """Dato puntual de un programa conocido (arancel, duración, contacto): plantilla, sin búsqueda ni LLM."""
+    if almacen_hechos is None: return None
+    mensajes = store.obtener(session_id).messages if store.existe(session_id) else []
+    respuesta = almacen_hechos.responder(user_input, programa_de_conversacion(user_input, mensajes))
+    if respuesta is not None:
+        _registrar_turno(session_id, user_input, respuesta)
+    return respuesta
+
+def _desde_cache_semantica(ctx, vector_busqueda, user_input: str, session_id: str):
+    if ctx is None: return None
+    respuesta = cache_semantica.buscar(vector_busqueda, ctx["intencion"], ctx["version"], ctx["grupo"])
+    if respuesta is not None:
+        _registrar_turno(session_id, user_input, respuesta)
+    return respuesta
+
+def _desde_cache(ctx, user_input: str, docs, session_id: str):
+    if ctx is None: return None
+    respuesta = cache_respuestas.obtener(cache_respuestas.clave(user_input, docs), ctx["version"])
+    if respuesta is not None:
+        _registrar_turno(session_id, user_input, respuesta)
+    return respuesta
+
+def _guardar_en_cache(ctx, user_input: str, vector_busqueda, docs, respuesta: str):
+    if ctx is None or not respuesta: return
+    cache_respuestas.guardar(cache_respuestas.clave(user_input, docs), ctx["version"], respuesta)
+    cache_semantica.guardar(vector_busqueda, ctx["intencion"], ctx["version"], respuesta, ctx["grupo"])
+
+def estadisticas_cache() -> dict:
+    return {
+        "respuestas": cache_respuestas.estadisticas(),
+        "semantica": cache_semantica.estadisticas(),
+        "embeddings": embedding_function.estadisticas() if embedding_function else {},
+        "hechos": {"respondidas": almacen_hechos.respondidas if almacen_hechos else 0},
+        "llm": llm.estadisticas() if isinstance(llm, LLMGrabado) else {"modo": "real"},
+    }
+
+def obtener_respuesta_agente(user_input: str, session_id: str = SESSION_ID) -> str:
+    global sistema_cargado
+    
+    user_input = (user_input or "").strip()
+    directa = _respuesta_directa(user_input)
+    if directa is not None: return directa
 
     if not sistema_cargado:
         if not inicializar_sistema():
             return "⚠️ El cerebro está teniendo problemas para iniciar. Revisa los logs."
 
     try:
-        k_val = K_DINERO if es_consulta_dinero(user_input) else K_NORMAL
-        query_search = user_input
-        if es_consulta_dinero(user_input):
-            query_search += " arancel matrícula costo valor"
+        # Arancel / duración / contacto de un programa: directo desde los hechos de la ingesta
+        desde_hechos = _desde_hechos(user_input, session_id)
+        if desde_hechos is not None: return desde_hechos
+
+        ctx = _contexto_cache(user_input, session_id)
+
+        # Un solo embedding por consulta: el de la búsqueda, que también es la clave de la caché semántica
+        query_search, k_val = _parametros_busqueda(user_input)
+        vector_busqueda = embedding_function.embed_query(query_search)
+
+        # Paráfrasis de una pregunta ya respondida: ni búsqueda ni LLM
+        cacheada = _desde_cache_semantica(ctx, vector_busqueda, user_input, session_id)
+        if cacheada is not None: return cacheada
 
         # Búsqueda
-        docs = vector_db.similarity_search(query_search, k=k_val)
-        
-        contexto_str = "\n\n".join([d.page_content for d in docs])
-        if len(contexto_str) > MAX_CONTEXT_CHARS:
-            contexto_str = contexto_str[:MAX_CONTEXT_CHARS]
+        docs = recuperador.buscar(query_search, vector_busqueda, k=k_val, filter=_filtro_busqueda(user_input, session_id))
+
+        cacheada = _desde_cache(ctx, user_input, docs, session_id)
+        if cacheada is not None: return cacheada
+
+        contexto_str = _armar_contexto(docs)
 
         # Invocación
         respuesta = conversational_rag_chain.invoke(
             {"input": user_input, "context": contexto_str},
             config={"configurable": {"session_id": session_id}}
         )
+        _guardar_en_cache(ctx, user_input, vector_busqueda, docs, respuesta)
         return respuesta
 
     except Exception as e:
         print(f"Error: {e}")
         return "Lo siento, tuve un problema procesando tu solicitud. ¿Podrías intentar de nuevo?"
 
+# =============================================================================
+# 6. OBTENER RESPUESTA ASÍNCRONA (Para el endpoint async de la API)
+# =============================================================================
+async def _asegurar_sistema_async() -> bool:
+    """Inicializa una sola vez sin bloquear el event loop (la carga es síncrona)."""
+    if sistema_cargado: return True
+    async with _lock_inicializacion:
+        if sistema_cargado: return True
+        return await asyncio.to_thread(inicializar_sistema)
+
+async def _aprerecuperacion(user_input: str, session_id: str):
+    """
+    Etapas previas al LLM en versión async: hechos, caché semántica, búsqueda y caché exacta.
+    Devuelve (respuesta_cacheada, ctx, vector_busqueda, docs).
+    """
+    with etapa("hechos"):
+        desde_hechos = _desde_hechos(user_input, session_id)
+    if desde_hechos is not None:
+        marcar_ruta("hechos")
+        return desde_hechos, None, None, []
+
+    ctx = _contexto_cache(user_input, session_id)
+
+    # Un solo embedding (async) por consulta: el de la búsqueda, que también es la clave de la caché semántica
+    query_search, k_val = _parametros_busqueda(user_input)
+    with etapa("embedding"):
+        vector_busqueda = await embedding_function.aembed_query(query_search)
+    with etapa("cache"):
+        cacheada = _desde_cache_semantica(ctx, vector_busqueda, user_input, session_id)
+    if cacheada is not None:
+        marcar_ruta("cache_semantica")
+        return cacheada, ctx, vector_busqueda, []
+
+    with etapa("busqueda"):
+        docs = await recuperador.abuscar(query_search, vector_busqueda, k=k_val, filter=_filtro_busqueda(user_input, session_id))
+
+    with etapa("cache"):
+        cacheada = _desde_cache(ctx, user_input, docs, session_id)
+    if cacheada is not None: marcar_ruta("cache")
+    return cacheada, ctx, vector_busqueda, docs
+
+async def aobtener_respuesta_agente(user_input: str, session_id: str = SESSION_ID) -> str:
+    """
+    Misma lógica que obtener_respuesta_agente, pero todo el I/O es awaitable:
+    embedding de la query (aembed_query), búsqueda en Chroma y llamada al LLM (ainvoke).
+    Así un solo worker mantiene cientos de consultas en vuelo sin agotar el threadpool.
+    Cada etapa queda medida en tiempos_etapas (la API la devuelve en Server-Timing).
+    """
+    user_input = (user_input or "").strip()
+    directa = _respuesta_directa(user_input)
+    if directa is not None:
+        marcar_ruta("directa")
+        return directa
+
+    with etapa("inicializacion"):
+        listo = await _asegurar_sistema_async()
+    if not listo:
+        marcar_ruta("error")
+        return "⚠️ El cerebro está teniendo problemas para iniciar. Revisa los logs."
+
+    try:
+        cacheada, ctx, vector_busqueda, docs = await _aprerecuperacion(user_input, session_id)
+        if cacheada is not None: return cacheada
+
+        with etapa("contexto"):
+            contexto_str = _armar_contexto(docs)
+
+        # Invocación (incluye la ventana de historial y el armado del prompt)
+        with etapa("llm"):
+            respuesta = await conversational_rag_chain.ainvoke(
+                {"input": user_input, "context": contexto_str},
+                config={"configurable": {"session_id": session_id}}
+            )
+        marcar_ruta("llm")
+        _guardar_en_cache(ctx, user_input, vector_busqueda, docs, respuesta)
+        return respuesta
+
+    except Exception as e:
+        print(f"Error: {e}")
+        marcar_ruta("error")
+        return "Lo siento, tuve un problema procesando tu solicitud. ¿Podrías intentar de nuevo?"
+
+async def astream_respuesta_agente(user_input: str, session_id: str = SESSION_ID):
+    """
+    Versión streaming: entrega los tokens del LLM apenas llegan (para /chat/stream).
+    RunnableWithMessageHistory guarda el mensaje completo en el historial al cerrar el stream.
+    """
+    user_input = (user_input or "").strip()
+    directa = _respuesta_directa(user_input)
+    if directa is not None:
+        yield directa
+        return
+
+    if not await _asegurar_sistema_async():
+        yield "⚠️ El cerebro está teniendo problemas para iniciar. Revisa los logs."
+        return
+
+    try:
+        cacheada, ctx, vector_busqueda, docs = await _aprerecuperacion(user_input, session_id)
+        if cacheada is not None:
+            yield cacheada
+            return
+
+        contexto_str = _armar_contexto(docs)
+
+        partes = []
+        async for token in conversational_rag_chain.astream(
+            {"input": user_input, "context": contexto_str},
+            config={"configurable": {"session_id": session_id}}
+        ):
+            if token:
+                partes.append(token)
+                yield token
+        _guardar_en_cache(ctx, user_input, vector_busqueda, docs, "".join(partes))
+
+    except Exception as e:
+        print(f"Error: {e}")
+        yield "Lo siento, tuve un problema procesando tu solicitud. ¿Podrías intentar de nuevo?"
+
 if __name__ == "__main__":
     print("\n🎓 MAURICIA CLOUD READY")
     while True:
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+
+# =============================================================================
+# MEMORIA DE SESIONES ACOTADA (LRU + TTL + LÍMITE DE MENSAJES)
+# =============================================================================
+# Reemplaza el antiguo `store = {}` que crecía para siempre: en un pod que corre
+# semanas, cada visitante dejaba su historial en RAM y cada prompt arrastraba
+# la conversación completa.
+
+
+class HistorialAcotado(ChatMessageHistory):
+    """ChatMessageHistory que solo conserva los últimos `max_mensajes` mensajes."""
+
+    max_mensajes: int = 20
+    agregados: int = 0  # Mensajes recibidos desde que se creó (numera los mensajes)
+
+    def add_message(self, message) -> None:
+        # Número de orden que no cambia al recortar el inicio: la ventana de
+        # historial lo usa para distinguir turnos idénticos (ventana_historial._huella)
+        if message.id is None:
+            message.id = f"msg-{self.agregados}"
+        self.agregados += 1
+        super().add_message(message)
+        exceso = len(self.messages) - self.max_mensajes
+        if exceso > 0:
+            # Recortamos hasta la siguiente pregunta del usuario para no dejar una
+            # respuesta huérfana al inicio, aunque los mensajes no alternen
+            # (dos respuestas seguidas, un turno sin respuesta...).
+            while exceso < len(self.messages) and self.messages[exceso].type != "human":
+                exceso += 1
+            del self.messages[:exceso]
+
+
+class AlmacenSesiones:
+    """
+    Almacén de historiales por session_id.
+    - LRU: si hay más de `max_sesiones`, se descarta la menos usada.
+    - TTL: una sesión sin actividad por `ttl_segundos` se elimina.
+    - Cada historial guarda como máximo `max_mensajes` mensajes.
+    - `al_descartar(session_id)` se llama cuando una sesión expira, se desaloja o se
+      elimina: lo que otros guardan por session_id (el resumen de VentanaHistorial)
+      debe morir con ella, o el próximo usuario con el mismo id lo heredaría.
+    """
+
+    def __init__(self, max_sesiones: int = 1000, ttl_segundos: float = 1800, max_mensajes: int = 20,
+                 al_descartar=None):
+        self.max_sesiones = max_sesiones
+        self.ttl_segundos = ttl_segundos
+        self.max_mensajes = max_mensajes
+        self.al_descartar = al_descartar
+        self._sesiones = OrderedDict()  # session_id -> (ultimo_acceso, historial)
+        self._lock = threading.Lock()
+
+    def obtener(self, session_id: str) -> HistorialAcotado:
+        ahora = time.monotonic()
+        with self._lock:
+            descartadas = self._purgar_expiradas(ahora)
+
+            entrada = self._sesiones.pop(session_id, None)
+            historial = entrada[1] if entrada else HistorialAcotado(max_mensajes=self.max_mensajes)
+            self._sesiones[session_id] = (ahora, historial)
+
+            while len(self._sesiones) > self.max_sesiones:
+                descartadas.append(self._sesiones.popitem(last=False)[0])
+        self._notificar(descartadas)
+        return historial
+
+    def existe(self, session_id: str) -> bool:
+        with self._lock:
+            descartadas = self._purgar_expiradas(time.monotonic())
+            existe = session_id in self._sesiones
+        self._notificar(descartadas)
+        return existe
+
+    def eliminar(self, session_id: str) -> None:
+        with self._lock:
+            self._sesiones.pop(session_id, None)
+        self._notificar([session_id])
+
+    def purgar_expiradas(self) -> int:
+        with self._lock:
+            descartadas = self._purgar_expiradas(time.monotonic())
+        self._notificar(descartadas)
+        return len(descartadas)
+
+    def _purgar_expiradas(self, ahora: float) -> list:
+        # El OrderedDict está ordenado por último acceso: las expiradas están al inicio.
+        descartadas = []
+        while self._sesiones:
+            session_id, (ultimo_acceso, _) = next(iter(self._sesiones.items()))
+            if ahora - ultimo_acceso < self.ttl_segundos:
+                break
+            del self._sesiones[session_id]
+            descartadas.append(session_id)
+        return descartadas
+
+    def _notificar(self, descartadas: list) -> None:
+        # Fuera del lock: el callback puede tomar sus propios locks
+        if self.al_descartar is None: return
+        for session_id in descartadas:
+            self.al_descartar(session_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sesiones)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.existe(session_id)
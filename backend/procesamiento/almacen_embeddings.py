@@ -0,0 +1,153 @@
+import json
+import os
+import re
+import unicodedata
+
+import numpy as np
+import xxhash
+
+# =============================================================================
+# ALMACÉN DE EMBEDDINGS DIRECCIONADO POR CONTENIDO (MMAP + ÍNDICE XXHASH)
+# =============================================================================
+# Mientras ajustamos chunk_size / chunk_overlap reconstruimos el cerebro una y
+# otra vez, y la mayoría de los chunks son textos que ya embebimos antes. Este
+# almacén guarda cada vector una sola vez, con clave (backend, modelo, texto
+# normalizado), y lo comparten todas las construcciones de índice. El backend
+# va en la ruta: onnx y huggingface cargan el mismo modelo pero sus vectores no
+# son idénticos bit a bit, y no deben mezclarse en un mismo índice.
+#
+#   almacen_embeddings/<backend>/<modelo>/
+#   ├── meta.json       {"backend": ..., "modelo": ..., "dimension": 1536}
+#   ├── vectores.f32    filas float32 contiguas (se leen con np.memmap)
+#   └── claves.bin      xxh3_128 de 16 bytes por fila, en el mismo orden
+#
+# Los dos archivos solo crecen (append). Si una corrida se corta entre uno y
+# otro, al abrir se recortan a la cantidad de filas completas en ambos.
+# Pensado para un solo proceso escritor a la vez (la ingesta).
+
+CARPETA_ALMACEN = os.getenv("MAURICIA_ALMACEN_EMBEDDINGS", "almacen_embeddings")
+TAM_CLAVE = 16
+
+
+def normalizar_texto(texto: str) -> str:
+    """NFC y espacios colapsados: el mismo chunk con otro salto de línea no se re-embebe."""
+    return " ".join(unicodedata.normalize("NFC", texto).split())
+
+
+def _nombre_seguro(modelo: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", modelo)
+
+
+class AlmacenEmbeddings:
+    """Vectores por (backend, modelo, texto normalizado), con lectura vía memoria mapeada."""
+
+    def __init__(self, modelo: str, backend: str, carpeta: str = CARPETA_ALMACEN):
+        self.modelo = modelo
+        self.backend = backend
+        self.carpeta = os.path.join(carpeta, _nombre_seguro(backend), _nombre_seguro(modelo))
+        os.makedirs(self.carpeta, exist_ok=True)
+        self._ruta_meta = os.path.join(self.carpeta, "meta.json")
+        self._ruta_vectores = os.path.join(self.carpeta, "vectores.f32")
+        self._ruta_claves = os.path.join(self.carpeta, "claves.bin")
+
+        self.dimension = None
+        if os.path.exists(self._ruta_meta):
+            with open(self._ruta_meta, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("backend", backend) != backend:
+                raise ValueError(f"{self.carpeta} tiene vectores del backend '{meta['backend']}', no de '{backend}'.")
+            self.dimension = meta["dimension"]
+
+        self._filas = {}  # clave (16 bytes) -> fila en vectores.f32
+        self._mapa = None
+        self._cargar_indice()
+        self.aciertos = 0
+        self.fallos = 0
+
+    # --- Persistencia ---------------------------------------------------------
+    def _cargar_indice(self) -> None:
+        if self.dimension is None:
+            return
+        claves = b""
+        if os.path.exists(self._ruta_claves):
+            with open(self._ruta_claves, "rb") as f:
+                claves = f.read()
+        tam_vectores = os.path.getsize(self._ruta_vectores) if os.path.exists(self._ruta_vectores) else 0
+        filas = min(len(claves) // TAM_CLAVE, tam_vectores // (4 * self.dimension))
+
+        # Recuperación tras un corte: se descarta la cola que no está completa en ambos archivos
+        if len(claves) != filas * TAM_CLAVE:
+            with open(self._ruta_claves, "r+b") as f:
+                f.truncate(filas * TAM_CLAVE)
+        if tam_vectores != filas * 4 * self.dimension:
+            with open(self._ruta_vectores, "r+b") as f:
+                f.truncate(filas * 4 * self.dimension)
+
+        for fila in range(filas):
+            self._filas[claves[fila * TAM_CLAVE:(fila + 1) * TAM_CLAVE]] = fila
+
+    def _matriz(self):
+        # El memmap se reabre cuando crece el archivo (las filas nuevas no se ven en el viejo)
+        if self._mapa is None or len(self._mapa) < len(self._filas):
+            self._mapa = np.memmap(self._ruta_vectores, dtype=np.float32, mode="r").reshape(-1, self.dimension)
+        return self._mapa
+
+    def clave(self, texto: str) -> bytes:
+        return xxhash.xxh3_128_digest(f"{self.modelo}\x00{normalizar_texto(texto)}".encode("utf-8"))
+
+    def __len__(self) -> int:
+        return len(self._filas)
+
+    # --- Lectura / escritura --------------------------------------------------
+    def obtener(self, textos: list) -> dict:
+        """Devuelve {texto: vector} para los textos que ya estaban en el almacén."""
+        encontrados = {}
+        if not self._filas:
+            self.fallos += len(textos)
+            return encontrados
+        matriz = self._matriz()
+        for texto in textos:
+            fila = self._filas.get(self.clave(texto))
+            if fila is None:
+                self.fallos += 1
+                continue
+            encontrados[texto] = matriz[fila].tolist()
+            self.aciertos += 1
+        return encontrados
+
+    def guardar(self, textos: list, vectores: list) -> None:
+        nuevos = {}
+        for texto, vector in zip(textos, vectores):
+            clave = self.clave(texto)
+            if clave not in self._filas:
+                nuevos[clave] = vector
+        if not nuevos:
+            return
+
+        bloque = np.asarray(list(nuevos.values()), dtype=np.float32)
+        if self.dimension is None:
+            self.dimension = int(bloque.shape[1])
+            with open(self._ruta_meta, "w", encoding="utf-8") as f:
+                json.dump({"backend": self.backend, "modelo": self.modelo, "dimension": self.dimension}, f)
+        elif bloque.shape[1] != self.dimension:
+            raise ValueError(f"Dimensión {bloque.shape[1]} distinta a la del almacén ({self.dimension}).")
+
+        # Primero los vectores y después las claves: una clave nunca apunta a una fila incompleta
+        with open(self._ruta_vectores, "ab") as f:
+            f.write(bloque.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._ruta_claves, "ab") as f:
+            f.write(b"".join(nuevos))
+        inicio = len(self._filas)
+        for i, clave in enumerate(nuevos):
+            self._filas[clave] = inicio + i
+
+    def estadisticas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "vectores": len(self._filas),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,60 @@
+import importlib.util
+import os
+
+# =============================================================================
+# BACKENDS DE EMBEDDINGS PARA LA INGESTA
+# =============================================================================
+# Los scripts de ingesta solo se diferenciaban en esto: qué clase de embeddings
+# usaban. Ahora el pipeline pide el backend por nombre y el resto (carga,
+# limpieza, chunking, almacén de vectores, paralelismo) es el mismo código.
+#
+#   openai       text-embedding-3-* vía GitHub Models (API, sin RAM local)
+#   huggingface  sentence-transformers sobre torch (CPU/GPU local)
+#   onnx         el mismo modelo de sentence-transformers sobre onnxruntime:
+#                más rápido en CPU (requiere sentence-transformers >= 3.2 y
+#                optimum[onnxruntime]). El modelo es equivalente al de
+#                "huggingface", pero los vectores no son idénticos bit a bit:
+#                cambiar de backend re-embebe todo en un almacén aparte.
+#
+# Los imports son perezosos: el perfil prod no necesita torch y los locales no
+# necesitan API key.
+
+
+def _openai(modelo: str):
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(
+        model=modelo,
+        api_key=os.getenv("GITHUB_TOKEN"),
+        base_url="https://models.inference.ai.azure.com"
+    )
+
+
+def _huggingface(modelo: str):
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=modelo)
+
+
+def _onnx(modelo: str):
+    # Sin optimum, sentence-transformers falla recién al cargar el modelo y con un error confuso
+    if importlib.util.find_spec("optimum") is None:
+        raise RuntimeError(
+            "El backend 'onnx' necesita optimum con onnxruntime: pip install \"optimum[onnxruntime]\" "
+            "(o usa --backend huggingface: el mismo modelo sobre torch, aunque sus vectores no son "
+            "idénticos bit a bit y se embebe todo de nuevo en un almacén aparte)."
+        )
+    from langchain_huggingface import HuggingFaceEmbeddings
+    # HuggingFaceEmbeddings pasa model_kwargs a SentenceTransformer(...)
+    return HuggingFaceEmbeddings(model_name=modelo, model_kwargs={"backend": "onnx"})
+
+
+BACKENDS = {
+    "openai": _openai,
+    "huggingface": _huggingface,
+    "onnx": _onnx,
+}
+
+
+def crear_embeddings(backend: str, modelo: str):
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de embeddings desconocido: {backend} (disponibles: {', '.join(BACKENDS)})")
+    return BACKENDS[backend](modelo)
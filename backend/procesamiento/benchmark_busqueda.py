@@ -0,0 +1,91 @@
+import argparse
+import time
+
+import numpy as np
+from langchain_chroma import Chroma
+
+from indice_numpy import IndiceNumpy
+from versiones_indice import ruta_activa
+
+# =============================================================================
+# BENCHMARK: CHROMA vs ÍNDICE NUMPY EN MEMORIA
+# =============================================================================
+# Mide solo la búsqueda (sin el viaje de red del embedding): las consultas son
+# embeddings ya guardados en la colección, con un poco de ruido para que no
+# sean idénticos a un chunk. No necesita internet ni API keys.
+#
+# Uso (desde backend/):
+#   python -m procesamiento.benchmark_busqueda --db chroma_db_prod --k 4 --n 300
+
+
+def percentil(valores, p):
+    return float(np.percentile(np.asarray(valores), p)) * 1000  # ms
+
+
+def medir(nombre, buscar, consultas, k):
+    buscar(consultas[0], k)  # Calentamiento (carga perezosa de HNSW, caches, etc.)
+    tiempos, resultados = [], []
+    for q in consultas:
+        inicio = time.perf_counter()
+        docs = buscar(q, k)
+        tiempos.append(time.perf_counter() - inicio)
+        resultados.append([d.id for d in docs])
+    print(
+        f"{nombre:<18} | p50 {percentil(tiempos, 50):7.3f} ms | "
+        f"p95 {percentil(tiempos, 95):7.3f} ms | p99 {percentil(tiempos, 99):7.3f} ms"
+    )
+    return tiempos, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la latencia de búsqueda Chroma vs NumPy.")
+    parser.add_argument("--db", default="chroma_db_prod", help="Carpeta base del índice (se abre la versión activa)")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--n", type=int, default=300, help="Cantidad de consultas")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    ruta = ruta_activa(args.db)
+    print(f"📂 Abriendo colección: {ruta}")
+    vector_db = Chroma(persist_directory=ruta)
+
+    inicio = time.perf_counter()
+    indice32 = IndiceNumpy.desde_chroma(vector_db, dtype="float32")
+    carga = time.perf_counter() - inicio
+    indice16 = IndiceNumpy.desde_chroma(vector_db, dtype="float16")
+    if not len(indice32):
+        print("❌ La colección está vacía.")
+        return
+
+    print(f"   - {len(indice32)} chunks, dimensión {indice32.matriz.shape[1]}, carga NumPy {carga * 1000:.1f} ms")
+    print(f"   - RAM matriz: float32 {indice32.matriz.nbytes / 1e6:.2f} MB | float16 {indice16.matriz.nbytes / 1e6:.2f} MB")
+
+    rng = np.random.default_rng(args.semilla)
+    filas = rng.integers(0, len(indice32), size=args.n)
+    base = indice32.matriz[filas]
+    ruido = rng.normal(0, np.std(base) * 0.3, size=base.shape).astype(np.float32)
+    consultas = (base + ruido).tolist()
+
+    print(f"\n⏱️  {args.n} búsquedas top-{args.k}:")
+    print("-" * 72)
+    t_chroma, r_chroma = medir(
+        "Chroma (HNSW)", lambda q, k: vector_db.similarity_search_by_vector(q, k=k), consultas, args.k
+    )
+    t_np32, r_np32 = medir(
+        "NumPy float32", lambda q, k: indice32.similarity_search_by_vector(q, k=k), consultas, args.k
+    )
+    _, r_np16 = medir(
+        "NumPy float16", lambda q, k: indice16.similarity_search_by_vector(q, k=k), consultas, args.k
+    )
+    print("-" * 72)
+
+    def coincidencia(a, b):
+        return np.mean([len(set(x) & set(y)) / max(len(x), 1) for x, y in zip(a, b)])
+
+    print(f"🎯 Coincidencia top-{args.k} con Chroma: float32 {coincidencia(r_np32, r_chroma):.1%} | "
+          f"float16 {coincidencia(r_np16, r_chroma):.1%}")
+    print(f"🚀 Aceleración p50 (float32 vs Chroma): {np.median(t_chroma) / np.median(t_np32):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
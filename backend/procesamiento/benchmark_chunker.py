@@ -0,0 +1,95 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+from deduplicacion import ensamblar_contexto
+from indice_bm25 import IndiceBM25
+from procesamiento.dataset_para_test import CASOS_PRUEBA
+from procesamiento.embedder_lotes import TAM_LOTE
+from procesamiento.pipeline_ingesta import CARPETA_DATA, CHUNKERS, PERFILES, crear_splitter, dividir, documentos
+
+# =============================================================================
+# BENCHMARK: SPLITTER RECURSIVO vs CHUNKER ESTRUCTURAL
+# =============================================================================
+# Divide data/ con los dos chunkers y compara lo que cuesta indexar (chunks,
+# caracteres, inflación por solape, llamadas de embeddings) y lo que cuesta
+# responder: tamaño del contexto top-k para las preguntas de CASOS_PRUEBA y
+# cuántas de sus palabras esperadas (debe_contener) trae ese contexto.
+# La búsqueda es BM25 sobre los chunks: no necesita internet ni API keys.
+#
+# Uso (desde backend/):
+#   python -m procesamiento.benchmark_chunker --chunk-size 1500
+
+MAX_CONTEXT_CHARS = 12000  # El mismo tope que mauricia_v3
+K_NORMAL = 4
+K_DINERO = 5
+EXPANSION_DINERO = " arancel matrícula costo valor"
+
+
+def medir_chunker(nombre, splitter, docs, k_normal, k_dinero) -> dict:
+    inicio = time.perf_counter()
+    chunks = list(dividir(docs, splitter))
+    segundos = time.perf_counter() - inicio
+
+    indice = IndiceBM25.construir(
+        [str(i) for i in range(len(chunks))], [c.page_content for c in chunks], [c.metadata for c in chunks]
+    )
+    largos_contexto, cobertura = [], []
+    for caso in CASOS_PRUEBA:
+        dinero = caso["tipo"] == "dinero"
+        query = caso["pregunta"] + (EXPANSION_DINERO if dinero else "")
+        top = [chunks[int(i)] for i, _ in indice.buscar(query, k_dinero if dinero else k_normal)]
+        contexto = ensamblar_contexto(top, MAX_CONTEXT_CHARS)
+        largos_contexto.append(len(contexto))
+        esperadas = caso["debe_contener"]
+        cobertura.append(sum(p.lower() in contexto.lower() for p in esperadas) / max(len(esperadas), 1))
+
+    caracteres = sum(len(c.page_content) for c in chunks)
+    return {
+        "nombre": nombre,
+        "chunks": len(chunks),
+        "caracteres": caracteres,
+        "llamadas_embeddings": math.ceil(len(chunks) / TAM_LOTE),
+        "ms_division": segundos * 1000,
+        "contexto_medio": float(np.mean(largos_contexto)),
+        "contexto_p95": float(np.percentile(largos_contexto, 95)),
+        "cobertura": float(np.mean(cobertura)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el splitter recursivo con el chunker estructural.")
+    parser.add_argument("--data", default=CARPETA_DATA)
+    parser.add_argument("--chunk-size", type=int, default=1500)
+    parser.add_argument("--k", type=int, default=K_NORMAL)
+    parser.add_argument("--k-dinero", type=int, default=K_DINERO)
+    args = parser.parse_args()
+
+    docs = list(documentos(args.data, PERFILES["prod"]))
+    base = sum(len(d.page_content) for d in docs)
+    print(f"📂 {len(docs)} documentos, {base} caracteres, {len(CASOS_PRUEBA)} casos de prueba\n")
+
+    # El recursivo primero: es la línea base contra la que se compara
+    resultados = [
+        medir_chunker(nombre, crear_splitter(nombre, args.chunk_size), docs, args.k, args.k_dinero)
+        for nombre in sorted(CHUNKERS, reverse=True)
+    ]
+
+    print(f"{'Chunker':<16} | {'chunks':>6} | {'inflación':>9} | {'lotes emb.':>10} | {'división':>9} | "
+          f"{'contexto medio':>14} | {'contexto p95':>12} | {'cobertura':>9}")
+    print("-" * 108)
+    for r in resultados:
+        print(f"{r['nombre']:<16} | {r['chunks']:>6} | {r['caracteres'] / base - 1:>9.1%} | "
+              f"{r['llamadas_embeddings']:>10} | {r['ms_division']:>6.1f} ms | {r['contexto_medio']:>14.0f} | "
+              f"{r['contexto_p95']:>12.0f} | {r['cobertura']:>9.1%}")
+
+    antes, despues = resultados
+    print(f"\n📉 Chunks: {antes['chunks']} -> {despues['chunks']} | caracteres a embeber: "
+          f"{antes['caracteres']} -> {despues['caracteres']} | contexto medio: "
+          f"{antes['contexto_medio']:.0f} -> {despues['contexto_medio']:.0f} caracteres")
+
+
+if __name__ == "__main__":
+    main()
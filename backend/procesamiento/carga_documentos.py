@@ -0,0 +1,142 @@
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
+
+from procesamiento.metadatos import metadatos_markdown, metadatos_pdf
+from programas import sin_tildes
+
+# =============================================================================
+# CARGA Y LIMPIEZA DE DOCUMENTOS EN UN POOL DE PROCESOS
+# =============================================================================
+# DirectoryLoader parseaba los PDFs de a uno y pypdf es CPU puro: con el
+# catálogo completo de mallas, el parseo dominaba el tiempo de construcción.
+# Aquí cada archivo (lectura + limpiar_texto_maestro + header + metadata) se
+# procesa en un pool de procesos. Los resultados salen en el mismo orden de los
+# archivos, apenas están listos, con su tiempo, y un archivo roto no aborta el
+# resto: queda reportado como error.
+
+PROCESOS_CARGA = int(os.getenv("MAURICIA_PROCESOS_CARGA", "0")) or os.cpu_count() or 1
+EXTENSIONES = (".md", ".pdf")
+
+ETIQUETAS_PROGRAMA = {
+    "doctorado": "DOCTORADO EN CIENCIAS DE LA INGENIERÍA, MENCIÓN INFORMÁTICA",
+    "magister": "MAGÍSTER EN INGENIERÍA INFORMÁTICA",
+}
+
+
+class ResultadoCarga(NamedTuple):
+    ruta: str
+    documentos: list
+    segundos: float
+    error: str = ""
+
+
+def limpiar_texto_maestro(texto):
+    """
+    Combina la función de precios con la limpieza de basura web.
+    """
+    # 1. ELIMINAR BASURA (Trackers de Twitter/Pixels que confunden a la IA)
+    patron_basura = r'(?i)(events=%5B%5B%22pageview|tw_document_href=|integration=advertiser|p_id=Twitter).*'
+    texto = re.sub(patron_basura, '', texto)
+
+    # 2. UNIR PRECIOS (juntar "Arancel" con "$ Valor" de la línea siguiente)
+    patron_precio = r'(?i)(.*(?:arancel|matr[ií]cula|costo|valor).*?)\n\s*(\$\s*.*)'
+    texto = re.sub(patron_precio, r'\1: \2', texto)
+
+    return texto
+
+
+def listar_archivos(carpeta: str) -> list:
+    """Markdown primero y después PDFs (el mismo orden que usaban los DirectoryLoader)."""
+    nombres = sorted(os.listdir(carpeta))
+    return [
+        os.path.join(carpeta, n)
+        for ext in EXTENSIONES for n in nombres
+        if n.lower().endswith(ext) and os.path.isfile(os.path.join(carpeta, n))
+    ]
+
+
+def _preparar_markdown(ruta: str) -> list:
+    docs = TextLoader(ruta, encoding="utf-8").load()
+    for doc in docs:
+        doc.page_content = limpiar_texto_maestro(doc.page_content)
+        doc.page_content = f"CONTEXTO WEB USACH (CRAWLER):\n{doc.page_content}"
+        doc.metadata.update(metadatos_markdown(doc.metadata.get('source', ''), doc.page_content))
+    return docs
+
+
+def _preparar_pdf(ruta: str, urls_por_programa: dict, etiquetas: dict) -> list:
+    docs = PyPDFLoader(ruta).load()
+    for doc in docs:
+        nombre_archivo = doc.metadata.get('source', '').lower()
+        etiqueta_programa = "PROGRAMA DESCONOCIDO"
+        url_descarga = "No disponible"
+        for clave, etiqueta in etiquetas.items():
+            if clave in sin_tildes(nombre_archivo):
+                etiqueta_programa = etiqueta
+                url_descarga = urls_por_programa.get(clave, "No disponible")
+                break
+
+        doc.page_content = limpiar_texto_maestro(doc.page_content)
+        header = (
+            f"DOCUMENTO OFICIAL/MALLA (PDF) DEL: {etiqueta_programa}.\n"
+            f"📥 PUEDES DESCARGAR EL PDF AQUÍ: {url_descarga}\n"
+            f"--------------------------------------------------\n"
+        )
+        doc.page_content = header + doc.page_content
+        doc.metadata.update(metadatos_pdf(nombre_archivo, url_descarga))
+    return docs
+
+
+def procesar_archivo(ruta: str, urls_por_programa: dict, etiquetas: dict) -> ResultadoCarga:
+    """Corre dentro del worker: nunca lanza excepciones, las devuelve en `error`."""
+    inicio = time.perf_counter()
+    try:
+        if ruta.lower().endswith(".pdf"):
+            docs = _preparar_pdf(ruta, urls_por_programa, etiquetas)
+        else:
+            docs = _preparar_markdown(ruta)
+        return ResultadoCarga(ruta, docs, time.perf_counter() - inicio)
+    except Exception as e:
+        return ResultadoCarga(ruta, [], time.perf_counter() - inicio, f"{type(e).__name__}: {e}")
+
+
+def cargar_documentos(carpeta: str, urls_por_programa: dict, etiquetas: dict = None,
+                      procesos: int = PROCESOS_CARGA, omitir=()):
+    """
+    Generador de ResultadoCarga, uno por archivo y en orden. Mantiene como máximo
+    2 × procesos archivos en vuelo, así la memoria no crece con el tamaño del corpus.
+    `omitir`: rutas que no se cargan (las que la ingesta incremental sabe sin cambios).
+    """
+    etiquetas = ETIQUETAS_PROGRAMA if etiquetas is None else etiquetas
+    archivos = [ruta for ruta in listar_archivos(carpeta) if ruta not in omitir]
+    en_vuelo = max(1, procesos) * 2
+    inicio = time.perf_counter()
+    errores = 0
+
+    with ProcessPoolExecutor(max_workers=max(1, procesos)) as pool:
+        pendientes = deque()
+        for ruta in archivos:
+            pendientes.append(pool.submit(procesar_archivo, ruta, urls_por_programa, etiquetas))
+            if len(pendientes) >= en_vuelo:
+                errores += yield from _entregar(pendientes.popleft().result())
+        while pendientes:
+            errores += yield from _entregar(pendientes.popleft().result())
+
+    print(f"   - [CARGA] {len(archivos)} archivos en {time.perf_counter() - inicio:.1f} s "
+          f"({procesos} procesos, {errores} con error).")
+
+
+def _entregar(resultado: ResultadoCarga):
+    nombre = os.path.basename(resultado.ruta)
+    if resultado.error:
+        print(f"   ⚠️ [CARGA] {nombre}: {resultado.error}")
+    else:
+        print(f"   - [CARGA] {nombre}: {len(resultado.documentos)} docs en {resultado.segundos * 1000:.0f} ms")
+    yield resultado
+    return 1 if resultado.error else 0
@@ -0,0 +1,238 @@
+import re
+from typing import NamedTuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from procesamiento.metadatos import limpiar_titulo
+
+# =============================================================================
+# CHUNKER ESTRUCTURAL (MARKDOWN Y MALLAS EN PDF)
+# =============================================================================
+# RecursiveCharacterTextSplitter corta por caracteres: la tabla de aranceles o
+# el listado de asignaturas de un semestre quedaban partidos en dos chunks, y
+# el chunk_overlap=400 que se agregó para tapar eso inflaba el corpus ~35%.
+#
+# Aquí el texto se recorre una sola vez y se divide en bloques (encabezado,
+# párrafo, lista, tabla). Los chunks se arman juntando bloques enteros:
+#   - una tabla o una lista nunca se corta si cabe en un chunk;
+#   - un encabezado abre chunk nuevo si el actual ya va por la mitad del tamaño,
+#     y nunca queda huérfano al final de un chunk;
+#   - cada chunk lleva la ruta de secciones ("Doctorado ... > ARANCEL").
+# Como los cortes caen entre bloques, no hace falta solape (chunk_overlap=0).
+#
+# Los PDF de mallas llegan de pypdf con una celda por línea; antes de dividir
+# se reconstruyen como markdown (título, "### Semestre N" y tablas con filas).
+# start_index apunta al texto que se dividió, como en el splitter de LangChain.
+
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 0
+MIN_LLENADO = 0.5  # Fracción de chunk_size desde la que un encabezado corta el chunk
+SEPARADOR_RUTA = " > "
+MAX_COLUMNAS_PDF = 6
+
+_re_encabezado = re.compile(r"^[ \t]*(?:[*+-][ \t]+)?(#{1,6})[ \t]+(.*?)[ \t#]*$")
+_re_tabla = re.compile(r"^[ \t]*\|")
+_re_item = re.compile(r"^[ \t]*(?:[*+-]|\d+[.)])[ \t]+")
+_re_codigo_asignatura = re.compile(r"^[A-ZÁÉÍÓÚ]{2,6}-?\d{2,4}[A-Z]?$")
+_re_subtitulo_pdf = re.compile(r"^(?:semestre|año|nivel|trimestre|módulo)\s+\w+", re.IGNORECASE)
+_re_titulo_pdf = re.compile(r"^(?:malla|plan de estudios)\b", re.IGNORECASE)
+_re_pagina_pdf = re.compile(r"^página\s+\d+$", re.IGNORECASE)
+
+
+class Bloque(NamedTuple):
+    inicio: int
+    fin: int
+    tipo: str  # "encabezado", "parrafo", "lista" o "tabla"
+    ruta: tuple = ()  # Ruta de secciones vigente en el bloque: ((nivel, título), ...)
+
+
+# --- PDF -> markdown --------------------------------------------------------------
+def _tabla_pdf(lineas: list, i: int):
+    """Tabla de una celda por línea que empieza en lineas[i]: (filas markdown, siguiente línea) o (None, i)."""
+    j = i
+    while (j < len(lineas) and j - i < MAX_COLUMNAS_PDF and lineas[j] and len(lineas[j]) <= 25
+           and not any(c.isdigit() for c in lineas[j])):
+        j += 1
+    columnas = j - i
+    if columnas < 2 or j >= len(lineas) or not _re_codigo_asignatura.match(lineas[j]):
+        return None, i
+
+    filas = []
+    while (j + columnas <= len(lineas) and _re_codigo_asignatura.match(lineas[j])
+           and not any(_re_codigo_asignatura.match(c) for c in lineas[j + 1:j + columnas])):
+        filas.append(lineas[j:j + columnas])
+        j += columnas
+    salida = ["| " + " | ".join(lineas[i:i + columnas]) + " |", "|" + "---|" * columnas]
+    salida += ["| " + " | ".join(fila) + " |" for fila in filas]
+    return salida, j
+
+
+def pdf_a_markdown(texto: str) -> str:
+    lineas = [l.strip() for l in texto.splitlines()]
+    salida = []
+    i = 0
+    while i < len(lineas):
+        linea = lineas[i]
+        if not linea or _re_pagina_pdf.match(linea):
+            i += 1
+            continue
+        tabla, i_siguiente = _tabla_pdf(lineas, i)
+        if tabla:
+            salida += tabla + [""]
+            i = i_siguiente
+            continue
+        if _re_titulo_pdf.match(linea):
+            salida.append(("# " if linea.lower().startswith("malla") else "## ") + linea)
+        elif _re_subtitulo_pdf.match(linea):
+            salida.append("### " + linea)
+        else:
+            salida.append(linea)
+        i += 1
+    return "\n".join(salida).strip() + "\n"
+
+
+# --- Bloques ------------------------------------------------------------------
+def bloques_markdown(texto: str) -> list:
+    """Recorre el texto una vez y devuelve sus bloques con la ruta de secciones de cada uno."""
+    bloques = []
+    ruta = ()
+    actual = None  # [inicio, fin, tipo]
+    pos = 0
+
+    def cerrar():
+        if actual:
+            bloques.append(Bloque(actual[0], actual[1], actual[2], ruta))
+
+    for linea in texto.splitlines(keepends=True):
+        contenido = linea.rstrip("\r\n")
+        inicio, fin = pos, pos + len(contenido)
+        pos += len(linea)
+        if not contenido.strip():
+            cerrar()
+            actual = None
+            continue
+
+        m = _re_encabezado.match(contenido)
+        if m:
+            cerrar()
+            actual = None
+            nivel = len(m.group(1))
+            ruta = tuple(r for r in ruta if r[0] < nivel) + ((nivel, limpiar_titulo(m.group(2))),)
+            bloques.append(Bloque(inicio, fin, "encabezado", ruta))
+            continue
+
+        tipo = "tabla" if _re_tabla.match(contenido) else "lista" if _re_item.match(contenido) else "parrafo"
+        continua = actual is not None and (
+            actual[2] == tipo or (actual[2] == "lista" and tipo == "parrafo" and contenido[:1] in " \t")
+        )
+        if continua:
+            actual[1] = fin
+        else:
+            cerrar()
+            actual = [inicio, fin, tipo]
+    cerrar()
+    return bloques
+
+
+def texto_ruta(ruta: tuple) -> str:
+    return SEPARADOR_RUTA.join(titulo for _, titulo in ruta if titulo)
+
+
+class ChunkerEstructural:
+    """Reemplazo de RecursiveCharacterTextSplitter (misma interfaz split_documents)."""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        # Solo para bloques sueltos más grandes que un chunk (un párrafo enorme)
+        self._respaldo = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=0, separators=["\n", ". ", " ", ""], keep_separator="end",
+            add_start_index=True,
+        )
+
+    # --- Bloques demasiado grandes ------------------------------------------
+    def _partir(self, texto: str, bloque: Bloque) -> list:
+        """Divide un bloque más grande que chunk_size: tablas por fila, listas por ítem, párrafos por frase."""
+        if bloque.fin - bloque.inicio <= self.chunk_size:
+            return [bloque]
+        piezas = []
+        if bloque.tipo in ("tabla", "lista"):
+            pos = bloque.inicio
+            for linea in texto[bloque.inicio:bloque.fin].splitlines(keepends=True):
+                fin = pos + len(linea.rstrip("\r\n"))
+                nueva_pieza = bloque.tipo == "tabla" or _re_item.match(linea)
+                if piezas and not nueva_pieza:
+                    piezas[-1] = piezas[-1]._replace(fin=fin)  # Continuación del ítem anterior
+                else:
+                    piezas.append(bloque._replace(inicio=pos, fin=fin))
+                pos += len(linea)
+        else:
+            piezas = [bloque]
+
+        resultado = []
+        for pieza in piezas:
+            if pieza.fin - pieza.inicio <= self.chunk_size:
+                resultado.append(pieza)
+                continue
+            for doc in self._respaldo.create_documents([texto[pieza.inicio:pieza.fin]]):
+                inicio = pieza.inicio + doc.metadata["start_index"]
+                resultado.append(pieza._replace(inicio=inicio, fin=inicio + len(doc.page_content)))
+        return resultado
+
+    # --- Armado de chunks -----------------------------------------------------
+    def _solape(self, bloques: list, siguiente: Bloque) -> list:
+        """Bloques completos del final que entran en chunk_overlap (y dejan espacio al siguiente)."""
+        solape = []
+        for previo in reversed(bloques):
+            if (previo.tipo == "encabezado" or bloques[-1].fin - previo.inicio > self.chunk_overlap
+                    or siguiente.fin - previo.inicio > self.chunk_size):
+                break
+            solape.insert(0, previo)
+        return solape
+
+    def tramos(self, texto: str) -> list:
+        """Lista de (inicio, fin, ruta) de cada chunk del texto."""
+        tramos = []
+        actual = []  # Bloques del chunk en curso
+
+        def emitir(bloques):
+            if bloques:
+                tramos.append((bloques[0].inicio, bloques[-1].fin, bloques[0].ruta))
+
+        for grande in bloques_markdown(texto):
+            for bloque in self._partir(texto, grande):
+                largo = actual[-1].fin - actual[0].inicio if actual else 0
+                if bloque.tipo == "encabezado" and actual and actual[-1].tipo != "encabezado" \
+                        and largo >= MIN_LLENADO * self.chunk_size:
+                    emitir(actual)
+                    actual = []
+                elif actual and bloque.fin - actual[0].inicio > self.chunk_size:
+                    # Los encabezados del final pasan al chunk siguiente (nunca quedan huérfanos)
+                    corte = len(actual)
+                    while corte > 0 and actual[corte - 1].tipo == "encabezado":
+                        corte -= 1
+                    if corte > 0:  # Si solo hay encabezados, se toleran unos caracteres de más
+                        emitir(actual[:corte])
+                        actual = self._solape(actual[:corte], bloque) + actual[corte:]
+                actual.append(bloque)
+        emitir(actual)
+        return tramos
+
+    def split_documents(self, documentos) -> list:
+        chunks = []
+        for documento in documentos:
+            es_pdf = documento.metadata.get("tipo_fuente") == "pdf"
+            texto = pdf_a_markdown(documento.page_content) if es_pdf else documento.page_content
+            for inicio, fin, ruta in self.tramos(texto):
+                metadata = dict(documento.metadata)
+                metadata["start_index"] = inicio
+                metadata["ruta_seccion"] = texto_ruta(ruta)
+                seccion = ruta[-1][1] if ruta else ""
+                if es_pdf:
+                    pagina = f"página {int(metadata.get('page', 0)) + 1}"
+                    metadata["seccion"] = f"{pagina} - {seccion}" if seccion else pagina
+                else:
+                    metadata["seccion"] = seccion or "general"
+                chunks.append(Document(page_content=texto[inicio:fin], metadata=metadata))
+        return chunks
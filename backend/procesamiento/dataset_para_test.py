@@ -1,6 +1,9 @@
 # dataset.py
 # Conjunto de datos de evaluación para optimización con Optuna.
 # IMPORTANTE: Asegúrate de que las palabras en "debe_contener" realmente existan en tus PDFs.
+# "fuentes_esperadas": dónde está la respuesta (archivo de data/ + un fragmento literal del
+# texto). No depende del chunking: evaluacion_recuperacion marca como relevante cualquier
+# chunk de ese archivo que contenga el fragmento.
 
 CASOS_PRUEBA = [
     # =========================================
@@ -11,30 +14,41 @@ CASOS_PRUEBA = [
         "pregunta": "¿Cuál es el arancel anual del Doctorado en Informática?",
         "tipo": "dinero",
         "debe_contener": ["arancel", "millones", "anual"], 
+        "fuentes_esperadas": [{"fuente": "doctorado_informática.md", "contiene": "3.836.655"}],
         "peso": 1.0
     },
         {
         "pregunta": "¿Cuál es el arancel anual del Magíster en Informática?",
         "tipo": "dinero",
         "debe_contener": ["arancel", "millones", "anual"],
+        "fuentes_esperadas": [{"fuente": "magister_informática.md", "contiene": "4.009.305"}],
         "peso": 1.0
     },
     {
         "pregunta": "¿Cuál es el valor total del Magíster en Ingeniería Informática?",
         "tipo": "dinero",
         "debe_contener": ["arancel", "millones", "total"], 
+        "fuentes_esperadas": [{"fuente": "magister_informática.md", "contiene": "4.009.305"}],
         "peso": 1.0
     },
     {
         "pregunta": "¿Cuánto cuesta la matrícula semestral para los postgrados?",
         "tipo": "dinero",
         "debe_contener": ["matrícula", "167", "semestral"], # El valor aprox de matrícula
+        "fuentes_esperadas": [
+            {"fuente": "doctorado_informática.md", "contiene": "167.200"},
+            {"fuente": "magister_informática.md", "contiene": "167.200"},
+        ],
         "peso": 1.0
     },
     {
         "pregunta": "¿Existen descuentos o rebajas para ex-alumnos de la USACH?",
         "tipo": "dinero",
         "debe_contener": ["descuento", "egresados/as", "50%"], 
+        "fuentes_esperadas": [
+            {"fuente": "doctorado_informática.md", "contiene": "50% de Descuento para egresados"},
+            {"fuente": "magister_informática.md", "contiene": "aplicable a exestudiantes"},
+        ],
         "peso": 0.8
     },
 
@@ -46,24 +60,28 @@ CASOS_PRUEBA = [
         "pregunta": "¿Cuáles son los requisitos para postular a un Doctorado?",
         "tipo": "normal",
         "debe_contener": ["grado", "magíster", "licenciado", "Curriculum", "certificado"],
+        "fuentes_esperadas": [{"fuente": "doctorado_informática.md", "contiene": "Curriculum Vitae"}],
         "peso": 1.0
     },
     {
         "pregunta": "¿Cuánto dura el Magíster en Informática?",
         "tipo": "normal",
         "debe_contener": ["semestres", "8", "ocho"],
+        "fuentes_esperadas": [{"fuente": "magister_informática.md", "contiene": "4 semestres"}],
         "peso": 0.8
     },
     {
         "pregunta": "¿Qué líneas de investigación tiene el Doctorado de Informática?",
         "tipo": "normal",
         "debe_contener": ["Biología", "Web", "Sistemas", "Complejos"],
+        "fuentes_esperadas": [{"fuente": "doctorado_informática.md", "contiene": "Sistemas basados en la Web"}],
         "peso": 1.0
     },
     {
         "pregunta": "¿Cuál es la modalidad del magister en informática?",
         "tipo": "normal",
         "debe_contener": ["presencial", "presencial"],
+        "fuentes_esperadas": [{"fuente": "magister_informática.md", "contiene": "modalidad presencial"}],
         "peso": 0.7
     },
 
@@ -75,12 +93,14 @@ CASOS_PRUEBA = [
         "pregunta": "¿Qué becas internas ofrece la universidad?",
         "tipo": "normal",
         "debe_contener": ["beca", "arancel", "mantención", "Apoyo", "investigación"],
+        "fuentes_esperadas": [{"fuente": "doctorado_informática.md", "contiene": "Beca de Apoyo a la Investigación"}],
         "peso": 1.0
     },
     {
         "pregunta": "¿Se puede postular a becas ANID?",
         "tipo": "normal",
         "debe_contener": ["ANID", "acreditados", "participar"],
+        "fuentes_esperadas": [{"fuente": "doctorado_informática.md", "contiene": "becas externas a la Universidad"}],
         "peso": 0.9
     },
 
@@ -92,12 +112,14 @@ CASOS_PRUEBA = [
         "pregunta": "¿Cuál es el correo de contacto para consultas del Magíster?",
         "tipo": "normal",
         "debe_contener": ["@", "usach.cl", "correo", "email"],
+        "fuentes_esperadas": [{"fuente": "magister_informática.md", "contiene": "elizabeth.hernandez"}],
         "peso": 1.0
     },
     {
         "pregunta": "¿Quién es el director o coordinador del programa de magíster en informática?",
         "tipo": "normal",
         "debe_contener": ["director", "inoztroza", "dr", "mario"], # Si sabes el nombre, ponlo aquí
+        "fuentes_esperadas": [{"fuente": "magister_informática.md", "contiene": "mario.inostroza"}],
         "peso": 0.8
     },
 ]
\ No newline at end of file
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import random
+import time
+
+# =============================================================================
+# EMBEDDING POR LOTES, CONCURRENTE Y CON REINTENTOS (INGESTA)
+# =============================================================================
+# Chroma.from_documents embebía en serie y un solo 429 del endpoint de GitHub
+# Models abortaba la construcción completa. Aquí los chunks se mandan en lotes
+# de tamaño fijo a un pool acotado de workers async; los 429 (y errores
+# transitorios) se reintentan con backoff exponencial, y cada lote terminado
+# se guarda de inmediato en el almacén de embeddings (ver almacen_embeddings.py):
+# si la corrida se corta, la siguiente retoma desde ahí sin volver a pagarlos.
+# Por eso el almacén es obligatorio: sin él no habría desde dónde retomar.
+
+TAM_LOTE = int(os.getenv("MAURICIA_TAM_LOTE_EMBEDDINGS", "64"))
+CONCURRENCIA = int(os.getenv("MAURICIA_CONCURRENCIA_EMBEDDINGS", "4"))
+MAX_REINTENTOS = 6
+ESPERA_BASE_SEG = 1.0
+ESPERA_MAX_SEG = 60.0
+
+CODIGOS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+
+
+def _codigo_http(error: Exception):
+    codigo = getattr(error, "status_code", None)
+    if codigo is None and getattr(error, "response", None) is not None:
+        codigo = getattr(error.response, "status_code", None)
+    return codigo
+
+
+def es_reintentable(error: Exception) -> bool:
+    """429 / 5xx / timeouts / errores de conexión: vale la pena reintentar."""
+    if _codigo_http(error) in CODIGOS_TRANSITORIOS:
+        return True
+    nombre = type(error).__name__
+    return nombre in {"RateLimitError", "APITimeoutError", "APIConnectionError", "TimeoutError"} or "429" in str(error)
+
+
+def espera_reintento(error: Exception, intento: int) -> float:
+    """Respeta Retry-After si el servidor lo manda; si no, backoff exponencial con jitter."""
+    respuesta = getattr(error, "response", None)
+    retry_after = getattr(respuesta, "headers", {}).get("retry-after") if respuesta is not None else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), ESPERA_MAX_SEG)
+    except ValueError:
+        pass
+    espera = min(ESPERA_BASE_SEG * (2 ** intento), ESPERA_MAX_SEG)
+    return espera * (0.5 + random.random() / 2)
+
+
+class EmbedderLotes:
+    """Embebe listas grandes de textos con lotes fijos, N workers y reintentos (AlmacenEmbeddings como checkpoint)."""
+
+    def __init__(self, embedding_model, almacen, tam_lote: int = TAM_LOTE, concurrencia: int = CONCURRENCIA,
+                 max_reintentos: int = MAX_REINTENTOS):
+        if almacen is None:
+            raise ValueError("EmbedderLotes necesita un AlmacenEmbeddings (el checkpoint para retomar).")
+        self.embedding_model = embedding_model
+        self.tam_lote = tam_lote
+        self.concurrencia = concurrencia
+        self.max_reintentos = max_reintentos
+        self.almacen = almacen
+        self.reintentos = 0
+
+    async def _embeber_lote(self, textos: list) -> list:
+        for intento in range(self.max_reintentos + 1):
+            try:
+                return await self.embedding_model.aembed_documents(textos)
+            except Exception as e:
+                if intento == self.max_reintentos or not es_reintentable(e):
+                    raise
+                espera = espera_reintento(e, intento)
+                self.reintentos += 1
+                print(f"   ⏳ [EMBEDDINGS] {type(e).__name__} (intento {intento + 1}): reintento en {espera:.1f} s")
+                await asyncio.sleep(espera)
+
+    async def aembeber(self, textos: list) -> list:
+        """Devuelve los vectores en el mismo orden que `textos` (los repetidos se piden una vez)."""
+        unicos = list(dict.fromkeys(textos))
+        vectores = self.almacen.obtener(unicos)
+        pendientes = [t for t in unicos if t not in vectores]
+        if vectores:
+            print(f"   - [EMBEDDINGS] {len(vectores)} chunks ya estaban en el almacén.")
+
+        lotes = [pendientes[i:i + self.tam_lote] for i in range(0, len(pendientes), self.tam_lote)]
+        semaforo = asyncio.Semaphore(self.concurrencia)
+        hechos = 0
+        inicio = time.perf_counter()
+
+        async def worker(lote):
+            nonlocal hechos
+            async with semaforo:
+                resultado = await self._embeber_lote(lote)
+            self.almacen.guardar(lote, resultado)
+            vectores.update(zip(lote, resultado))
+            hechos += len(lote)
+            transcurrido = time.perf_counter() - inicio
+            print(f"   - [EMBEDDINGS] {hechos}/{len(pendientes)} chunks ({hechos / max(transcurrido, 1e-9):.1f} chunks/s)")
+
+        await asyncio.gather(*(worker(lote) for lote in lotes))
+
+        if pendientes:
+            duracion = time.perf_counter() - inicio
+            print(f"   - [EMBEDDINGS] {len(pendientes)} chunks en {duracion:.1f} s "
+                  f"({len(pendientes) / max(duracion, 1e-9):.1f} chunks/s, {self.reintentos} reintentos).")
+        return [vectores[t] for t in textos]
+
+    def embeber(self, textos: list) -> list:
+        return asyncio.run(self.aembeber(textos))
@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import time
+import unicodedata
+
+import numpy as np
+
+from deduplicacion import ensamblar_contexto
+from indice_bm25 import IndiceBM25
+from indice_numpy import IndiceNumpy
+from programas import detectar_programa, filtro_programa
+from recuperacion import RecuperadorHibrido
+from ventana_historial import VentanaHistorial
+from procesamiento.almacen_embeddings import AlmacenEmbeddings, normalizar_texto
+from procesamiento.backends_embeddings import BACKENDS, crear_embeddings
+from procesamiento.dataset_para_test import CASOS_PRUEBA
+from procesamiento.embedder_lotes import EmbedderLotes
+from procesamiento.pipeline_ingesta import CARPETA_DATA, CHUNKERS, PERFILES, crear_splitter, dividir, documentos
+
+# =============================================================================
+# EVALUACIÓN OFFLINE DE LA RECUPERACIÓN (SIN LLM)
+# =============================================================================
+# optimizar_cerebro.py mide la respuesta completa: cada prueba paga embeddings
+# por API y una llamada al LLM por pregunta, y tarda minutos. Aquí solo se mide
+# la recuperación, contra las "fuentes_esperadas" de CASOS_PRUEBA:
+#
+#   recall@k   fracción de las fuentes esperadas que aparecen en el top-k
+#   MRR        1 / posición del primer chunk relevante (0 si no aparece)
+#   tokens     tamaño del contexto que recibiría el LLM (ensamblar_contexto)
+#   p50/p95/p99  latencia de la búsqueda sola (el vector de la pregunta ya está calculado)
+#
+# para cada combinación de chunker, chunk_size, motor de búsqueda y k.
+# Los chunks se arman en memoria desde data/ (no toca las colecciones).
+# Sin --backend solo corre BM25; con un backend local (huggingface / onnx) los
+# vectores salen del modelo en caché y del AlmacenEmbeddings, sin red.
+#
+# Uso (desde backend/):
+#   python -m procesamiento.evaluacion_recuperacion --k 2 4 6 8
+#   python -m procesamiento.evaluacion_recuperacion --backend onnx --chunk-size 1000 1500 --reporte eval.json
+
+MAX_CONTEXT_CHARS = 12000  # El mismo tope que mauricia_v3
+KS = (2, 4, 6, 8)
+EXPANSION_DINERO = " arancel matrícula costo valor"  # La misma expansión de _parametros_busqueda
+K_CANDIDATOS_HIBRIDO = 20
+REPETICIONES = 20  # Búsquedas por pregunta para los percentiles de latencia
+MODELO_TOKENS = "gpt-4o-mini"
+
+MOTORES_LEXICOS = ("bm25",)
+MOTORES_VECTORIALES = ("numpy", "chroma", "hibrido")
+MOTORES = MOTORES_LEXICOS + MOTORES_VECTORIALES
+
+
+# --- Relevancia -----------------------------------------------------------------
+def _normalizar(texto: str) -> str:
+    return normalizar_texto(texto).lower()
+
+
+def es_relevante(chunk, esperada: dict) -> bool:
+    """El chunk viene del archivo esperado y contiene el fragmento (sin importar saltos de línea)."""
+    fuente = os.path.basename(chunk.metadata.get("source", ""))
+    return (unicodedata.normalize("NFC", fuente) == unicodedata.normalize("NFC", esperada["fuente"])
+            and _normalizar(esperada["contiene"]) in _normalizar(chunk.page_content))
+
+
+def consulta(caso: dict):
+    """(query, filtro) tal como los arma mauricia_v3 para la pregunta."""
+    query = caso["pregunta"] + (EXPANSION_DINERO if caso["tipo"] == "dinero" else "")
+    return query, filtro_programa(detectar_programa(caso["pregunta"]))
+
+
+# --- Motores ----------------------------------------------------------------------
+def vectores_chunks(chunks: list, embedding_model, modelo: str, backend: str) -> list:
+    """Embeddings de los chunks vía AlmacenEmbeddings: repetir un barrido no vuelve a llamar al modelo."""
+    embedder = EmbedderLotes(embedding_model, almacen=AlmacenEmbeddings(modelo, backend))
+    return embedder.embeber([c.page_content for c in chunks])
+
+
+def construir_motores(chunks: list, motores: list, vectores: list = None) -> dict:
+    """nombre -> buscar(query, vector, k, filtro) sobre los mismos chunks."""
+    ids = [str(i) for i in range(len(chunks))]
+    textos = [c.page_content for c in chunks]
+    metadatas = [c.metadata for c in chunks]
+    bm25 = IndiceBM25.construir(ids, textos, metadatas)
+    buscadores = {"bm25": lambda q, v, k, f: [bm25.documento(i) for i, _ in bm25.buscar(q, k, f)]}
+    if vectores is None:
+        return {m: buscadores[m] for m in motores}
+
+    indice = IndiceNumpy(ids, textos, metadatas, vectores, espacio="cosine")
+    hibrido = RecuperadorHibrido(indice, bm25, K_CANDIDATOS_HIBRIDO)
+    buscadores["numpy"] = lambda q, v, k, f: indice.similarity_search_by_vector(v, k=k, filter=f)
+    buscadores["hibrido"] = lambda q, v, k, f: hibrido.buscar(q, v, k=k, filter=f)
+    if "chroma" in motores:
+        import chromadb
+        from langchain_chroma import Chroma
+        from procesamiento.ingesta_incremental import escribir_en_coleccion
+
+        # Colección en memoria con el mismo HNSW que producción
+        vector_db = Chroma(
+            collection_name="evaluacion", client=chromadb.EphemeralClient(),
+            collection_metadata={"hnsw:space": "cosine"},
+        )
+        vector_db.reset_collection()
+        escribir_en_coleccion(vector_db, ids, chunks, vectores)
+        buscadores["chroma"] = lambda q, v, k, f: vector_db.similarity_search_by_vector(v, k=k, filter=f)
+    return {m: buscadores[m] for m in motores}
+
+
+# --- Métricas ---------------------------------------------------------------------
+def evaluar(buscar, casos: list, vectores_consulta: list, k: int, repeticiones: int, contar_tokens) -> dict:
+    recalls, rangos_reciprocos, tokens, tiempos, fallidas = [], [], [], [], []
+    for caso, vector in zip(casos, vectores_consulta):
+        query, filtro = consulta(caso)
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            top = buscar(query, vector, k, filtro)
+            tiempos.append(time.perf_counter() - inicio)
+
+        esperadas = caso["fuentes_esperadas"]
+        encontradas = sum(any(es_relevante(c, e) for c in top) for e in esperadas)
+        recalls.append(encontradas / len(esperadas))
+        posicion = next((i for i, c in enumerate(top, 1) if any(es_relevante(c, e) for e in esperadas)), None)
+        rangos_reciprocos.append(1 / posicion if posicion else 0.0)
+        tokens.append(contar_tokens(ensamblar_contexto(top, MAX_CONTEXT_CHARS)))
+        if encontradas < len(esperadas):
+            fallidas.append(caso["pregunta"])
+
+    ms = np.asarray(tiempos) * 1000
+    return {
+        "recall": float(np.mean(recalls)),
+        "mrr": float(np.mean(rangos_reciprocos)),
+        "tokens_medio": float(np.mean(tokens)),
+        "tokens_p95": float(np.percentile(tokens, 95)),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "fallidas": fallidas,
+    }
+
+
+def imprimir_tabla(filas: list) -> None:
+    print(f"\n{'chunker':<12} | {'size':>5} | {'chunks':>6} | {'motor':<8} | {'k':>2} | {'recall@k':>8} | "
+          f"{'MRR':>5} | {'tokens':>6} | {'tok p95':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7}")
+    print("-" * 118)
+    for f in filas:
+        print(f"{f['chunker']:<12} | {f['chunk_size']:>5} | {f['chunks']:>6} | {f['motor']:<8} | {f['k']:>2} | "
+              f"{f['recall']:>8.1%} | {f['mrr']:>5.2f} | {f['tokens_medio']:>6.0f} | {f['tokens_p95']:>7.0f} | "
+              f"{f['p50_ms']:>7.3f} | {f['p95_ms']:>7.3f} | {f['p99_ms']:>7.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evalúa solo la recuperación (recall@k, MRR, tokens, latencia).")
+    parser.add_argument("--data", default=CARPETA_DATA)
+    parser.add_argument("--chunker", nargs="+", choices=CHUNKERS, default=list(CHUNKERS))
+    parser.add_argument("--chunk-size", nargs="+", type=int, default=[PERFILES["prod"]["chunk_size"]])
+    parser.add_argument("--k", nargs="+", type=int, default=list(KS))
+    parser.add_argument("--motor", nargs="+", choices=MOTORES,
+                        help="Por defecto: bm25, y además los vectoriales si se da --backend")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="Embeddings para los motores vectoriales")
+    parser.add_argument("--modelo", default=PERFILES["local"]["modelo"])
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--reporte", help="Escribe las filas de la tabla en este JSON")
+    args = parser.parse_args(argv)
+
+    motores = args.motor or (list(MOTORES) if args.backend else list(MOTORES_LEXICOS))
+    if any(m in MOTORES_VECTORIALES for m in motores) and not args.backend:
+        parser.error(f"los motores {', '.join(MOTORES_VECTORIALES)} necesitan --backend")
+
+    casos = [c for c in CASOS_PRUEBA if c.get("fuentes_esperadas")]
+    print(f"🧪 {len(casos)} de {len(CASOS_PRUEBA)} casos tienen fuentes_esperadas")
+    docs = list(documentos(args.data, PERFILES["prod"]))
+    contar_tokens = VentanaHistorial(modelo=MODELO_TOKENS).contar_tokens
+
+    embedding_model = None
+    vectores_consulta = [None] * len(casos)
+    if args.backend:
+        if args.backend != "openai":
+            # Solo el modelo ya descargado: si falta, que falle al tiro en vez de colgarse en la red
+            os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        print(f"🧠 Embeddings: {args.backend} / {args.modelo}")
+        embedding_model = crear_embeddings(args.backend, args.modelo)
+        vectores_consulta = [embedding_model.embed_query(consulta(c)[0]) for c in casos]
+
+    filas = []
+    for chunker in args.chunker:
+        for chunk_size in args.chunk_size:
+            chunks = list(dividir(docs, crear_splitter(chunker, chunk_size)))
+            print(f"📦 {chunker} / {chunk_size}: {len(chunks)} chunks")
+            vectores = vectores_chunks(chunks, embedding_model, args.modelo, args.backend) if embedding_model else None
+            for motor, buscar in construir_motores(chunks, motores, vectores).items():
+                for k in args.k:
+                    metricas = evaluar(buscar, casos, vectores_consulta, k, args.repeticiones, contar_tokens)
+                    filas.append({"chunker": chunker, "chunk_size": chunk_size, "chunks": len(chunks),
+                                  "motor": motor, "k": k, **metricas})
+
+    imprimir_tabla(filas)
+    # La mejor: más recall, y a igual recall, el contexto más chico
+    mejor = max(filas, key=lambda f: (round(f["recall"], 4), f["mrr"], -f["tokens_medio"]))
+    print(f"\n🏆 Mejor: {mejor['chunker']} / {mejor['chunk_size']} / {mejor['motor']} / k={mejor['k']} "
+          f"(recall@k {mejor['recall']:.1%}, MRR {mejor['mrr']:.2f}, {mejor['tokens_medio']:.0f} tokens)")
+    for pregunta in mejor["fallidas"]:
+        print(f"   ⚠️ Sin todas sus fuentes: {pregunta}")
+
+    if args.reporte:
+        with open(args.reporte, "w", encoding="utf-8") as f:
+            json.dump({"backend": args.backend, "modelo": args.modelo if args.backend else None,
+                       "casos": len(casos), "filas": filas}, f, ensure_ascii=False, indent=1)
+        print(f"📝 Reporte: {args.reporte}")
+    return filas
+
+
+if __name__ == "__main__":
+    main()
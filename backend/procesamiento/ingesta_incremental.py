@@ -0,0 +1,243 @@
+import json
+import os
+import time
+
+import xxhash
+from langchain_chroma import Chroma
+
+from procesamiento.embedder_lotes import EmbedderLotes
+
+# =============================================================================
+# INGESTA INCREMENTAL CON HASH DE CONTENIDO
+# =============================================================================
+# Antes cada corrida borraba RUTA_DB con shutil.rmtree y volvía a embeber todo,
+# aunque solo hubiera cambiado un markdown. Ahora cada chunk tiene un id que es
+# el hash de su contenido; un manifiesto guarda los hashes de los archivos
+# fuente y de sus chunks, y solo se embeben los chunks nuevos o modificados.
+#
+# Un archivo cuyo hash no cambió (con la misma configuración de chunking, la
+# "firma") ni siquiera se carga: sus chunks se conservan tal cual desde el
+# manifiesto, sin parsear el PDF, limpiar ni dividir.
+#
+# El manifiesto también anota de qué otras fuentes tenía casi-duplicados cada
+# una ("duplica_de"): si B perdió un chunk por repetir uno de A y A cambia o
+# desaparece, B se vuelve a cargar aunque no haya cambiado, para que el índice
+# quede igual al de una reconstrucción completa.
+
+ARCHIVO_MANIFIESTO = "manifiesto_ingesta.json"
+VERSION_MANIFIESTO = 1
+TAM_LOTE_CHROMA = 1000  # Chroma limita la cantidad de registros por upsert
+
+# Metadata que no cambia el contenido del chunk (no debe forzar re-embeber)
+CAMPOS_VOLATILES = {"start_index"}
+
+
+def hash_bytes(datos: bytes) -> str:
+    return xxhash.xxh3_128_hexdigest(datos)
+
+
+def hash_archivo(ruta: str) -> str:
+    try:
+        with open(ruta, "rb") as f:
+            return hash_bytes(f.read())
+    except OSError:
+        return ""
+
+
+def id_chunk(chunk) -> str:
+    """Id determinista: mismo texto + misma metadata relevante = mismo id."""
+    metadata = {k: v for k, v in chunk.metadata.items() if k not in CAMPOS_VOLATILES}
+    firma = json.dumps(metadata, sort_keys=True, ensure_ascii=False, default=str)
+    return hash_bytes(f"{firma}\x00{chunk.page_content}".encode("utf-8"))
+
+
+def cargar_manifiesto(ruta_db: str):
+    ruta = os.path.join(ruta_db, ARCHIVO_MANIFIESTO)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "r", encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    return manifiesto if manifiesto.get("version") == VERSION_MANIFIESTO else None
+
+
+def guardar_manifiesto(ruta_db: str, manifiesto: dict) -> None:
+    ruta = os.path.join(ruta_db, ARCHIVO_MANIFIESTO)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+    os.replace(temporal, ruta)  # Atómico: nunca queda un manifiesto a medio escribir
+
+
+def armar_manifiesto(fuentes: dict, hashes: dict = None, firma: str = "", duplica_de: dict = None) -> dict:
+    """
+    `fuentes` = {ruta del archivo: [ids de sus chunks]}. `hashes` trae los hashes
+    tomados antes de cargar (si el archivo cambió durante la corrida, la próxima lo nota).
+    `duplica_de` = {ruta: fuentes cuyos chunks dejaron fuera casi-duplicados de esa ruta}.
+    """
+    hashes = hashes or {}
+    duplica_de = duplica_de or {}
+    return {
+        "version": VERSION_MANIFIESTO,
+        "actualizado": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "firma": firma,
+        "fuentes": {
+            f: {"hash": hashes.get(f) or hash_archivo(f), "chunks": ids, "duplica_de": sorted(duplica_de.get(f, ()))}
+            for f, ids in fuentes.items()
+        },
+    }
+
+
+def escribir_en_coleccion(vectorstore, ids: list, chunks: list, vectores: list) -> None:
+    """Upsert con los vectores ya calculados (Chroma no vuelve a llamar al modelo)."""
+    for i in range(0, len(ids), TAM_LOTE_CHROMA):
+        tramo = slice(i, i + TAM_LOTE_CHROMA)
+        vectorstore._collection.upsert(
+            ids=ids[tramo],
+            embeddings=vectores[tramo],
+            documents=[c.page_content for c in chunks[tramo]],
+            metadatas=[c.metadata or None for c in chunks[tramo]],
+        )
+
+
+class SincronizadorIncremental:
+    """
+    Versión por tramos de la sincronización: los chunks llegan en lotes (agregar)
+    y se embeben/escriben al vuelo; solo se retienen sus ids. Al terminar se
+    borran los chunks que ya no aparecieron y se escribe el manifiesto.
+    """
+
+    def __init__(self, ruta_db: str, embedding_model, almacen, completo: bool = False, firma: str = ""):
+        self.ruta_db = ruta_db
+        self.firma = firma
+        manifiesto = None if completo else cargar_manifiesto(ruta_db)
+        self.vectorstore = Chroma(persist_directory=ruta_db, embedding_function=embedding_model)
+        if manifiesto is None and self.vectorstore._collection.count():
+            # Sin manifiesto no sabemos qué hay adentro: reconstrucción completa.
+            # Vaciamos la colección en vez de borrar la carpeta (Chroma mantiene
+            # clientes abiertos por proceso y un rmtree los deja apuntando a la nada).
+            self.vectorstore.reset_collection()
+            print("   (Colección anterior vaciada: reconstrucción completa)")
+
+        self.existentes = set()
+        self.fuentes_antes = set(manifiesto["fuentes"]) if manifiesto else set()
+        if manifiesto:
+            for entrada in manifiesto["fuentes"].values():
+                self.existentes.update(entrada["chunks"])
+        # Solo se puede saltar una fuente si sus chunks se armaron con la misma configuración
+        misma_firma = manifiesto is not None and firma and manifiesto.get("firma") == firma
+        self._anteriores = manifiesto["fuentes"] if misma_firma else {}
+        self.hashes = {}    # fuente -> hash al empezar la corrida
+        self.omitidas = 0
+
+        self.embedder = EmbedderLotes(embedding_model, almacen=almacen)
+        self.fuentes = {}   # fuente -> [ids], para el manifiesto
+        self.duplica_de = {}  # fuente -> {fuentes de las que tenía casi-duplicados}
+        self.vistos = set()
+        self.nuevos = 0
+        self.segundos_embeddings = 0.0
+        self._inicio = time.perf_counter()
+
+    def omitir_sin_cambios(self, archivos: list) -> set:
+        """
+        Hashea `archivos` y conserva los chunks de los que no cambiaron desde el
+        manifiesto. Devuelve esas rutas: el pipeline no las carga ni las divide.
+        """
+        candidatas = {}
+        for ruta in archivos:
+            self.hashes[ruta] = hash_archivo(ruta)
+            entrada = self._anteriores.get(ruta)
+            # Sin "duplica_de" (manifiesto anterior a ese registro) no sabemos qué perdió: se carga
+            if entrada and entrada["hash"] and entrada["hash"] == self.hashes[ruta] and "duplica_de" in entrada:
+                candidatas[ruta] = entrada
+
+        # Si una fuente de la que había casi-duplicados se vuelve a cargar (cambió o ya
+        # no está), los chunks descartados pueden tener que entrar: se carga también.
+        # Se repite porque recargar una fuente puede arrastrar a las que dependían de ella.
+        cambio = True
+        while cambio:
+            cambio = False
+            for ruta in list(candidatas):
+                if any(origen not in candidatas for origen in candidatas[ruta]["duplica_de"]):
+                    del candidatas[ruta]
+                    cambio = True
+
+        for ruta, entrada in candidatas.items():
+            self.fuentes[ruta] = list(entrada["chunks"])
+            self.vistos.update(entrada["chunks"])
+            if entrada["duplica_de"]:
+                self.duplica_de[ruta] = set(entrada["duplica_de"])
+        self.omitidas = len(candidatas)
+        return set(candidatas)
+
+    def registrar_descarte(self, fuente: str, original: str) -> None:
+        """Un chunk de `fuente` quedó fuera por ser casi-duplicado de uno de `original`."""
+        self.fuentes.setdefault(fuente, [])  # Aunque no le quede ningún chunk, va al manifiesto
+        if original != fuente:
+            self.duplica_de.setdefault(fuente, set()).add(original)
+
+    def chunks_conservados(self):
+        """
+        (texto, metadata) de los chunks que se conservaron sin cargar su fuente
+        (omitir_sin_cambios). El pipeline los registra en el deduplicador para que
+        una fuente que sí cambió no agregue casi-duplicados de lo que ya está indexado.
+        """
+        ids = sorted(self.vistos)
+        for i in range(0, len(ids), TAM_LOTE_CHROMA):
+            datos = self.vectorstore._collection.get(ids=ids[i:i + TAM_LOTE_CHROMA],
+                                                     include=["documents", "metadatas"])
+            for texto, metadata in zip(datos["documents"], datos["metadatas"]):
+                yield texto, metadata or {}
+
+    def agregar(self, chunks: list) -> int:
+        """Embebe y escribe los chunks nuevos del lote. Devuelve cuántos eran nuevos."""
+        ids, pendientes = [], []
+        for chunk in chunks:
+            chunk_id = id_chunk(chunk)
+            if chunk_id in self.vistos:  # Chunks idénticos se guardan una vez
+                continue
+            self.vistos.add(chunk_id)
+            self.fuentes.setdefault(chunk.metadata.get("source", ""), []).append(chunk_id)
+            if chunk_id not in self.existentes:
+                ids.append(chunk_id)
+                pendientes.append(chunk)
+        if pendientes:
+            inicio = time.perf_counter()
+            vectores = self.embedder.embeber([c.page_content for c in pendientes])
+            self.segundos_embeddings += time.perf_counter() - inicio
+            escribir_en_coleccion(self.vectorstore, ids, pendientes, vectores)
+            self.nuevos += len(pendientes)
+        return len(pendientes)
+
+    def terminar(self):
+        obsoletos = sorted(self.existentes - self.vistos)
+        if obsoletos:
+            self.vectorstore.delete(ids=obsoletos)
+        guardar_manifiesto(self.ruta_db, armar_manifiesto(self.fuentes, self.hashes, self.firma, self.duplica_de))
+
+        fuentes_ahora = set(self.fuentes)
+        print(f"   - Fuentes: {len(fuentes_ahora)} ({len(fuentes_ahora - self.fuentes_antes)} nuevas, "
+              f"{len(self.fuentes_antes - fuentes_ahora)} eliminadas, {self.omitidas} sin cambios y sin cargar)")
+        print(f"   - Chunks: {self.nuevos} embebidos, {len(obsoletos)} borrados, "
+              f"{len(self.vistos) - self.nuevos} sin cambios")
+        resumen = {
+            "total": len(self.vistos),
+            "nuevos": self.nuevos,
+            "borrados": len(obsoletos),
+            "sin_cambios": len(self.vistos) - self.nuevos,
+            "fuentes_omitidas": self.omitidas,
+            "segundos": round(time.perf_counter() - self._inicio, 2),
+            "segundos_embeddings": round(self.segundos_embeddings, 2),
+        }
+        return self.vectorstore, resumen
+
+
+def sincronizar_coleccion(ruta_db: str, chunks: list, embedding_model, almacen, completo: bool = False):
+    """
+    Deja la colección en `ruta_db` igual a `chunks`, embebiendo solo lo nuevo.
+    Con `almacen` (AlmacenEmbeddings) los textos ya embebidos en cualquier corrida
+    anterior no vuelven al modelo, y una corrida cortada retoma desde ahí.
+    Devuelve (vectorstore, resumen) con los conteos de la sincronización.
+    """
+    sincronizador = SincronizadorIncremental(ruta_db, embedding_model, almacen, completo)
+    sincronizador.agregar(chunks)
+    return sincronizador.terminar()
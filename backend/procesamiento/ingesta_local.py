@@ -1,11 +1,218 @@
+import argparse
 import asyncio
+import html
+import json
 import os
+import re
 import sys
-from crawl4ai import AsyncWebCrawler
+import time
+from typing import NamedTuple
 
+import httpx
+import xxhash
+
+# =============================================================================
+# INGESTADOR DE PROGRAMAS USACH (INTERACTIVO Y POR LOTES)
+# =============================================================================
+# Sin argumentos: pide una URL y un nombre, como siempre.
+# Con --manifiesto: recorre una lista de programas en paralelo (pool acotado),
+# con requests condicionales (ETag / Last-Modified) y hash del markdown, así las
+# páginas que no cambiaron no se vuelven a renderizar ni a ingerir.
+#
+#   python -m procesamiento.ingesta_local --manifiesto programas.json --ingerir
+#
+# programas.json: [{"url": "https://...", "archivo": "magister_informatica"}, ...]
+
+CARPETA_DATA = "data"
+ARCHIVO_ESTADO = ".estado_crawler.json"  # Dentro de CARPETA_DATA (no es .md ni .pdf: no se ingiere)
+CONCURRENCIA_CRAWLER = int(os.getenv("MAURICIA_CONCURRENCIA_CRAWLER", "4"))
+TIMEOUT_CRAWLER_SEG = 30
+
+
+class Pagina(NamedTuple):
+    url: str
+    archivo: str
+
+
+class ResultadoPagina(NamedTuple):
+    url: str
+    archivo: str
+    estado: str  # "nueva", "actualizada", "sin_cambios" o "error"
+    segundos: float
+    detalle: str = ""
+
+
+# --- Manifiesto y estado -------------------------------------------------------
+def nombre_archivo(nombre: str) -> str:
+    return nombre if nombre.endswith(".md") else nombre + ".md"
+
+
+def leer_manifiesto(ruta: str) -> list:
+    with open(ruta, "r", encoding="utf-8") as f:
+        entradas = json.load(f)
+    paginas = []
+    for entrada in entradas:
+        url = entrada["url"].strip()
+        nombre = entrada.get("archivo") or re.sub(r"\W+", "_", url.rstrip("/").rsplit("/", 1)[-1]).strip("_")
+        paginas.append(Pagina(url, nombre_archivo(nombre)))
+    return paginas
+
+
+def cargar_estado(carpeta: str) -> dict:
+    ruta = os.path.join(carpeta, ARCHIVO_ESTADO)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_estado(carpeta: str, estado: dict) -> None:
+    ruta = os.path.join(carpeta, ARCHIVO_ESTADO)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=1)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def cabeceras_condicionales(previo: dict) -> dict:
+    cabeceras = {}
+    if previo.get("etag"):
+        cabeceras["If-None-Match"] = previo["etag"]
+    if previo.get("last_modified"):
+        cabeceras["If-Modified-Since"] = previo["last_modified"]
+    return cabeceras
+
+
+# --- Conversión HTML -> markdown -----------------------------------------------
+def html_a_markdown(contenido: str) -> str:
+    """
+    Conversión mínima sin navegador (--sin-navegador): sirve para páginas
+    estáticas y para probar el lote contra un servidor HTTP local.
+    """
+    texto = re.sub(r"(?is)<(script|style|noscript)[^>]*>.*?</\1>", "", contenido)
+    texto = re.sub(r"(?is)<h([1-6])[^>]*>(.*?)</h\1>", lambda m: "\n" + "#" * int(m.group(1)) + " " + m.group(2) + "\n", texto)
+    texto = re.sub(r"(?is)<li[^>]*>", "\n- ", texto)
+    texto = re.sub(r"(?is)<br\s*/?>|</p>|</div>|</tr>", "\n", texto)
+    texto = re.sub(r"(?s)<[^>]+>", "", texto)
+    texto = html.unescape(texto)
+    lineas = [" ".join(l.split()) for l in texto.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lineas)).strip() + "\n"
+
+
+class ConvertidorCrawl4AI:
+    """Renderiza con crawl4ai (Playwright) reutilizando un solo navegador para todo el lote."""
+
+    async def __aenter__(self):
+        from crawl4ai import AsyncWebCrawler
+        self._crawler = AsyncWebCrawler(verbose=False)
+        await self._crawler.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._crawler.__aexit__(*exc)
+
+    async def __call__(self, url: str, contenido: str) -> str:
+        # La frescura ya la decidimos nosotros (request condicional): aquí siempre se renderiza
+        result = await self._crawler.arun(url=url, word_count_threshold=10, bypass_cache=True)
+        if not result.success:
+            raise RuntimeError(result.error_message)
+        return result.markdown
+
+
+async def _convertir_sin_navegador(url: str, contenido: str) -> str:
+    return html_a_markdown(contenido)
+
+
+# --- Lote ---------------------------------------------------------------------
+async def procesar_pagina(pagina: Pagina, estado: dict, cliente, convertir, semaforo, carpeta: str):
+    inicio = time.perf_counter()
+    ruta = os.path.join(carpeta, pagina.archivo)
+    previo = estado.get(pagina.url, {}) if os.path.exists(ruta) else {}
+    try:
+        async with semaforo:
+            respuesta = await cliente.get(pagina.url, headers=cabeceras_condicionales(previo))
+            if respuesta.status_code == 304:
+                previo["revisado"] = time.strftime("%Y-%m-%d %H:%M:%S")
+                return ResultadoPagina(pagina.url, pagina.archivo, "sin_cambios", time.perf_counter() - inicio, "304")
+            respuesta.raise_for_status()
+            markdown = await convertir(pagina.url, respuesta.text)
+
+        huella = xxhash.xxh3_128_hexdigest(markdown.encode("utf-8"))
+        estado[pagina.url] = {
+            "archivo": pagina.archivo,
+            "etag": respuesta.headers.get("etag", ""),
+            "last_modified": respuesta.headers.get("last-modified", ""),
+            "hash": huella,
+            "revisado": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        if huella == previo.get("hash"):
+            # El servidor no manda validadores (o cambió solo el HTML): el contenido es el mismo
+            return ResultadoPagina(pagina.url, pagina.archivo, "sin_cambios", time.perf_counter() - inicio, "hash")
+
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            f.write(markdown)
+        os.replace(ruta + ".tmp", ruta)
+        tipo = "actualizada" if previo else "nueva"
+        return ResultadoPagina(pagina.url, pagina.archivo, tipo, time.perf_counter() - inicio)
+    except Exception as e:
+        return ResultadoPagina(pagina.url, pagina.archivo, "error", time.perf_counter() - inicio, f"{type(e).__name__}: {e}")
+
+
+async def crawlear_lote(paginas: list, carpeta: str = CARPETA_DATA, concurrencia: int = CONCURRENCIA_CRAWLER,
+                        convertir=None, cliente=None) -> list:
+    """
+    Descarga las páginas del manifiesto y escribe solo las que cambiaron.
+    `convertir(url, html) -> markdown` y `cliente` (httpx.AsyncClient) se pueden
+    inyectar para correr sin navegador ni internet.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    estado = cargar_estado(carpeta)
+    semaforo = asyncio.Semaphore(concurrencia)
+    propio = cliente is None
+    cliente = cliente or httpx.AsyncClient(follow_redirects=True, timeout=TIMEOUT_CRAWLER_SEG)
+    try:
+        if convertir is None:
+            async with ConvertidorCrawl4AI() as convertir_navegador:
+                resultados = await asyncio.gather(*(
+                    procesar_pagina(p, estado, cliente, convertir_navegador, semaforo, carpeta) for p in paginas
+                ))
+        else:
+            resultados = await asyncio.gather(*(
+                procesar_pagina(p, estado, cliente, convertir, semaforo, carpeta) for p in paginas
+            ))
+    finally:
+        if propio:
+            await cliente.aclose()
+    guardar_estado(carpeta, estado)
+
+    for r in resultados:
+        icono = {"nueva": "🆕", "actualizada": "🔄", "sin_cambios": "⏭️ ", "error": "❌"}[r.estado]
+        print(f"   {icono} {r.archivo:<40} {r.estado:<12} {r.segundos * 1000:7.0f} ms {r.detalle}")
+    conteo = {e: sum(r.estado == e for r in resultados) for e in ("nueva", "actualizada", "sin_cambios", "error")}
+    print(f"📊 {len(resultados)} páginas: {conteo}")
+    return resultados
+
+
+def main_lote(args) -> None:
+    paginas = leer_manifiesto(args.manifiesto)
+    print(f"\n🕵️  === CRAWLER POR LOTES: {len(paginas)} páginas, {args.concurrencia} en paralelo ===")
+    convertir = _convertir_sin_navegador if args.sin_navegador else None
+    resultados = asyncio.run(crawlear_lote(paginas, args.data, args.concurrencia, convertir))
+
+    cambiadas = [r for r in resultados if r.estado in ("nueva", "actualizada")]
+    if args.ingerir and cambiadas:
+        # La ingesta es incremental: solo se embeben los chunks de las páginas que cambiaron
+        from procesamiento.pipeline_ingesta import ejecutar
+        ejecutar(args.perfil, carpeta_data=args.data)
+    elif args.ingerir:
+        print("✅ Ninguna página cambió: no hace falta re-ingerir.")
+
+
+# --- Modo interactivo (una URL) --------------------------------------------------
 async def main():
+    from crawl4ai import AsyncWebCrawler
+
     print("\n🕵️  === INGESTADOR DE PROGRAMAS USACH ===")
-    
+
     # 1. PEDIR DATOS AL USUARIO
     url_objetivo = input("🌐 Pega la URL del programa aquí: ").strip()
     if not url_objetivo:
@@ -16,36 +223,35 @@ async def main():
     if not nombre_input:
         print("❌ Error: Debes dar un nombre al archivo.")
         return
-    
+
     # Aseguramos que termine en .md
-    if not nombre_input.endswith(".md"):
-        nombre_input += ".md"
+    nombre_input = nombre_archivo(nombre_input)
 
     print(f"\n🚀 Iniciando extracción en: {url_objetivo}...")
-    
+
     async with AsyncWebCrawler(verbose=True) as crawler:
         result = await crawler.arun(
             url=url_objetivo,
-            word_count_threshold=10, 
+            word_count_threshold=10,
             bypass_cache=True
         )
 
         if result.success:
             print("\n✅ Extracción exitosa!")
-            
-            carpeta = "data"
+
+            carpeta = CARPETA_DATA
             ruta_completa = os.path.join(carpeta, nombre_input)
-            
+
             if not os.path.exists(carpeta):
                 os.makedirs(carpeta)
                 print(f"📁 Carpeta '{carpeta}' creada.")
 
             with open(ruta_completa, 'w', encoding='utf-8') as f:
                 f.write(result.markdown)
-            
+
             print(f"💾 Información guardada en: {ruta_completa}")
             print(f"🎉 ¡Listo! Ahora tienes '{nombre_input}' junto a los otros archivos.")
-            
+
         else:
             print(f"❌ Error al extraer: {result.error_message}")
 
@@ -53,4 +259,17 @@ if __name__ == "__main__":
     # CORRECCIÓN PARA WINDOWS + PLAYWRIGHT
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-    asyncio.run(main())
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Descarga páginas de programas a data/ (interactivo o por lotes).")
+    parser.add_argument("--manifiesto", help="JSON con [{url, archivo}]: activa el modo por lotes")
+    parser.add_argument("--concurrencia", type=int, default=CONCURRENCIA_CRAWLER)
+    parser.add_argument("--data", default=CARPETA_DATA)
+    parser.add_argument("--sin-navegador", action="store_true", help="Convierte el HTML sin crawl4ai (páginas estáticas)")
+    parser.add_argument("--ingerir", action="store_true", help="Si alguna página cambió, corre la ingesta incremental")
+    parser.add_argument("--perfil", default="prod", help="Perfil de pipeline_ingesta para --ingerir")
+    args = parser.parse_args()
+
+    if args.manifiesto:
+        main_lote(args)
+    else:
+        asyncio.run(main())
@@ -0,0 +1,66 @@
+import os
+import re
+
+from programas import PROGRAMA_GENERAL, detectar_programa
+
+# =============================================================================
+# METADATA ESTRUCTURADA DE LOS CHUNKS
+# =============================================================================
+# Antes el programa solo quedaba como texto en el header de cada chunk. Ahora
+# cada chunk lleva programa, tipo de fuente, URL y sección en su metadata, para
+# que la búsqueda pueda filtrar por programa en vez de recorrer todo el corpus.
+
+_re_heading = re.compile(r"^#{1,6}\s+(.*)$", re.MULTILINE)
+_re_link_heading = re.compile(r"^#{1,6}\s*\[[^\]]*\]\((https?://[^)\s]+)\)", re.MULTILINE)
+_re_link_md = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+
+
+def programa_de_archivo(ruta: str) -> str:
+    return detectar_programa(os.path.basename(ruta).replace("_", " ")) or PROGRAMA_GENERAL
+
+
+def url_de_markdown(texto: str) -> str:
+    """Primera URL enlazada desde un encabezado (ej. '#### [DESCRIPCIÓN DEL PROGRAMA](url)')."""
+    m = _re_link_heading.search(texto)
+    return m.group(1) if m else ""
+
+
+def limpiar_titulo(titulo: str) -> str:
+    titulo = _re_link_md.sub(r"\1", titulo)
+    return " ".join(titulo.replace("*", "").split())[:120]
+
+
+def seccion_en(texto: str, posicion: int) -> str:
+    """Título del último encabezado markdown que aparece antes de `posicion`."""
+    seccion = ""
+    for m in _re_heading.finditer(texto, 0, max(posicion, 0) + 1):
+        seccion = limpiar_titulo(m.group(1))
+    return seccion
+
+
+def metadatos_markdown(ruta: str, texto: str) -> dict:
+    return {
+        "programa": programa_de_archivo(ruta),
+        "tipo_fuente": "web",
+        "url_fuente": url_de_markdown(texto),
+    }
+
+
+def metadatos_pdf(ruta: str, url_descarga: str) -> dict:
+    return {
+        "programa": programa_de_archivo(ruta),
+        "tipo_fuente": "pdf",
+        "url_fuente": url_descarga if url_descarga.startswith("http") else "",
+    }
+
+
+def asignar_secciones(documento, chunks) -> None:
+    """Completa metadata['seccion'] de cada chunk (requiere add_start_index=True en el splitter)."""
+    for chunk in chunks:
+        if "seccion" in chunk.metadata:  # El chunker estructural ya la asignó
+            continue
+        if chunk.metadata.get("tipo_fuente") == "pdf":
+            chunk.metadata["seccion"] = f"página {int(chunk.metadata.get('page', 0)) + 1}"
+        else:
+            inicio = chunk.metadata.get("start_index", 0)
+            chunk.metadata["seccion"] = seccion_en(documento.page_content, inicio) or "general"
@@ -1,13 +1,53 @@
+import argparse
+import asyncio
+import os
+import threading
 import time
+
+import numpy as np
 import optuna
 
 from optuna.samplers import NSGAIISampler
+from optuna.trial import TrialState
 
 # Importamos los datos de prueba
 from procesamiento.dataset_para_test import CASOS_PRUEBA
 
-# --- CORRECCIÓN AQUÍ: Quitamos 'armar_query_optimizada' de la lista ---
-from mauricia_v3 import vector_db, conversational_rag_chain, SESSION_ID
+# El módulo completo: vector_db y la cadena se crean en inicializar_sistema(), no al importar
+import mauricia_v3
+
+# =============================================================================
+# EVOLUCIÓN DE HIPERPARÁMETROS (NSGA-II) EN PARALELO Y REANUDABLE
+# =============================================================================
+# - El estudio vive en SQLite (--storage): si el proceso se cae, se vuelve a
+#   lanzar con el mismo comando y sigue donde quedó. Varios procesos pueden
+#   apuntar al mismo archivo y repartirse los trials.
+# - Dentro de un trial los casos van en paralelo (un solo event loop compartido
+#   por todos los trials, con un tope global de llamadas al LLM en vuelo).
+# - --n-jobs trials a la vez (hilos: el trabajo es esperar al LLM).
+# - Poda: tras la primera tanda de casos, si la calidad parcial queda bajo el
+#   percentil PERCENTIL_PODA de los trials completos, el trial se descarta.
+#   Optuna no soporta trial.report/should_prune en estudios multiobjetivo, así
+#   que la regla se aplica aquí y se levanta optuna.TrialPruned a mano.
+#
+# Uso (desde backend/):
+#   python -m procesamiento.optimizar_cerebro --trials 40 --n-jobs 4 --minutos 50
+
+STORAGE = os.getenv("MAURICIA_OPTUNA_STORAGE", "sqlite:///optuna_mauricia.db")
+NOMBRE_ESTUDIO = "evolucion_mauricia"
+CONCURRENCIA_LLM = int(os.getenv("MAURICIA_CONCURRENCIA_OPTUNA", "8"))  # Llamadas en vuelo (todos los trials)
+N_JOBS = 4
+CASOS_PODA = 4         # Casos de la primera tanda (la que decide la poda)
+MIN_TRIALS_PODA = 5    # No se poda hasta tener esta cantidad de trials completos
+PERCENTIL_PODA = 25    # "Claramente malo": peor que el 75% de los trials completos
+EXPANSION_DINERO = " arancel matrícula costo valor anual semestral pesos"
+
+# Un event loop para todo el estudio: el cliente async del LLM no se comparte entre loops
+_bucle = asyncio.new_event_loop()
+threading.Thread(target=_bucle.run_forever, daemon=True, name="optuna-loop").start()
+_semaforo_llm = None
+_vectores_consulta = {}  # query -> embedding (las queries no dependen de los genes)
+
 
 # --- FUNCIÓN DE EVALUACIÓN ---
 def evaluar_respuesta(respuesta_ia: str, palabras_clave: list) -> float:
@@ -17,7 +57,7 @@ def evaluar_respuesta(respuesta_ia: str, palabras_clave: list) -> float:
     for palabra in palabras_clave:
         if palabra.lower() in texto:
             matches += 1
-    
+
     # Puntaje parcial
     if len(palabras_clave) == 0: return 0.0
     if matches == len(palabras_clave):
@@ -26,69 +66,106 @@ def evaluar_respuesta(respuesta_ia: str, palabras_clave: list) -> float:
         return 0.5 + (0.5 * matches / len(palabras_clave))
     return 0.0
 
+def query_caso(caso: dict) -> str:
+    # LÓGICA MANUAL DE OPTIMIZACIÓN DE QUERY (Reemplaza a la función borrada)
+    if caso["tipo"] == "dinero":
+        return caso["pregunta"] + EXPANSION_DINERO
+    return caso["pregunta"]
+
+def orden_casos(casos: list) -> list:
+    """Intercala los tipos: la primera tanda (la de la poda) prueba k_dinero y k_normal a la vez."""
+    por_tipo = {}
+    for caso in casos:
+        por_tipo.setdefault(caso["tipo"], []).append(caso)
+    grupos = list(por_tipo.values())
+    return [g[i] for i in range(max(map(len, grupos))) for g in grupos if i < len(g)]
+
 # --- LÓGICA RAG PERSONALIZADA PARA LA PRUEBA ---
-def ejecutar_rag_experimental(pregunta, k, max_chars):
+async def aejecutar_rag_experimental(pregunta, vector, k, max_chars, session_id):
     """
     Simula el agente pero inyectando los K experimentales del algoritmo genético.
     """
-    # 1. Búsqueda con K variable (el gen que estamos probando)
-    docs = vector_db.similarity_search(pregunta, k=k)
-    
+    # 1. Búsqueda con K variable (el gen que estamos probando); el vector ya está calculado
+    docs = await mauricia_v3.vector_db.asimilarity_search_by_vector(vector, k=k)
+
     # 2. Recorte de contexto variable (el otro gen)
     contexto_str = "\n\n".join([d.page_content for d in docs])
     if len(contexto_str) > max_chars:
         contexto_str = contexto_str[:max_chars]
-        
+
     if not docs:
         contexto_str = "No info."
 
     # 3. Generación (Usamos la cadena real de MauricIA v3)
-    # Usamos un session_id de prueba para no mezclar con tu chat personal
-    respuesta = conversational_rag_chain.invoke(
+    # Una sesión por caso: en paralelo, una sesión compartida mezclaría los historiales
+    respuesta = await mauricia_v3.conversational_rag_chain.ainvoke(
         {"input": pregunta, "context": contexto_str},
-        config={"configurable": {"session_id": "sesion_optuna_training"}}
+        config={"configurable": {"session_id": session_id}}
     )
     return respuesta, len(contexto_str)
 
+async def aevaluar_caso(caso, trial_number, k_normal, k_dinero, max_chars):
+    """(puntaje, latencia) de un caso; la latencia no incluye la espera por el semáforo."""
+    global _semaforo_llm
+    if _semaforo_llm is None:
+        _semaforo_llm = asyncio.Semaphore(CONCURRENCIA_LLM)
+    query_final = query_caso(caso)
+    k_usado = k_dinero if caso["tipo"] == "dinero" else k_normal
+    session_id = f"sesion_optuna_{trial_number}_{CASOS_PRUEBA.index(caso)}"
+
+    async with _semaforo_llm:
+        # Medimos tiempo
+        start_time = time.perf_counter()
+        try:
+            respuesta, _ = await aejecutar_rag_experimental(
+                query_final, _vectores_consulta[query_final], k_usado, max_chars, session_id
+            )
+        except Exception as e:
+            print(f"⚠️ Error en trial {trial_number}: {e}")
+            respuesta = ""
+        latencia = time.perf_counter() - start_time
+
+    mauricia_v3.store.eliminar(session_id)
+    # Evaluamos calidad
+    return evaluar_respuesta(respuesta, caso["debe_contener"]), latencia
+
+def evaluar_tanda(casos, trial_number, k_normal, k_dinero, max_chars) -> list:
+    """Corre la tanda en el loop compartido y espera desde el hilo del trial."""
+    async def tanda():
+        return await asyncio.gather(*(
+            aevaluar_caso(caso, trial_number, k_normal, k_dinero, max_chars) for caso in casos
+        ))
+    return asyncio.run_coroutine_threadsafe(tanda(), _bucle).result()
+
+def debe_podar(trial, calidad_parcial: float) -> bool:
+    completos = trial.study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,))
+    parciales = [t.user_attrs["calidad_parcial"] for t in completos if "calidad_parcial" in t.user_attrs]
+    if len(parciales) < MIN_TRIALS_PODA:
+        return False
+    return calidad_parcial < np.percentile(parciales, PERCENTIL_PODA)
+
 # --- FUNCIÓN OBJETIVO (LO QUE SE OPTIMIZA) ---
 def objective(trial):
     # 🧬 GENES A MUTAR (Hiperparámetros)
-    k_normal = trial.suggest_int("k_normal", 4, 10)       
-    k_dinero = trial.suggest_int("k_dinero", 2, 5)       
-    max_chars = trial.suggest_int("max_chars", 5000, 16000, step=1000) 
+    k_normal = trial.suggest_int("k_normal", 4, 10)
+    k_dinero = trial.suggest_int("k_dinero", 2, 5)
+    max_chars = trial.suggest_int("max_chars", 5000, 16000, step=1000)
 
-    puntajes_calidad = []
-    tiempos_respuesta = []
-    
     print(f"\n🧬 Gen {trial.number}: K_NORM={k_normal}, K_DIN={k_dinero}, CHARS={max_chars}")
 
-    for caso in CASOS_PRUEBA:
-        pregunta_base = caso["pregunta"]
-        
-        # LÓGICA MANUAL DE OPTIMIZACIÓN DE QUERY (Reemplaza a la función borrada)
-        if caso["tipo"] == "dinero":
-            k_usado = k_dinero
-            query_final = pregunta_base + " arancel matrícula costo valor anual semestral pesos"
-        else:
-            k_usado = k_normal
-            query_final = pregunta_base
+    casos = orden_casos(CASOS_PRUEBA)
+    resultados = evaluar_tanda(casos[:CASOS_PODA], trial.number, k_normal, k_dinero, max_chars)
 
-        # Medimos tiempo
-        start_time = time.time()
-        
-        try:
-            respuesta, _ = ejecutar_rag_experimental(query_final, k_usado, max_chars)
-        except Exception as e:
-            print(f"⚠️ Error en trial: {e}")
-            respuesta = ""
-            
-        latencia = time.time() - start_time
-        
-        # Evaluamos calidad
-        score = evaluar_respuesta(respuesta, caso["debe_contener"])
-        
-        puntajes_calidad.append(score)
-        tiempos_respuesta.append(latencia)
+    # ✂️ PODA: la primera tanda ya dice si la configuración es claramente mala
+    calidad_parcial = sum(p for p, _ in resultados) / max(len(resultados), 1)
+    trial.set_user_attr("calidad_parcial", calidad_parcial)
+    if debe_podar(trial, calidad_parcial):
+        print(f"✂️ Gen {trial.number} podado (calidad parcial {calidad_parcial:.2f})")
+        raise optuna.TrialPruned()
+
+    resultados += evaluar_tanda(casos[CASOS_PODA:], trial.number, k_normal, k_dinero, max_chars)
+    puntajes_calidad = [p for p, _ in resultados]
+    tiempos_respuesta = [t for _, t in resultados]
 
     # --- CÁLCULO DE FITNESS ---
     promedio_calidad = sum(puntajes_calidad) / max(len(puntajes_calidad), 1)
@@ -96,34 +173,69 @@ def objective(trial):
 
     # Guardamos métrica secundaria
     trial.set_user_attr("avg_latency", promedio_latencia)
-    
+
     # Optuna minimizará o maximizará según la config del estudio abajo
     return promedio_calidad, promedio_latencia
 
+def preparar_vectores() -> None:
+    """Embeddings de las queries, una sola vez para todo el estudio (con la caché de mauricia_v3)."""
+    for caso in CASOS_PRUEBA:
+        query = query_caso(caso)
+        _vectores_consulta[query] = mauricia_v3.embedding_function.embed_query(query)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimiza k_normal, k_dinero y max_chars con NSGA-II.")
+    parser.add_argument("--trials", type=int, default=20, help="Trials nuevos a correr en esta ejecución")
+    parser.add_argument("--n-jobs", type=int, default=N_JOBS, help="Trials en paralelo")
+    parser.add_argument("--minutos", type=float, help="Tope de tiempo (el trial en curso termina)")
+    parser.add_argument("--storage", default=STORAGE, help="URL de Optuna; el mismo archivo reanuda el estudio")
+    parser.add_argument("--estudio", default=NOMBRE_ESTUDIO)
+    args = parser.parse_args()
+
+    if not mauricia_v3.inicializar_sistema():
+        raise SystemExit("❌ No se pudo inicializar MauricIA v3 (revisa GITHUB_TOKEN y la carpeta del índice).")
+    preparar_vectores()
+
     # Configuración del Algoritmo Genético (NSGA-II)
     # population_size: Cuántos "individuos" crea por generación
-    sampler = NSGAIISampler(population_size=10, mutation_prob=0.15) 
-    
+    sampler = NSGAIISampler(population_size=10, mutation_prob=0.15)
+
+    # SQLite con varios hilos escribiendo: esperar el lock en vez de fallar
+    storage = optuna.storages.RDBStorage(args.storage, engine_kwargs={"connect_args": {"timeout": 30}}) \
+        if args.storage.startswith("sqlite") else args.storage
     study = optuna.create_study(
         directions=["maximize", "minimize"], # Obj 1: Calidad (Max), Obj 2: Tiempo (Min)
         sampler=sampler,
-        study_name="evolucion_mauricia"
+        study_name=args.estudio,
+        storage=storage,
+        load_if_exists=True,
     )
+    previos = len(study.trials)
+    if previos:
+        print(f"♻️ Reanudando '{args.estudio}': {previos} trials ya registrados en {args.storage}")
 
     print("🚀 Iniciando evolución de hiperparámetros...")
-    print("   (Esto tomará unos minutos dependiendo de la cantidad de trials)...")
-    
-    # Ajusta n_trials según tu tiempo. 
-    # 20 trials * 5 preguntas = 100 llamadas al LLM.
-    study.optimize(objective, n_trials=20) 
+    print(f"   ({args.trials} trials, {args.n_jobs} en paralelo, hasta {CONCURRENCIA_LLM} llamadas al LLM en vuelo)")
+
+    inicio = time.perf_counter()
+    study.optimize(
+        objective,
+        n_trials=args.trials,
+        n_jobs=args.n_jobs,
+        timeout=args.minutos * 60 if args.minutos else None,
+    )
+    _bucle.call_soon_threadsafe(_bucle.stop)
+
+    estados = [t.state for t in study.trials]
+    print(f"\n⏱️ {(time.perf_counter() - inicio) / 60:.1f} min | completos: {estados.count(TrialState.COMPLETE)} | "
+          f"podados: {estados.count(TrialState.PRUNED)} | fallidos: {estados.count(TrialState.FAIL)}")
 
     print("\n🏆 === FRONTERA DE PARETO (MEJORES CONFIGURACIONES) ===")
     print(f"{'ID':<4} | {'Calidad':<8} | {'Latencia':<8} | {'Configuración'}")
     print("-" * 60)
-    
+
     for trial in study.best_trials:
         calidad = trial.values[0]
         latencia = trial.values[1]
         params = trial.params
-        print(f"{trial.number:<4} | {calidad:.2f}     | {latencia:.2f}s    | {params}")
\ No newline at end of file
+        print(f"{trial.number:<4} | {calidad:.2f}     | {latencia:.2f}s    | {params}")
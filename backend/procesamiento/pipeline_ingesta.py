@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+from dotenv import load_dotenv
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Ejecutar desde backend/: python -m procesamiento.pipeline_ingesta --perfil prod
+from deduplicacion import DeduplicadorCercano, sin_duplicados
+from hechos import ARCHIVO_HECHOS, AlmacenHechos, con_hechos
+from indice_bm25 import ARCHIVO_BM25, IndiceBM25
+from procesamiento.almacen_embeddings import AlmacenEmbeddings
+from procesamiento.backends_embeddings import BACKENDS, crear_embeddings
+from procesamiento.carga_documentos import ETIQUETAS_PROGRAMA, cargar_documentos, listar_archivos
+from procesamiento.chunker_estructural import ChunkerEstructural
+from procesamiento.ingesta_incremental import SincronizadorIncremental, hash_bytes
+from procesamiento.metadatos import asignar_secciones
+from versiones_indice import limpiar_versiones, preparar_version, publicar_version
+
+try:
+    import resource  # Solo Unix: para reportar el pico de memoria
+except ImportError:
+    resource = None
+
+# =============================================================================
+# PIPELINE DE INGESTA EN STREAMING (MEMORIA ACOTADA)
+# =============================================================================
+# Los scripts armaban la lista completa de documentos, después la de chunks, y
+# recién entonces embebían todo: el pico de memoria crecía con el corpus.
+# Aquí cada etapa es un generador y entre etapas hay colas acotadas:
+#
+#   cargar+limpiar+header (pool de procesos) -> hechos -> dividir
+#   -> sin casi-duplicados -> lotes -> embeber+upsert
+#
+# Cada etapa corre en su propio hilo y se bloquea cuando la cola siguiente está
+# llena, así nunca hay más de unos pocos lotes en memoria, sean dos PDFs o dos
+# mil páginas. Reemplaza los main() de cerebroparaarmarproduccion.py y
+# crear_cerebro_refinado_v6.py (que quedan como atajos a este CLI).
+#
+# Todos los cerebros salen de este mismo pipeline; un perfil solo elige la
+# carpeta, el backend de embeddings y el modelo. Con varios perfiles se
+# construyen uno tras otro y al final se imprime un reporte comparativo:
+#
+#   python -m procesamiento.pipeline_ingesta --perfil prod local_v4 --reporte reporte_ingesta.json
+#   python -m procesamiento.pipeline_ingesta --perfil local_v4 --backend onnx
+
+load_dotenv()
+
+CARPETA_DATA = "data"
+TAM_COLA = 8             # Elementos en espera entre una etapa y la siguiente
+TAM_LOTE_PIPELINE = 256  # Chunks por tramo de embedding + upsert
+
+URLS_POR_PROGRAMA = {
+    "doctorado": "https://www.postgradosudesantiago.cl/wp-content/uploads/2023/Malla_Doctorado_Informatica.pdf",
+    "magister": "https://www.postgradosudesantiago.cl/wp-content/uploads/2023/Malla_Magister_Informatica.pdf",
+    "diplomado": "https://www.postgradosudesantiago.cl/diplomados"
+}
+
+PERFILES = {
+    # Cerebro de la nube (mauricia_v3 / api.py)
+    "prod": {
+        "ruta_db": "chroma_db_prod",
+        "backend": "openai",
+        "modelo": "text-embedding-3-small",
+        "etiquetas": ETIQUETAS_PROGRAMA,
+        "chunker": "estructural",
+        "chunk_size": 1500,
+    },
+    # Lo que construía crear_cerebro_refinado_v6.py (HuggingFace, sin API keys)
+    "local": {
+        "ruta_db": "chroma_db",
+        "backend": "huggingface",
+        "modelo": "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+        "etiquetas": {**ETIQUETAS_PROGRAMA, "diplomado": "DIPLOMADO EN CIBERSEGURIDAD (EJEMPLO)"},
+        "chunker": "estructural",
+        "chunk_size": 1500,
+    },
+    # Cerebro de mauricia_local_v4.py / api_local.py (Ollama): mismo modelo de embeddings que consulta
+    "local_v4": {
+        "ruta_db": "chroma_db_local",
+        "backend": "huggingface",
+        "modelo": "sentence-transformers/all-MiniLM-L6-v2",
+        "etiquetas": ETIQUETAS_PROGRAMA,
+        "chunker": "estructural",
+        "chunk_size": 1500,
+    },
+}
+
+
+CHUNKERS = ("estructural", "recursivo")
+
+
+def crear_splitter(chunker: str, chunk_size: int):
+    """El estructural respeta tablas y secciones (sin solape); el recursivo es el de antes, con 400 de solape."""
+    if chunker == "estructural":
+        return ChunkerEstructural(chunk_size)
+    if chunker == "recursivo":
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=400,
+            separators=["\n\n", "\n", "####", " ", ""],
+            add_start_index=True,  # Para ubicar la sección de cada chunk
+        )
+    raise ValueError(f"Chunker desconocido: {chunker} (disponibles: {', '.join(CHUNKERS)})")
+
+
+# --- Etapas -----------------------------------------------------------------
+_FIN = object()
+ESPERA_COLA_SEG = 0.5  # Cada cuánto el productor bloqueado revisa si el consumidor se fue
+
+
+def en_hilo(generador, tam_cola: int = TAM_COLA):
+    """Corre `generador` en un hilo aparte y entrega sus elementos por una cola acotada."""
+    cola = queue.Queue(maxsize=tam_cola)
+    errores = []
+    detener = threading.Event()  # El consumidor dejó de leer (terminó, falló o lo cerraron)
+
+    def poner(elemento) -> bool:
+        # Se bloquea si el consumidor va atrasado (backpressure), pero no para siempre
+        while not detener.is_set():
+            try:
+                cola.put(elemento, timeout=ESPERA_COLA_SEG)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def productor():
+        try:
+            for elemento in generador:
+                if not poner(elemento):
+                    break
+        except BaseException as e:
+            errores.append(e)
+        finally:
+            if detener.is_set() and hasattr(generador, "close"):
+                generador.close()  # Propaga el cierre a las etapas anteriores
+            poner(_FIN)
+
+    threading.Thread(target=productor, daemon=True).start()
+    try:
+        while True:
+            elemento = cola.get()
+            if elemento is _FIN:
+                break
+            yield elemento
+    finally:
+        detener.set()
+    if errores:
+        raise errores[0]
+
+
+def documentos(carpeta: str, perfil: dict, omitir=()):
+    for resultado in cargar_documentos(carpeta, URLS_POR_PROGRAMA, perfil["etiquetas"], omitir=omitir):
+        yield from resultado.documentos
+
+
+def firma_chunking(perfil: dict, chunker: str) -> str:
+    """Lo que cambia los chunks sin tocar los archivos: si cambia, ninguna fuente se salta."""
+    config = {"chunker": chunker, "chunk_size": perfil["chunk_size"], "etiquetas": perfil["etiquetas"],
+              "urls": URLS_POR_PROGRAMA}
+    return hash_bytes(json.dumps(config, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+
+
+def dividir(docs, splitter):
+    for documento in docs:
+        chunks_doc = splitter.split_documents([documento])
+        asignar_secciones(documento, chunks_doc)
+        yield from chunks_doc
+
+
+def en_lotes(elementos, tam: int):
+    lote = []
+    for elemento in elementos:
+        lote.append(elemento)
+        if len(lote) >= tam:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def pico_memoria_mb() -> float:
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+
+
+# --- Orquestación -------------------------------------------------------------
+def ejecutar(nombre_perfil: str, completo: bool = False, carpeta_data: str = CARPETA_DATA,
+             embedding_model=None, backend: str = None, chunker: str = None) -> dict:
+    perfil = PERFILES[nombre_perfil]
+    ruta_db = perfil["ruta_db"]
+    backend = backend or perfil["backend"]
+    chunker = chunker or perfil["chunker"]
+    if not os.path.exists(carpeta_data):
+        print(f"❌ Error: La carpeta '{carpeta_data}' no existe.")
+        return {}
+
+    print(f"📚 Ingesta '{nombre_perfil}': {carpeta_data} -> {ruta_db} ({perfil['modelo']}, {backend})")
+    inicio = time.perf_counter()
+    embedding_model = embedding_model or crear_embeddings(backend, perfil["modelo"])
+    splitter = crear_splitter(chunker, perfil["chunk_size"])
+
+    # Versión nueva (copia de la activa): la API sigue leyendo la anterior hasta publicar
+    version, ruta_version = preparar_version(ruta_db, copiar=not completo)
+    almacen = AlmacenEmbeddings(perfil["modelo"], backend)
+    sincronizador = SincronizadorIncremental(ruta_version, embedding_model, almacen, completo,
+                                             firma_chunking(perfil, chunker))
+    # Archivos con el mismo hash que en el manifiesto: ni se cargan ni se dividen
+    sin_cambios = sincronizador.omitir_sin_cambios(listar_archivos(carpeta_data))
+
+    # Hechos (arancel, duración, contactos) para la respuesta rápida: los de las
+    # fuentes sin cambios vienen en la copia de la versión; el resto se rearma
+    ruta_hechos = os.path.join(ruta_version, ARCHIVO_HECHOS)
+    if sin_cambios:
+        almacen_hechos = AlmacenHechos(ruta_hechos)
+        almacen_hechos.conservar(sin_cambios)
+    else:
+        almacen_hechos = AlmacenHechos.crear(ruta_hechos)
+    # Los chunks conservados de fuentes sin cambios no pasan por el pipeline: se
+    # registran antes, así una fuente que cambió no duplica lo ya indexado
+    deduplicador = DeduplicadorCercano()
+    for texto, metadata in sincronizador.chunks_conservados():
+        deduplicador.registrar(texto, metadata.get("programa", ""), metadata.get("source", ""))
+    docs = en_hilo(con_hechos(documentos(carpeta_data, perfil, omitir=sin_cambios), almacen_hechos))
+    chunks = en_hilo(sin_duplicados(dividir(docs, splitter), deduplicador, sincronizador.registrar_descarte))
+    for lote in en_hilo(en_lotes(chunks, TAM_LOTE_PIPELINE), tam_cola=2):
+        sincronizador.agregar(lote)
+
+    vectorstore, resumen = sincronizador.terminar()
+    hechos = len(almacen_hechos)
+    almacen_hechos.cerrar()
+    print(f"   - Casi-duplicados descartados: {deduplicador.descartados}")
+    print(f"   - Hechos extraídos: {hechos}")
+    if not resumen["total"]:
+        print("❌ No encontré documentos: no se publica la versión.")
+        shutil.rmtree(ruta_version, ignore_errors=True)
+        return resumen
+
+    # Índice léxico BM25 (junto a la colección, para la búsqueda híbrida)
+    bm25 = IndiceBM25.desde_coleccion(vectorstore)
+    bm25.guardar(os.path.join(ruta_version, ARCHIVO_BM25))
+    print(f"   - Índice BM25 guardado ({len(bm25.vocabulario)} términos).")
+
+    # Publicar: cambio atómico del puntero (la API recarga sola)
+    publicar_version(ruta_db, version)
+    borradas = limpiar_versiones(ruta_db)
+
+    resumen.update({
+        "perfil": nombre_perfil,
+        "backend": backend,
+        "chunker": chunker,
+        "modelo": perfil["modelo"],
+        "version": version,
+        "segundos_totales": round(time.perf_counter() - inicio, 2),
+        "chunks_por_seg": round(resumen["nuevos"] / max(sincronizador.segundos_embeddings, 1e-9), 1),
+        "pico_memoria_mb": round(pico_memoria_mb(), 1),
+        "almacen": almacen.estadisticas(),
+        "hechos": hechos,
+    })
+    print(f"   - Versión {version} publicada ({len(borradas)} versiones antiguas borradas).")
+    print(f"✅ ¡Cerebro '{nombre_perfil}' actualizado! {resumen['total']} fragmentos en "
+          f"{resumen['segundos_totales']} s (pico de memoria {resumen['pico_memoria_mb']} MB).")
+    return resumen
+
+
+# --- Reporte comparativo ---------------------------------------------------------
+COLUMNAS_REPORTE = (
+    ("perfil", "Perfil"),
+    ("backend", "Backend"),
+    ("chunker", "Chunker"),
+    ("total", "Chunks"),
+    ("nuevos", "Embebidos"),
+    ("segundos_embeddings", "Emb. (s)"),
+    ("segundos_totales", "Total (s)"),
+    ("chunks_por_seg", "Chunks/s"),
+    ("pico_memoria_mb", "RAM (MB)"),
+)
+
+
+def reporte_comparativo(resumenes: list) -> str:
+    """Tabla de tiempos lado a lado, una columna por perfil construido."""
+    ancho = max(len(str(r.get(clave, "-"))) for r in resumenes for clave, _ in COLUMNAS_REPORTE) + 2
+    lineas = []
+    for clave, titulo in COLUMNAS_REPORTE:
+        lineas.append(f"{titulo:<12}" + "".join(f"{str(r.get(clave, '-')):>{ancho}}" for r in resumenes))
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingesta incremental en streaming de data/ a la colección vectorial.")
+    parser.add_argument("--perfil", nargs="+", choices=sorted(PERFILES), default=["prod"],
+                        help="Uno o más perfiles (se construyen en orden)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="Reemplaza el backend de embeddings del perfil")
+    parser.add_argument("--chunker", choices=CHUNKERS, help="Reemplaza el chunker del perfil")
+    parser.add_argument("--completo", action="store_true", help="Ignora la versión activa y re-embebe todo")
+    parser.add_argument("--data", default=CARPETA_DATA, help="Carpeta con los .md y .pdf")
+    parser.add_argument("--reporte", help="Guarda los resúmenes de todos los perfiles en este JSON")
+    args = parser.parse_args(argv)
+
+    resumenes = []
+    for nombre in args.perfil:
+        resumen = ejecutar(nombre, completo=args.completo, carpeta_data=args.data, backend=args.backend,
+                           chunker=args.chunker)
+        if resumen:
+            resumenes.append({"perfil": nombre, **resumen})
+
+    if len(resumenes) > 1:
+        print("\n📊 === COMPARATIVA DE INGESTA ===")
+        print(reporte_comparativo(resumenes))
+    if args.reporte:
+        with open(args.reporte, "w", encoding="utf-8") as f:
+            json.dump(resumenes, f, ensure_ascii=False, indent=2)
+        print(f"💾 Reporte guardado en {args.reporte}")
+
+
+if __name__ == "__main__":
+    main()
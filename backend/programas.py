@@ -0,0 +1,57 @@
+import re
+import unicodedata
+
+# =============================================================================
+# DETECCIÓN RÁPIDA DE PROGRAMA (doctorado / magíster)
+# =============================================================================
+# Regex precompiladas sobre texto sin tildes: cuesta microsegundos por mensaje.
+
+PROGRAMA_GENERAL = "general"  # Chunks que no son de un programa (becas generales, etc.)
+
+PROGRAMAS_KW = {
+    "doctorado": ("doctorado", "phd", "doctor en"),
+    "magister": ("magister", "master", "maestria"),
+}
+
+_re_programas = {
+    programa: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in claves) + r")", re.IGNORECASE)
+    for programa, claves in PROGRAMAS_KW.items()
+}
+
+
+def sin_tildes(texto: str) -> str:
+    return "".join(
+        c for c in unicodedata.normalize("NFD", texto or "") if unicodedata.category(c) != "Mn"
+    )
+
+
+def detectar_programa(texto: str):
+    """Devuelve 'doctorado', 'magister' o None. Si menciona ambos, es ambiguo -> None."""
+    plano = sin_tildes(texto)
+    encontrados = [p for p, regex in _re_programas.items() if regex.search(plano)]
+    return encontrados[0] if len(encontrados) == 1 else None
+
+
+def historial_menciona_programa(mensajes) -> bool:
+    plano = sin_tildes(" ".join(str(m.content) for m in mensajes))
+    return any(regex.search(plano) for regex in _re_programas.values())
+
+
+def programa_de_conversacion(user_input: str, mensajes=()):
+    """Programa de la pregunta actual; si no lo nombra, el último mencionado por el usuario."""
+    programa = detectar_programa(user_input)
+    if programa:
+        return programa
+    for m in reversed(list(mensajes)):
+        if m.type == "human":
+            programa = detectar_programa(str(m.content))
+            if programa:
+                return programa
+    return None
+
+
+def filtro_programa(programa):
+    """Filtro de metadata para Chroma/NumPy/BM25: el programa pedido más el contenido general."""
+    if not programa:
+        return None
+    return {"programa": {"$in": [programa, PROGRAMA_GENERAL]}}
@@ -0,0 +1,87 @@
+import os
+
+from indice_bm25 import ARCHIVO_BM25, IndiceBM25
+
+# =============================================================================
+# RECUPERACIÓN HÍBRIDA: VECTORIAL + BM25 CON RECIPROCAL RANK FUSION
+# =============================================================================
+# Cada búsqueda trae candidatos de ambos índices y los fusiona por rango (RRF):
+# un chunk que aparece arriba en los dos sube al primer lugar. Con eso basta un
+# k chico y bien ordenado, en vez de pedir 10 chunks por fuerza bruta.
+
+K_RRF = 60  # Constante estándar de RRF: suaviza el peso de los primeros lugares
+
+
+def fusion_rrf(rankings: list, k_rrf: int = K_RRF) -> list:
+    """Recibe listas de ids ordenadas por relevancia y devuelve los ids fusionados."""
+    puntajes = {}
+    for ranking in rankings:
+        for posicion, doc_id in enumerate(ranking):
+            puntajes[doc_id] = puntajes.get(doc_id, 0.0) + 1.0 / (k_rrf + posicion + 1)
+    return sorted(puntajes, key=puntajes.get, reverse=True)
+
+
+def cargar_bm25(carpeta_db: str, vector_db=None):
+    """Carga el BM25 guardado junto a la colección; si no existe, lo arma desde la colección."""
+    ruta = os.path.join(carpeta_db, ARCHIVO_BM25)
+    if os.path.exists(ruta):
+        indice = IndiceBM25.cargar(ruta)
+        print(f"   - [BM25] Índice léxico cargado: {len(indice)} chunks.")
+        return indice
+    if vector_db is None:
+        return None
+    print(f"   - [BM25] No existe {ruta}: construyendo desde la colección (re-ingesta para evitarlo).")
+    return IndiceBM25.desde_coleccion(vector_db)
+
+
+class RecuperadorHibrido:
+    """
+    Envuelve el motor vectorial (Chroma o IndiceNumpy) y el BM25. Si no hay BM25,
+    se comporta igual que la búsqueda vectorial sola.
+    """
+
+    def __init__(self, vector_db, bm25: IndiceBM25 = None, k_candidatos: int = 20):
+        self.vector_db = vector_db
+        self.bm25 = bm25
+        self.k_candidatos = k_candidatos
+        # Colecciones ingeridas antes de guardar metadata estructurada no se pueden filtrar
+        self.con_metadata = self._tiene_metadata("programa")
+
+    def _tiene_metadata(self, campo: str) -> bool:
+        try:
+            muestra = self.vector_db.get(limit=1, include=["metadatas"])["metadatas"]
+        except Exception:
+            return False
+        return bool(muestra) and campo in (muestra[0] or {})
+
+    @property
+    def hibrido(self) -> bool:
+        return self.bm25 is not None and len(self.bm25) > 0
+
+    def _fusionar(self, query: str, docs_vector: list, k: int, filter: dict = None) -> list:
+        if not self.hibrido:
+            return docs_vector[:k]
+        hits_bm25 = self.bm25.buscar(query, self.k_candidatos, filter)
+
+        por_id = {d.id: d for d in docs_vector}
+        ranking = fusion_rrf([[d.id for d in docs_vector], [self.bm25.ids[i] for i, _ in hits_bm25]])
+        resultado = []
+        for doc_id in ranking[:k]:
+            doc = por_id.get(doc_id)
+            if doc is None:  # Solo lo encontró BM25: el texto viene del propio índice léxico
+                doc = self.bm25.documento(self.bm25.posiciones[doc_id])
+            resultado.append(doc)
+        return resultado
+
+    def _k_vector(self, k: int) -> int:
+        return max(k, self.k_candidatos) if self.hibrido else k
+
+    def buscar(self, query: str, embedding, k: int = 4, filter: dict = None) -> list:
+        filter = filter if self.con_metadata else None
+        docs = self.vector_db.similarity_search_by_vector(embedding, k=self._k_vector(k), filter=filter)
+        return self._fusionar(query, docs, k, filter)
+
+    async def abuscar(self, query: str, embedding, k: int = 4, filter: dict = None) -> list:
+        filter = filter if self.con_metadata else None
+        docs = await self.vector_db.asimilarity_search_by_vector(embedding, k=self._k_vector(k), filter=filter)
+        return self._fusionar(query, docs, k, filter)
@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+from procesamiento.almacen_embeddings import AlmacenEmbeddings
+
+
+def test_backends_distintos_no_comparten_vectores(tmp_path):
+    onnx = AlmacenEmbeddings("org/modelo", "onnx", carpeta=str(tmp_path))
+    onnx.guardar(["Arancel anual"], [[0.5, 0.25]])
+
+    assert AlmacenEmbeddings("org/modelo", "onnx", carpeta=str(tmp_path)).obtener(["Arancel  anual"]) == {
+        "Arancel  anual": [0.5, 0.25]
+    }
+    assert AlmacenEmbeddings("org/modelo", "huggingface", carpeta=str(tmp_path)).obtener(["Arancel anual"]) == {}
+
+
+def test_rechaza_almacen_de_otro_backend(tmp_path):
+    almacen = AlmacenEmbeddings("org/modelo", "onnx", carpeta=str(tmp_path))
+    almacen.guardar(["Arancel anual"], [[0.5, 0.25]])
+    with open(almacen._ruta_meta, "r+", encoding="utf-8") as f:
+        meta = json.load(f)
+        meta["backend"] = "huggingface"
+        f.seek(0), f.truncate(), json.dump(meta, f)
+
+    with pytest.raises(ValueError, match="huggingface"):
+        AlmacenEmbeddings("org/modelo", "onnx", carpeta=str(tmp_path))
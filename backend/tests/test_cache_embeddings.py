@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+from cache_embeddings import EmbeddingsConCache
+
+
+class EmbeddingsFijas:
+    async def aembed_query(self, texto):
+        return [1.0, 2.0]
+
+    async def aembed_documents(self, textos):
+        return [[float(len(t)), 0.0] for t in textos]
+
+
+def test_async_no_toca_sqlite_en_el_event_loop(tmp_path, monkeypatch):
+    cache = EmbeddingsConCache(EmbeddingsFijas(), "modelo", str(tmp_path / "cache.sqlite3"))
+    hilos = []
+    for nombre in ("_buscar", "_guardar"):
+        original = getattr(cache, nombre)
+        def espia(*args, _original=original):
+            hilos.append(threading.get_ident())
+            return _original(*args)
+        monkeypatch.setattr(cache, nombre, espia)
+
+    async def consultas():
+        hilo_loop = threading.get_ident()
+        assert await cache.aembed_query("arancel") == [1.0, 2.0]
+        assert await cache.aembed_query("arancel") == [1.0, 2.0]  # Desde RAM, sin pasar por SQLite
+        assert await cache.aembed_documents(["ab", "abc"]) == [[2.0, 0.0], [3.0, 0.0]]
+        return hilo_loop
+
+    hilo_loop = asyncio.run(consultas())
+    assert len(hilos) == 4 and hilo_loop not in hilos
+    assert cache.estadisticas()["aciertos_memoria"] == 1
+
+    # Lo guardado en el hilo quedó en disco
+    otra = EmbeddingsConCache(EmbeddingsFijas(), "modelo", str(tmp_path / "cache.sqlite3"))
+    assert otra.embed_documents(["ab"]) == [[2.0, 0.0]]
@@ -0,0 +1,43 @@
+from langchain_core.documents import Document
+
+from procesamiento.chunker_estructural import ChunkerEstructural
+
+TABLA = "\n".join(
+    ["| Asignatura | Créditos |", "|---|---|"] + [f"| Asignatura número {i} | {i} |" for i in range(8)]
+)
+
+
+def _ficha():
+    relleno = "Texto descriptivo del programa de postgrado. " * 5
+    return (
+        f"# Doctorado en Informática\n\n{relleno}\n\n"
+        f"## Plan de estudios\n\n{relleno}\n\n{TABLA}\n\n"
+        f"## Aranceles\n\n{relleno}\n\n#### ARANCEL\n\n$ 4.500.000 anual\n"
+    )
+
+
+def _dividir(texto, chunk_size):
+    return ChunkerEstructural(chunk_size).split_documents([Document(page_content=texto, metadata={"source": "d.md"})])
+
+
+def test_una_tabla_nunca_se_corta():
+    chunks = _dividir(_ficha(), 400)
+    assert len(chunks) > 2
+    assert sum(TABLA in c.page_content for c in chunks) == 1
+    assert not any("| Asignatura número" in c.page_content and TABLA not in c.page_content for c in chunks)
+
+
+def test_encabezado_final_pasa_al_chunk_siguiente():
+    # El encabezado cabría al final del primer chunk, pero su contenido no
+    texto = "Párrafo inicial " * 15 + "\n\n## Duración\n\n" + "Cuatro semestres de clases. " * 8
+    chunks = _dividir(texto, 300)
+    assert len(chunks) == 2
+    assert "## Duración" not in chunks[0].page_content
+    assert chunks[1].page_content.startswith("## Duración")
+
+
+def test_start_index_apunta_al_texto():
+    texto = _ficha()
+    for chunk in _dividir(texto, 400):
+        inicio = chunk.metadata["start_index"]
+        assert texto[inicio:inicio + len(chunk.page_content)] == chunk.page_content
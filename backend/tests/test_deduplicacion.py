@@ -0,0 +1,30 @@
+from langchain_core.documents import Document
+
+from deduplicacion import DeduplicadorCercano, unir_contiguos
+
+TEXTO = "0123456789" * 10
+
+
+def _chunk(inicio, fin, source="d.md"):
+    return Document(page_content=TEXTO[inicio:fin], metadata={"source": source, "start_index": inicio})
+
+
+def test_unir_contiguos_une_solapados_y_pegados():
+    # Solapado (20-50 con 40-70), pegado (70-90) y otro documento aparte
+    docs = [_chunk(40, 70), _chunk(20, 50), _chunk(70, 90), _chunk(0, 10, source="otro.md")]
+    assert unir_contiguos(docs) == [TEXTO[20:90], TEXTO[0:10]]
+
+
+def test_unir_contiguos_no_une_lejanos():
+    assert unir_contiguos([_chunk(0, 10), _chunk(50, 60)]) == [TEXTO[0:10], TEXTO[50:60]]
+
+
+def test_deduplicador_conserva_montos_distintos():
+    base = ("El arancel anual del programa de doctorado en ingeniería informática es de {monto} "
+            "y se paga en diez cuotas mensuales con tarjeta o transferencia.")
+    deduplicador = DeduplicadorCercano()
+
+    assert not deduplicador.es_duplicado(base.format(monto="$ 4.500.000"), "doctorado")
+    assert not deduplicador.es_duplicado(base.format(monto="$ 3.836.655"), "doctorado")
+    assert deduplicador.es_duplicado(base.format(monto="$ 4.500.000") + " ", "doctorado")
+    assert deduplicador.descartados == 1
@@ -0,0 +1,36 @@
+import pytest
+
+from procesamiento.almacen_embeddings import AlmacenEmbeddings
+from procesamiento.embedder_lotes import EmbedderLotes
+
+
+class ModeloQueSeCorta:
+    """Embebe `limite` lotes y después falla (sin reintento): simula una corrida cortada."""
+
+    def __init__(self, limite=None):
+        self.limite = limite
+        self.pedidos = []
+
+    async def aembed_documents(self, textos):
+        if self.limite is not None and len(self.pedidos) >= self.limite:
+            raise KeyboardInterrupt
+        self.pedidos.append(list(textos))
+        return [[float(len(t)), 1.0] for t in textos]
+
+
+def test_exige_almacen():
+    with pytest.raises(ValueError):
+        EmbedderLotes(ModeloQueSeCorta(), None)
+
+
+def test_corrida_cortada_se_retoma_desde_el_almacen(tmp_path):
+    textos = [f"chunk {i}" for i in range(6)]
+    cortado = ModeloQueSeCorta(limite=2)
+    with pytest.raises(KeyboardInterrupt):
+        EmbedderLotes(cortado, AlmacenEmbeddings("m", "prueba", str(tmp_path)), tam_lote=2, concurrencia=1).embeber(textos)
+
+    modelo = ModeloQueSeCorta()
+    vectores = EmbedderLotes(modelo, AlmacenEmbeddings("m", "prueba", str(tmp_path)), tam_lote=2).embeber(textos)
+
+    assert modelo.pedidos == [textos[4:]]
+    assert vectores == [[7.0, 1.0]] * 6
@@ -0,0 +1,29 @@
+import asyncio
+import json
+
+from eventos_sse import eventos
+
+
+async def _recolectar(tokens):
+    return [evento async for evento in eventos(tokens)]
+
+
+def test_tokens_y_fin():
+    async def tokens():
+        yield "Hola"
+        yield " 👋"
+
+    salida = asyncio.run(_recolectar(tokens()))
+    assert [json.loads(e[len("data: "):])["token"] for e in salida[:2]] == ["Hola", " 👋"]
+    assert salida[2] == "event: fin\ndata: {}\n\n"
+
+
+def test_error_a_mitad_de_camino():
+    async def tokens():
+        yield "Arancel"
+        raise RuntimeError("Ollama no responde")
+
+    salida = asyncio.run(_recolectar(tokens()))
+    assert len(salida) == 2
+    assert salida[1].startswith("event: error\n")
+    assert json.loads(salida[1].split("data: ", 1)[1])["detail"] == "Ollama no responde"
@@ -0,0 +1,60 @@
+import pytest
+
+from hechos import AlmacenHechos, Hecho, campos_consultados
+
+
+@pytest.mark.parametrize("pregunta", [
+    "¿Cuándo se paga la matrícula del doctorado?",
+    "¿Cuánto tiempo tengo para postular al doctorado?",
+    "¿Cuál es el valor de la tesis?",
+    "¿Hasta cuándo puedo pagar la matrícula?",
+    "¿Cuál es la fecha de matrícula del magíster?",
+    "¿Cuál es el plazo para pagar el arancel?",
+    "¿Cómo postulo al doctorado?",
+    "¿Qué es la matrícula?",
+    "¿Cuál es el valor total del Magíster?",
+    "¿Hay becas para el arancel del doctorado?",
+])
+def test_preguntas_que_no_piden_el_dato_van_al_rag(pregunta):
+    assert campos_consultados(pregunta) == ()
+
+
+@pytest.mark.parametrize("pregunta, campos", [
+    ("¿Cuál es el arancel anual del Doctorado en Informática?", ("arancel",)),
+    ("¿Cuánto cuesta la matrícula del doctorado?", ("matricula",)),
+    ("¿Cuánto cuesta el magíster?", ("matricula", "arancel")),
+    ("¿Cuánto dura el Magíster en Informática?", ("duracion",)),
+    ("¿Cuántos semestres dura el doctorado?", ("duracion",)),
+    ("arancel del doctorado", ("arancel",)),
+    ("¿Quién es el director del magíster?", ("director",)),
+])
+def test_preguntas_por_el_valor(pregunta, campos):
+    assert campos_consultados(pregunta) == campos
+
+
+def test_responder_no_contesta_preguntas_de_plazos(tmp_path):
+    almacen = AlmacenHechos(str(tmp_path / "hechos.sqlite3"))
+    almacen.agregar([Hecho("doctorado", "matricula", "$167.200 semestral")])
+    assert almacen.responder("¿Cuándo se paga la matrícula del doctorado?", "doctorado") is None
+    assert "$167.200" in almacen.responder("¿Cuánto cuesta la matrícula del doctorado?", "doctorado")
+    almacen.cerrar()
+
+
+def test_consultas_desde_memoria_sin_tocar_sqlite(tmp_path):
+    almacen = AlmacenHechos(str(tmp_path / "hechos.sqlite3"))
+    almacen.agregar([Hecho("doctorado", "arancel", "$4.500.000 anual")])
+    almacen.precargar()
+
+    class SinSQLite:
+        def execute(self, *args):
+            raise AssertionError("consulta a SQLite en el camino de la respuesta")
+
+    conexion, almacen._conn = almacen._conn, SinSQLite()
+    assert "$4.500.000" in almacen.responder("¿Cuánto es el arancel del doctorado?", "doctorado")
+    assert almacen.respondidas == 1
+
+    # Escribir invalida la copia en memoria
+    almacen._conn = conexion
+    almacen.agregar([Hecho("magister", "arancel", "$3.836.655 anual")])
+    assert almacen.confiable("magister", "arancel").valor == "$3.836.655 anual"
+    almacen.cerrar()
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from procesamiento.ingesta_local import Pagina, _convertir_sin_navegador, crawlear_lote
+
+
+@pytest.fixture
+def sitio():
+    """Servidor local: ruta -> {"html", "etag"}; el test cambia las páginas entre corridas."""
+    paginas = {}
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            pagina = paginas[self.path]
+            if pagina.get("etag") and self.headers.get("If-None-Match") == pagina["etag"]:
+                self.send_response(304)
+                self.end_headers()
+                return
+            cuerpo = pagina["html"].encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            if pagina.get("etag"):
+                self.send_header("ETag", pagina["etag"])
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    yield base, paginas
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_crawlear_lote_escribe_solo_lo_que_cambio(sitio, tmp_path):
+    base, paginas = sitio
+    paginas["/con_etag"] = {"html": "<h1>Doctorado</h1><p>Arancel $4.500.000</p>", "etag": '"v1"'}
+    paginas["/mismo_texto"] = {"html": "<h1>Magíster</h1><script>var t = 1;</script><p>Duración 4 semestres</p>"}
+    paginas["/cambia"] = {"html": "<h1>Becas</h1><p>Postulación hasta marzo</p>"}
+    lote = [Pagina(base + ruta, ruta.strip("/") + ".md") for ruta in paginas]
+
+    def correr():
+        resultados = asyncio.run(crawlear_lote(lote, str(tmp_path), convertir=_convertir_sin_navegador))
+        return {r.archivo: (r.estado, r.detalle) for r in resultados}
+
+    primera = correr()
+    assert {estado for estado, _ in primera.values()} == {"nueva"}
+    assert "Arancel $4.500.000" in (tmp_path / "con_etag.md").read_text(encoding="utf-8")
+
+    # Solo cambia el HTML (no el markdown) de una y el contenido de otra
+    paginas["/mismo_texto"]["html"] = paginas["/mismo_texto"]["html"].replace("var t = 1;", "var t = 2;")
+    paginas["/cambia"]["html"] = "<h1>Becas</h1><p>Postulación hasta abril</p>"
+    escritura_previa = (tmp_path / "mismo_texto.md").stat().st_mtime_ns
+
+    segunda = correr()
+    assert segunda["con_etag.md"] == ("sin_cambios", "304")
+    assert segunda["mismo_texto.md"] == ("sin_cambios", "hash")
+    assert segunda["cambia.md"] == ("actualizada", "")
+    assert (tmp_path / "mismo_texto.md").stat().st_mtime_ns == escritura_previa
+    assert "hasta abril" in (tmp_path / "cambia.md").read_text(encoding="utf-8")
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+import mauricia_v3
+from cache_respuestas import CacheRespuestas, CacheSemantica
+from memoria_sesiones import AlmacenSesiones
+
+
+class EmbeddingsContador:
+    """Mismo vector para todo texto: cualquier consulta calza con la anterior si el grupo coincide."""
+
+    def __init__(self):
+        self.textos = []
+
+    def embed_query(self, texto):
+        self.textos.append(texto)
+        return [1.0, 0.0, 0.0]
+
+    async def aembed_query(self, texto):
+        return self.embed_query(texto)
+
+
+class RecuperadorFijo:
+    hibrido = True
+
+    def __init__(self):
+        self.vectores = []
+
+    def buscar(self, query, vector, k, filter=None):
+        self.vectores.append(vector)
+        return []
+
+    async def abuscar(self, query, vector, k, filter=None):
+        return self.buscar(query, vector, k, filter)
+
+
+@pytest.fixture
+def sistema(monkeypatch):
+    embeddings = EmbeddingsContador()
+    monkeypatch.setattr(mauricia_v3, "embedding_function", embeddings)
+    monkeypatch.setattr(mauricia_v3, "recuperador", RecuperadorFijo())
+    monkeypatch.setattr(mauricia_v3, "almacen_hechos", None)
+    monkeypatch.setattr(mauricia_v3, "version_indice", "v1")
+    monkeypatch.setattr(mauricia_v3, "store", AlmacenSesiones(10, 60, 20))
+    monkeypatch.setattr(mauricia_v3, "cache_respuestas", CacheRespuestas(10))
+    monkeypatch.setattr(mauricia_v3, "cache_semantica", CacheSemantica(10, umbral=0.9))
+    return embeddings
+
+
+def test_un_solo_embedding_por_consulta(sistema):
+    pregunta = "¿Cuál es el arancel del doctorado?"
+    cacheada, ctx, vector, _ = asyncio.run(mauricia_v3._aprerecuperacion(pregunta, "s1"))
+
+    assert cacheada is None
+    assert sistema.textos == [pregunta + " arancel matrícula costo valor"]
+    assert mauricia_v3.recuperador.vectores == [vector]
+
+    # El vector guardado en la caché semántica es el de la búsqueda: la repetición calza
+    mauricia_v3._guardar_en_cache(ctx, pregunta, vector, [], "Son $4.500.000")
+    cacheada, *_ = asyncio.run(mauricia_v3._aprerecuperacion(pregunta, "s2"))
+    assert cacheada == "Son $4.500.000"
+    assert len(sistema.textos) == 2
+
+
+def test_cobros_distintos_no_comparten_cache_semantica(sistema):
+    matricula = "¿Qué valor tiene la matrícula del doctorado?"
+    _, ctx, vector, _ = asyncio.run(mauricia_v3._aprerecuperacion(matricula, "s1"))
+    mauricia_v3._guardar_en_cache(ctx, matricula, vector, [], "Cuesta $167.000")
+
+    # Con la expansión de dinero ambos vectores se parecen: el grupo los separa
+    cacheada, *_ = asyncio.run(mauricia_v3._aprerecuperacion("¿Qué valor tiene el arancel del doctorado?", "s2"))
+    assert cacheada is None
+
+
+def test_cadena_en_modo_reproducir_sin_variables_de_entorno(tmp_path, monkeypatch):
+    from langchain_chroma import Chroma
+    from llm_grabado import PREFIJO_SUSTITUTO, EmbeddingsSustitutas
+
+    monkeypatch.chdir(tmp_path)
+    for variable in ("GITHUB_TOKEN", "OPENAI_BASE_URL", "MODEL_NAME"):
+        monkeypatch.delenv(variable, raising=False)
+    Chroma(persist_directory=mauricia_v3.CARPETA_DB, embedding_function=EmbeddingsSustitutas()).add_texts(
+        ["Los requisitos de admisión incluyen licenciatura y entrevista.", "La biblioteca abre a las 9."]
+    )
+
+    monkeypatch.setattr(mauricia_v3, "MODO_LLM", "reproducir")
+    monkeypatch.setattr(mauricia_v3, "INTERVALO_RECARGA_INDICE_SEG", 0)
+    monkeypatch.setattr(mauricia_v3, "store", AlmacenSesiones(10, 60, 20))
+    monkeypatch.setattr(mauricia_v3, "cache_respuestas", CacheRespuestas(10))
+    monkeypatch.setattr(mauricia_v3, "cache_semantica", CacheSemantica(10))
+    for variable in ("sistema_cargado", "vector_db", "recuperador", "almacen_hechos", "embedding_function",
+                     "conversational_rag_chain", "llm", "version_indice", "vigilante_indice"):
+        monkeypatch.setattr(mauricia_v3, variable, getattr(mauricia_v3, variable))
+
+    assert mauricia_v3.inicializar_sistema()
+    respuesta = mauricia_v3.obtener_respuesta_agente("¿Qué requisitos de admisión piden?", "s1")
+
+    # Sin grabaciones contesta el sustituto, que repite el prompt: trae el chunk recuperado
+    assert respuesta.startswith(PREFIJO_SUSTITUTO)
+    assert "licenciatura y entrevista" in respuesta
+    assert mauricia_v3.estadisticas_cache()["llm"]["fallos"] == 1
+
+
+def test_recargar_indice_cierra_la_version_anterior(tmp_path, monkeypatch):
+    import os
+    import sqlite3
+
+    from langchain_chroma import Chroma
+
+    from hechos import ARCHIVO_HECHOS, AlmacenHechos
+    from llm_grabado import EmbeddingsSustitutas
+    from versiones_indice import preparar_version
+
+    embeddings = EmbeddingsSustitutas(8)
+    monkeypatch.setattr(mauricia_v3, "embedding_function", embeddings)
+    monkeypatch.setattr(mauricia_v3, "GRACIA_CIERRE_INDICE_SEG", 0)
+    for variable in ("vector_db", "recuperador", "almacen_hechos", "version_indice", "ruta_indice"):
+        monkeypatch.setattr(mauricia_v3, variable, getattr(mauricia_v3, variable))
+
+    def version():
+        nombre, ruta = preparar_version(str(tmp_path / "indice"), copiar=False)
+        Chroma(persist_directory=ruta, embedding_function=embeddings).add_texts(["El arancel anual es $4.500.000"])
+        AlmacenHechos.crear(os.path.join(ruta, ARCHIVO_HECHOS)).cerrar()
+        mauricia_v3._recargar_indice(nombre, ruta)
+        return ruta, mauricia_v3.almacen_hechos
+
+    # Falla aquí (y no en silencio en producción) si chromadb cambia su registro privado
+    sistemas = mauricia_v3._sistemas_chroma()
+    assert sistemas is not None
+
+    primera, hechos_primera = version()
+    segunda, hechos_segunda = version()
+    tercera, _ = version()
+
+    for ruta, hechos in ((primera, hechos_primera), (segunda, hechos_segunda)):
+        assert ruta not in sistemas
+        with pytest.raises(sqlite3.ProgrammingError):
+            hechos.buscar("doctorado", "arancel")
+    assert tercera in sistemas
+    assert mauricia_v3.recuperador.buscar("arancel", embeddings.embed_query("arancel"), k=1)
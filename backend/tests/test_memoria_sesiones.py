@@ -0,0 +1,83 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import memoria_sesiones
+from memoria_sesiones import AlmacenSesiones, HistorialAcotado
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """Reloj manual para time.monotonic: el TTL se prueba sin dormir."""
+    ahora = [1000.0]
+    monkeypatch.setattr(memoria_sesiones.time, "monotonic", lambda: ahora[0])
+    return ahora
+
+
+def _tipos(historial):
+    return [m.type for m in historial.messages]
+
+
+def test_recorta_por_turnos_completos():
+    historial = HistorialAcotado(max_mensajes=4)
+    for i in range(3):
+        historial.add_user_message(f"pregunta {i}")
+        historial.add_ai_message(f"respuesta {i}")
+
+    assert [m.content for m in historial.messages] == ["pregunta 1", "respuesta 1", "pregunta 2", "respuesta 2"]
+
+
+def test_sin_alternancia_estricta_nunca_parte_con_una_respuesta():
+    historial = HistorialAcotado(max_mensajes=4)
+    for mensaje in (HumanMessage("hola"), AIMessage("¡Hola!"), AIMessage("¿En qué te ayudo?"),
+                    HumanMessage("arancel"), AIMessage("$4.500.000")):
+        historial.add_message(mensaje)
+    assert _tipos(historial) == ["human", "ai"]
+
+    # Dos preguntas seguidas (un turno que falló antes de responder)
+    historial = HistorialAcotado(max_mensajes=3)
+    for mensaje in (HumanMessage("a"), HumanMessage("b"), AIMessage("c"), HumanMessage("d")):
+        historial.add_message(mensaje)
+    assert [m.content for m in historial.messages] == ["b", "c", "d"]
+
+
+def test_lru_desaloja_la_sesion_menos_usada(reloj):
+    store = AlmacenSesiones(max_sesiones=2, ttl_segundos=60)
+    a = store.obtener("a")
+    store.obtener("b")
+    assert store.obtener("a") is a  # Leer "a" la deja como la más reciente
+
+    store.obtener("c")
+    assert "b" not in store
+    assert "a" in store and "c" in store
+    assert len(store) == 2
+
+
+def test_ttl_expira_solo_las_sesiones_inactivas(reloj):
+    store = AlmacenSesiones(ttl_segundos=60)
+    store.obtener("vieja").add_user_message("hola")
+    reloj[0] += 40
+    store.obtener("activa")
+    reloj[0] += 30  # "vieja" lleva 70 s sin uso, "activa" solo 30
+
+    assert store.purgar_expiradas() == 1
+    assert not store.existe("vieja")
+    assert store.existe("activa")
+    # El mismo id vuelve a empezar con un historial vacío
+    assert store.obtener("vieja").messages == []
+
+
+def test_existe_no_crea_y_eliminar_avisa(reloj):
+    descartadas = []
+    store = AlmacenSesiones(ttl_segundos=60, al_descartar=descartadas.append)
+    assert not store.existe("s1")
+    assert len(store) == 0
+
+    store.obtener("s1")
+    assert store.existe("s1")
+    store.eliminar("s1")
+    assert not store.existe("s1")
+
+    store.obtener("s2")
+    reloj[0] += 61
+    store.obtener("s3")
+    assert descartadas == ["s1", "s2"]
@@ -0,0 +1,151 @@
+import os
+
+import pytest
+
+from hechos import ARCHIVO_HECHOS, AlmacenHechos
+from procesamiento import pipeline_ingesta
+from versiones_indice import ruta_activa
+
+
+class EmbeddingsContador:
+    def __init__(self):
+        self.textos = []
+
+    def embed_documents(self, textos):
+        self.textos.extend(textos)
+        return [[float(len(t)), 1.0] for t in textos]
+
+    async def aembed_documents(self, textos):
+        return self.embed_documents(textos)
+
+    def embed_query(self, texto):
+        return [float(len(texto)), 1.0]
+
+
+@pytest.fixture(autouse=True)
+def sistemas_chroma_limpios():
+    """Cada test corre en su tmp_path con las mismas rutas relativas: Chroma no debe reusar el System del anterior."""
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    yield
+    SharedSystemClient.clear_system_cache()
+
+
+@pytest.fixture
+def cargados(monkeypatch):
+    """Rutas que llegó a cargar cada corrida de la ingesta (en un solo proceso)."""
+    original = pipeline_ingesta.cargar_documentos
+    corridas = []
+
+    def cargar(carpeta, urls, etiquetas=None, omitir=()):
+        resultados = list(original(carpeta, urls, etiquetas, procesos=1, omitir=omitir))
+        corridas.append([r.ruta for r in resultados])
+        return resultados
+
+    monkeypatch.setattr(pipeline_ingesta, "cargar_documentos", cargar)
+    return corridas
+
+
+def test_fuentes_sin_cambios_no_se_cargan(tmp_path, monkeypatch, cargados):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    with open("data/doctorado.md", "w", encoding="utf-8") as f:
+        f.write("# Doctorado en Informática\n\n#### ARANCEL: $ 4.500.000 anual\n")
+    with open("data/magister.md", "w", encoding="utf-8") as f:
+        f.write("# Magíster en Informática\n\n#### DURACIÓN: 4 semestres\n")
+
+    pipeline_ingesta.ejecutar("prod", embedding_model=EmbeddingsContador())
+    assert cargados == [["data/doctorado.md", "data/magister.md"]]
+
+    with open("data/magister.md", "a", encoding="utf-8") as f:
+        f.write("\nClases presenciales los sábados.\n")
+    modelo = EmbeddingsContador()
+    resumen = pipeline_ingesta.ejecutar("prod", embedding_model=modelo)
+
+    assert cargados[-1] == ["data/magister.md"]
+    assert resumen["fuentes_omitidas"] == 1
+    assert all("Doctorado" not in t for t in modelo.textos)
+    # Los hechos de la fuente omitida se conservan desde la versión anterior
+    hechos = AlmacenHechos(os.path.join(ruta_activa("chroma_db_prod"), ARCHIVO_HECHOS))
+    assert hechos.confiable("doctorado", "arancel") is not None
+    assert hechos.confiable("magister", "duracion") is not None
+    hechos.cerrar()
+
+
+def test_fuente_cambiada_no_duplica_lo_conservado(tmp_path, monkeypatch, cargados):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    arancel = "# Doctorado en Informática\n\n#### ARANCEL: $ 4.500.000 anual\n"
+    with open("data/doctorado.md", "w", encoding="utf-8") as f:
+        f.write(arancel)
+    with open("data/doctorado_2.md", "w", encoding="utf-8") as f:
+        f.write("# Doctorado en Informática\n\n#### DURACIÓN: 8 semestres\n")
+    pipeline_ingesta.ejecutar("prod", embedding_model=EmbeddingsContador())
+
+    # La fuente que cambió copia el chunk de una que no cambió (y que no se vuelve a cargar)
+    with open("data/doctorado_2.md", "w", encoding="utf-8") as f:
+        f.write(arancel + "\n")
+    modelo = EmbeddingsContador()
+    resumen = pipeline_ingesta.ejecutar("prod", embedding_model=modelo)
+
+    assert cargados[-1] == ["data/doctorado_2.md"]
+    # Igual que una reconstrucción completa: el casi-duplicado no entra al índice
+    assert modelo.textos == []
+    assert resumen["total"] == 1
+
+
+def _textos_indice(ruta_db):
+    from langchain_chroma import Chroma
+
+    return sorted(Chroma(persist_directory=ruta_activa(ruta_db))._collection.get()["documents"])
+
+
+def test_incremental_recupera_lo_descartado_cuando_cambia_el_original(tmp_path, monkeypatch, cargados):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    arancel = "#### ARANCEL\n\n" + "El programa se imparte en Santiago. " * 25 + "El arancel anual es de $ 4.500.000\n"
+    with open("data/doctorado_a.md", "w", encoding="utf-8") as f:
+        f.write("# Doctorado en Informática\n\n" + arancel)
+    with open("data/doctorado_b.md", "w", encoding="utf-8") as f:
+        f.write("# Doctorado en Informática\n\n" + arancel
+                + "\n#### DURACIÓN\n\n" + "Ocho semestres con tesis doctoral. " * 25 + "\n")
+    pipeline_ingesta.ejecutar("prod", embedding_model=EmbeddingsContador())
+    assert sum("4.500.000" in t for t in _textos_indice("chroma_db_prod")) == 1  # La copia de b se descartó
+
+    # Cambia a (el original); b no cambió, pero su chunk descartado tiene que volver
+    with open("data/doctorado_a.md", "w", encoding="utf-8") as f:
+        f.write("# Doctorado en Informática\n\n#### CONTACTO\n\nEscribe a postgrado@usach.cl\n")
+    pipeline_ingesta.ejecutar("prod", embedding_model=EmbeddingsContador())
+    assert cargados[-1] == ["data/doctorado_a.md", "data/doctorado_b.md"]
+    incremental = _textos_indice("chroma_db_prod")
+    assert any("4.500.000" in t for t in incremental)
+
+    pipeline_ingesta.ejecutar("prod", completo=True, embedding_model=EmbeddingsContador())
+    assert _textos_indice("chroma_db_prod") == incremental
+
+    # Sin cambios, las dos se vuelven a saltar
+    pipeline_ingesta.ejecutar("prod", embedding_model=EmbeddingsContador())
+    assert cargados[-1] == []
+
+
+def test_en_hilo_libera_al_productor_si_el_consumidor_se_va(monkeypatch):
+    import threading
+
+    monkeypatch.setattr(pipeline_ingesta, "ESPERA_COLA_SEG", 0.01)
+    cerrado = threading.Event()
+
+    def infinito():
+        try:
+            n = 0
+            while True:
+                n += 1
+                yield n
+        finally:
+            cerrado.set()
+
+    # Dos etapas encadenadas, como en ejecutar(): el cierre tiene que llegar hasta la primera
+    salida = pipeline_ingesta.en_hilo(pipeline_ingesta.en_hilo(infinito(), tam_cola=1), tam_cola=1)
+    assert next(salida) == 1
+    salida.close()
+
+    assert cerrado.wait(timeout=5)
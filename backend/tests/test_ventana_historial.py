@@ -0,0 +1,50 @@
+from memoria_sesiones import HistorialAcotado
+from ventana_historial import PREFIJO_RESUMEN, VentanaHistorial
+
+
+def test_turnos_identicos_repetidos_tambien_se_pliegan():
+    plegados = []
+
+    def resumir(previo, mensajes):
+        plegados.extend(m.content for m in mensajes)
+        return f"{previo}\n{len(plegados)} plegados".strip()
+
+    # Presupuesto para un solo turno: cada turno nuevo empuja al anterior fuera de la ventana
+    ventana = VentanaHistorial(presupuesto_tokens=30, resumidor=resumir)
+    historial = HistorialAcotado(max_mensajes=6)
+    for _ in range(5):
+        historial.add_user_message("¿Cuál es el arancel?")
+        historial.add_ai_message("$4.500.000 anual")
+        recortado = ventana.recortar(historial.messages, "s1")
+
+    # 5 turnos iguales, el último sigue en la ventana: los otros 4 se plegaron una vez cada uno
+    assert plegados == ["¿Cuál es el arancel?", "$4.500.000 anual"] * 4
+    assert recortado[0].content == PREFIJO_RESUMEN + "\n".join(f"{n} plegados" for n in (2, 4, 6, 8))
+    assert [m.content for m in recortado[1:]] == ["¿Cuál es el arancel?", "$4.500.000 anual"]
+
+
+def test_sesion_expirada_no_hereda_el_resumen_anterior(monkeypatch):
+    import memoria_sesiones
+    from memoria_sesiones import AlmacenSesiones
+
+    reloj = [1000.0]
+    monkeypatch.setattr(memoria_sesiones.time, "monotonic", lambda: reloj[0])
+    ventana = VentanaHistorial(presupuesto_tokens=30)
+    store = AlmacenSesiones(ttl_segundos=60, max_mensajes=20, al_descartar=ventana.olvidar)
+
+    def conversar(preguntas):
+        for pregunta in preguntas:
+            historial = store.obtener("usuario_web_default")
+            historial.add_user_message(pregunta)
+            historial.add_ai_message("Anotado.")
+            recortado = ventana.recortar(historial.messages, "usuario_web_default")
+        return recortado
+
+    recortado = conversar(["mi rut secreto es 12.345.678-0", "¿Cuál es el arancel?", "¿Y la duración?"])
+    assert "12.345.678-0" in recortado[0].content
+
+    # La sesión expira; otro visitante llega con el mismo id y pasa el presupuesto
+    reloj[0] += 61
+    recortado = conversar(["hola", "¿Qué programas hay?", "¿Cuánto dura el magíster?"])
+    assert recortado[0].content.startswith(PREFIJO_RESUMEN)
+    assert "12.345.678-0" not in recortado[0].content
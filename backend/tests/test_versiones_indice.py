@@ -0,0 +1,40 @@
+import os
+
+from versiones_indice import (
+    ARCHIVO_PUBLICADA,
+    limpiar_versiones,
+    publicar_version,
+    ruta_version,
+    version_activa,
+)
+
+
+def _publicar(base, nombre, en):
+    os.makedirs(ruta_version(str(base), nombre))
+    publicar_version(str(base), nombre)
+    with open(os.path.join(ruta_version(str(base), nombre), ARCHIVO_PUBLICADA), "w", encoding="utf-8") as f:
+        f.write(str(en))
+
+
+def _versiones(base):
+    return sorted(os.listdir(os.path.join(base, "versiones")))
+
+
+def test_no_borra_versiones_que_la_api_puede_tener_abiertas(tmp_path):
+    # Tres publicaciones seguidas: la API pudo quedarse en cualquiera de ellas
+    for i, nombre in enumerate(["v1", "v2", "v3", "v4"]):
+        _publicar(tmp_path, nombre, en=1000.0 + i)
+
+    assert limpiar_versiones(str(tmp_path), conservar=1, margen_seg=100, ahora=1050.0) == []
+    assert _versiones(tmp_path) == ["v1", "v2", "v3", "v4"]
+
+
+def test_borra_lo_reemplazado_hace_mas_que_el_margen(tmp_path):
+    _publicar(tmp_path, "v1", en=1000.0)
+    _publicar(tmp_path, "v2", en=1100.0)
+    _publicar(tmp_path, "v3", en=1190.0)
+
+    # v1 fue reemplazada hace 100 s; v2 hace solo 10 s (puede seguir en gracia)
+    assert limpiar_versiones(str(tmp_path), conservar=1, margen_seg=50, ahora=1200.0) == ["v1"]
+    assert _versiones(tmp_path) == ["v2", "v3"]
+    assert version_activa(str(tmp_path)) == "v3"
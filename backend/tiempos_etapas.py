@@ -0,0 +1,67 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# =============================================================================
+# TIEMPOS POR ETAPA DE CADA PETICIÓN (SERVER-TIMING)
+# =============================================================================
+# El pipeline marca sus etapas (embedding, búsqueda, LLM...) con `etapa()` y
+# la API las devuelve en la cabecera Server-Timing de la respuesta. Así la
+# prueba de carga (procesamiento/prueba_carga.py) y las DevTools del navegador
+# ven dónde se fue el tiempo de cada consulta, sin logs ni servicios aparte.
+#
+# Los tiempos viven en una ContextVar: cada petición (cada tarea de asyncio)
+# tiene los suyos. Fuera de una petición iniciada, etapa() no registra nada.
+
+_etapas = contextvars.ContextVar("etapas_peticion", default=None)
+
+
+def iniciar() -> dict:
+    """Empieza a registrar etapas en el contexto actual (lo llama el middleware de la API)."""
+    etapas = {"ms": {}, "ruta": ""}
+    _etapas.set(etapas)
+    return etapas
+
+
+@contextmanager
+def etapa(nombre: str):
+    etapas = _etapas.get()
+    if etapas is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        etapas["ms"][nombre] = etapas["ms"].get(nombre, 0.0) + ms  # Se acumula si la etapa se repite
+
+
+def marcar_ruta(ruta: str) -> None:
+    """Cómo se respondió: directa, hechos, cache_semantica, cache, llm o error."""
+    etapas = _etapas.get()
+    if etapas is not None:
+        etapas["ruta"] = ruta
+
+
+def cabecera_server_timing(etapas: dict, total_ms: float = None) -> str:
+    partes = [f"{nombre};dur={ms:.1f}" for nombre, ms in etapas["ms"].items()]
+    if total_ms is not None:
+        partes.append(f"total;dur={total_ms:.1f}")
+    if etapas["ruta"]:
+        partes.append(f'ruta;desc="{etapas["ruta"]}"')
+    return ", ".join(partes)
+
+
+def leer_server_timing(cabecera: str):
+    """Inversa de cabecera_server_timing: ({etapa: ms}, ruta)."""
+    ms, ruta = {}, ""
+    for parte in (cabecera or "").split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        for parametro in parametros.split(";"):
+            clave, _, valor = parametro.strip().partition("=")
+            if clave == "dur":
+                ms[nombre] = float(valor)
+            elif clave == "desc" and nombre == "ruta":
+                ruta = valor.strip('"')
+    return ms, ruta
@@ -0,0 +1,206 @@
+import threading
+from collections import OrderedDict
+
+import tiktoken
+import xxhash
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableLambda
+
+# =============================================================================
+# VENTANA DE HISTORIAL CON PRESUPUESTO DE TOKENS
+# =============================================================================
+# RunnableWithMessageHistory inyecta TODO el chat_history en cada turno. Esta
+# etapa deja solo los turnos recientes que caben en el presupuesto y pliega los
+# más antiguos en un resumen que se guarda en caché por sesión: solo se vuelve a
+# calcular cuando la ventana se desplaza (cuando un mensaje nuevo sale de ella).
+
+PREFIJO_RESUMEN = "RESUMEN DE LA CONVERSACIÓN ANTERIOR:\n"
+TOKENS_POR_MENSAJE = 4  # Sobrecarga aproximada de rol/separadores por mensaje
+
+
+class _CodificadorAproximado:
+    """Respaldo cuando tiktoken no puede descargar su vocabulario (pod sin internet)."""
+
+    def encode(self, texto: str, disallowed_special=()):
+        return range((len(texto) + 3) // 4)  # ~4 caracteres por token en español
+
+
+def _codificador(modelo: str):
+    try:
+        try:
+            # GitHub Models usa nombres tipo "openai/gpt-4o-mini"
+            return tiktoken.encoding_for_model(modelo.split("/")[-1])
+        except KeyError:
+            # Modelos sin tokenizer conocido (ej. llama3.1 en Ollama): aproximamos
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"⚠️ [HISTORIAL] tiktoken no disponible ({type(e).__name__}), se cuentan tokens aproximados.")
+        return _CodificadorAproximado()
+
+
+def _huella(mensaje, posicion: int) -> str:
+    """
+    Huella de (orden, contenido): dos turnos idénticos ("¿y el arancel?" dos veces)
+    son mensajes distintos y ambos se pliegan. El orden es el id que pone
+    HistorialAcotado (no cambia al recortar el inicio) o, sin id, la posición.
+    """
+    orden = mensaje.id if getattr(mensaje, "id", None) else posicion
+    return xxhash.xxh3_64_hexdigest(f"{orden}\x00{mensaje.type}\x00{mensaje.content}".encode("utf-8"))
+
+
+def resumen_extractivo(resumen_previo: str, mensajes: list) -> str:
+    """Resumen sin LLM: conserva lo que preguntó el usuario (ahí vive el programa de interés)."""
+    lineas = [resumen_previo] if resumen_previo else []
+    for m in mensajes:
+        texto = " ".join(str(m.content).split())
+        if m.type == "human":
+            lineas.append(f"- El usuario preguntó: {texto[:200]}")
+        elif m.type == "ai":
+            lineas.append(f"- MauricIA respondió: {texto[:120]}")
+    return "\n".join(lineas)
+
+
+def crear_resumidor_llm(llm):
+    """
+    Devuelve (resumir, aresumir) que pliegan mensajes en el resumen usando el LLM.
+    Si el LLM falla, se usa el resumen extractivo para no romper el turno.
+    """
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system",
+         "Resume la conversación en máximo 5 viñetas breves. Conserva el programa de "
+         "postgrado de interés, montos y datos ya entregados. No inventes nada."),
+        ("human", "RESUMEN PREVIO:\n{previo}\n\nNUEVOS MENSAJES:\n{nuevos}"),
+    ])
+    cadena = prompt | llm | StrOutputParser()
+
+    def _entrada(resumen_previo, mensajes):
+        nuevos = "\n".join(f"{m.type}: {m.content}" for m in mensajes)
+        return {"previo": resumen_previo or "(vacío)", "nuevos": nuevos}
+
+    def resumir(resumen_previo, mensajes):
+        try:
+            return cadena.invoke(_entrada(resumen_previo, mensajes))
+        except Exception as e:
+            print(f"⚠️ [HISTORIAL] Resumen LLM falló, uso extractivo: {e}")
+            return resumen_extractivo(resumen_previo, mensajes)
+
+    async def aresumir(resumen_previo, mensajes):
+        try:
+            return await cadena.ainvoke(_entrada(resumen_previo, mensajes))
+        except Exception as e:
+            print(f"⚠️ [HISTORIAL] Resumen LLM falló, uso extractivo: {e}")
+            return resumen_extractivo(resumen_previo, mensajes)
+
+    return resumir, aresumir
+
+
+class VentanaHistorial:
+    """
+    Recorta el historial a los mensajes más recientes que caben en `presupuesto_tokens`
+    (contados con tiktoken) y antepone un resumen acumulado de los turnos que quedaron fuera.
+    """
+
+    def __init__(self, presupuesto_tokens: int = 1500, modelo: str = "gpt-4o-mini",
+                 resumidor=None, aresumidor=None, max_sesiones: int = 1000,
+                 presupuesto_resumen: int = 300):
+        self.presupuesto_tokens = presupuesto_tokens
+        self.presupuesto_resumen = presupuesto_resumen
+        self.max_sesiones = max_sesiones
+        self._enc = _codificador(modelo)
+        self._resumir = resumidor or resumen_extractivo
+        self._aresumir = aresumidor
+        self._resumenes = OrderedDict()  # session_id -> (huellas plegadas, resumen)
+        self._lock = threading.Lock()
+
+    def contar_tokens(self, texto: str) -> int:
+        return len(self._enc.encode(texto or "", disallowed_special=()))
+
+    def _tokens_mensaje(self, mensaje) -> int:
+        return self.contar_tokens(str(mensaje.content)) + TOKENS_POR_MENSAJE
+
+    def _inicio_ventana(self, mensajes: list) -> int:
+        """Índice del primer mensaje que entra en la ventana (se recorre desde el final)."""
+        usados = 0
+        inicio = len(mensajes)
+        for i in range(len(mensajes) - 1, -1, -1):
+            usados += self._tokens_mensaje(mensajes[i])
+            if usados > self.presupuesto_tokens:
+                break
+            inicio = i
+        # La ventana siempre parte en una pregunta del usuario
+        while inicio < len(mensajes) and mensajes[inicio].type != "human":
+            inicio += 1
+        return inicio
+
+    def _pendientes(self, session_id: str, fuera: list):
+        huellas = [_huella(m, i) for i, m in enumerate(fuera)]
+        with self._lock:
+            plegadas, resumen = self._resumenes.get(session_id, (frozenset(), ""))
+        nuevos = [m for m, h in zip(fuera, huellas) if h not in plegadas]
+        return resumen, nuevos, frozenset(huellas)
+
+    def _guardar(self, session_id: str, huellas: frozenset, resumen: str) -> None:
+        # Acotamos el resumen para que no crezca sin límite: se conservan las últimas líneas
+        while self.contar_tokens(resumen) > self.presupuesto_resumen and "\n" in resumen:
+            resumen = resumen.split("\n", 1)[1]
+        with self._lock:
+            self._resumenes.pop(session_id, None)
+            self._resumenes[session_id] = (huellas, resumen)
+            while len(self._resumenes) > self.max_sesiones:
+                self._resumenes.popitem(last=False)
+
+    def olvidar(self, session_id: str) -> None:
+        """Descarta el resumen de la sesión (AlmacenSesiones.al_descartar la llama al expirar)."""
+        with self._lock:
+            self._resumenes.pop(session_id, None)
+
+    def _componer(self, resumen: str, ventana: list) -> list:
+        if not resumen:
+            return ventana
+        return [SystemMessage(content=PREFIJO_RESUMEN + resumen)] + ventana
+
+    def recortar(self, mensajes: list, session_id: str) -> list:
+        inicio = self._inicio_ventana(mensajes)
+        if inicio == 0:
+            return mensajes
+        fuera, ventana = mensajes[:inicio], mensajes[inicio:]
+
+        resumen, nuevos, huellas = self._pendientes(session_id, fuera)
+        if nuevos:  # La ventana se desplazó: plegamos solo lo nuevo
+            resumen = self._resumir(resumen, nuevos)
+            self._guardar(session_id, huellas, resumen)
+        return self._componer(resumen, ventana)
+
+    async def arecortar(self, mensajes: list, session_id: str) -> list:
+        if self._aresumir is None:
+            return self.recortar(mensajes, session_id)
+
+        inicio = self._inicio_ventana(mensajes)
+        if inicio == 0:
+            return mensajes
+        fuera, ventana = mensajes[:inicio], mensajes[inicio:]
+
+        resumen, nuevos, huellas = self._pendientes(session_id, fuera)
+        if nuevos:
+            resumen = await self._aresumir(resumen, nuevos)
+            self._guardar(session_id, huellas, resumen)
+        return self._componer(resumen, ventana)
+
+    def como_runnable(self, history_key: str = "chat_history") -> RunnableLambda:
+        """Etapa para anteponer al prompt: reemplaza `history_key` por la ventana recortada."""
+
+        def _session_id(config):
+            return (config or {}).get("configurable", {}).get("session_id", "")
+
+        def _recortar(entrada: dict, config) -> dict:
+            historial = self.recortar(entrada.get(history_key, []), _session_id(config))
+            return {**entrada, history_key: historial}
+
+        async def _arecortar(entrada: dict, config) -> dict:
+            historial = await self.arecortar(entrada.get(history_key, []), _session_id(config))
+            return {**entrada, history_key: historial}
+
+        return RunnableLambda(_recortar, afunc=_arecortar, name="VentanaHistorial")
@@ -0,0 +1,172 @@
+import os
+import shutil
+import threading
+import time
+
+# =============================================================================
+# VERSIONES DEL ÍNDICE (BLUE/GREEN CON PUNTERO ATÓMICO)
+# =============================================================================
+# La ingesta ya no escribe sobre la carpeta que la API tiene abierta. Cada
+# corrida arma una versión nueva en <carpeta>/versiones/<nombre> y, cuando está
+# completa, cambia el puntero <carpeta>/ACTUAL con os.replace (atómico).
+# La API vigila ese puntero y cambia su recuperador en segundo plano.
+#
+#   chroma_db_prod/
+#   ├── ACTUAL                  -> "20250301-120000"
+#   └── versiones/
+#       ├── 20250228-090000/    (chroma.sqlite3, bm25_index.npz, manifiesto...)
+#       └── 20250301-120000/
+#
+# Sin ACTUAL (carpeta de antes de este cambio) se usa la carpeta tal cual.
+
+ARCHIVO_PUNTERO = "ACTUAL"
+CARPETA_VERSIONES = "versiones"
+ARCHIVO_PUBLICADA = "PUBLICADA"  # Dentro de cada versión: cuándo se publicó (epoch)
+VERSIONES_A_CONSERVAR = 3  # La activa + las anteriores (peticiones en vuelo / rollback)
+# Una versión reemplazada puede seguir abierta en la API hasta que el vigilante
+# vea la siguiente (intervalo de recarga) y pase la gracia de cierre; se suma
+# holgura para la carga y el precalentamiento del índice nuevo.
+MARGEN_LIMPIEZA_SEG = (
+    float(os.getenv("MAURICIA_INTERVALO_RECARGA_SEG", "30"))
+    + float(os.getenv("MAURICIA_GRACIA_CIERRE_INDICE_SEG", "60"))
+    + 60
+)
+
+
+def version_activa(carpeta_base: str):
+    """Nombre de la versión publicada, o None si la carpeta usa el formato antiguo."""
+    try:
+        with open(os.path.join(carpeta_base, ARCHIVO_PUNTERO), "r", encoding="utf-8") as f:
+            nombre = f.read().strip()
+    except OSError:
+        return None
+    return nombre if nombre and os.path.isdir(ruta_version(carpeta_base, nombre)) else None
+
+
+def ruta_version(carpeta_base: str, nombre: str) -> str:
+    return os.path.join(carpeta_base, CARPETA_VERSIONES, nombre)
+
+
+def ruta_activa(carpeta_base: str) -> str:
+    """Carpeta que hay que abrir con Chroma (la versión publicada o la carpeta antigua)."""
+    nombre = version_activa(carpeta_base)
+    return ruta_version(carpeta_base, nombre) if nombre else carpeta_base
+
+
+def preparar_version(carpeta_base: str, copiar: bool = True):
+    """
+    Crea la carpeta de una versión nueva partiendo de una copia de la activa, así
+    la ingesta incremental sigue embebiendo solo lo que cambió (copiar=False para
+    una reconstrucción completa). Devuelve (nombre, ruta).
+    """
+    nombre = time.strftime("%Y%m%d-%H%M%S")
+    ruta = ruta_version(carpeta_base, nombre)
+    while os.path.exists(ruta):  # Dos corridas en el mismo segundo
+        nombre += "b"
+        ruta = ruta_version(carpeta_base, nombre)
+
+    origen = ruta_activa(carpeta_base)
+    if copiar and os.path.isdir(origen) and os.listdir(origen):
+        ignorar = shutil.ignore_patterns(
+            CARPETA_VERSIONES, ARCHIVO_PUNTERO, ARCHIVO_PUNTERO + ".tmp", ARCHIVO_PUBLICADA
+        )
+        shutil.copytree(origen, ruta, ignore=ignorar)
+    else:
+        os.makedirs(ruta)
+    return nombre, ruta
+
+
+def publicar_version(carpeta_base: str, nombre: str) -> None:
+    """Cambia el puntero a `nombre` de forma atómica (los lectores ven la vieja o la nueva)."""
+    puntero = os.path.join(carpeta_base, ARCHIVO_PUNTERO)
+    temporal = puntero + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(nombre)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, puntero)
+    with open(os.path.join(ruta_version(carpeta_base, nombre), ARCHIVO_PUBLICADA), "w", encoding="utf-8") as f:
+        f.write(str(time.time()))
+
+
+def _publicada_en(carpeta_base: str, nombre: str, activa):
+    """Epoch en que se publicó `nombre`, o None si nunca se publicó (o es de antes de este registro)."""
+    try:
+        with open(os.path.join(ruta_version(carpeta_base, nombre), ARCHIVO_PUBLICADA), "r", encoding="utf-8") as f:
+            return float(f.read().strip())
+    except (OSError, ValueError):
+        pass
+    if nombre == activa:  # Publicada antes de que existiera el registro: el puntero sabe cuándo
+        try:
+            return os.path.getmtime(os.path.join(carpeta_base, ARCHIVO_PUNTERO))
+        except OSError:
+            return None
+    return None
+
+
+def limpiar_versiones(carpeta_base: str, conservar: int = VERSIONES_A_CONSERVAR,
+                      margen_seg: float = MARGEN_LIMPIEZA_SEG, ahora: float = None) -> list:
+    """
+    Borra las versiones más antiguas; nunca la activa. Devuelve los nombres borrados.
+
+    La API puede ir atrasada varias publicaciones, así que una versión solo se borra
+    cuando la siguiente versión publicada lleva más de `margen_seg` activa: para
+    entonces el vigilante ya la reemplazó y la gracia de cierre terminó.
+    """
+    carpeta = os.path.join(carpeta_base, CARPETA_VERSIONES)
+    if not os.path.isdir(carpeta):
+        return []
+    ahora = time.time() if ahora is None else ahora
+    activa = version_activa(carpeta_base)
+    nombres = sorted(os.listdir(carpeta))  # El nombre es la fecha: orden alfabético = cronológico
+    publicadas = [(n, t) for n in nombres if (t := _publicada_en(carpeta_base, n, activa)) is not None]
+    borrados = []
+    for nombre in nombres[:max(len(nombres) - conservar, 0)]:
+        if nombre == activa:
+            continue
+        reemplazo = next((t for n, t in publicadas if n > nombre), None)
+        if reemplazo is None or ahora - reemplazo < margen_seg:
+            continue  # La API puede tenerla abierta todavía; se borra en una corrida posterior
+        shutil.rmtree(os.path.join(carpeta, nombre), ignore_errors=True)
+        borrados.append(nombre)
+    return borrados
+
+
+class VigilanteVersiones:
+    """
+    Hilo en segundo plano que revisa el puntero cada `intervalo` segundos y llama
+    a `al_cambiar(nombre, ruta)` cuando se publica una versión nueva.
+    """
+
+    def __init__(self, carpeta_base: str, al_cambiar, intervalo: float = 30.0, version_inicial=None):
+        self.carpeta_base = carpeta_base
+        self.al_cambiar = al_cambiar
+        self.intervalo = intervalo
+        self.version = version_inicial
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="vigilante-indice", daemon=True)
+
+    def iniciar(self) -> "VigilanteVersiones":
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._detener.set()
+
+    def revisar(self) -> bool:
+        """Una revisión del puntero. True si se cambió de versión."""
+        nombre = version_activa(self.carpeta_base)
+        if nombre is None or nombre == self.version:
+            return False
+        try:
+            self.al_cambiar(nombre, ruta_version(self.carpeta_base, nombre))
+        except Exception as e:
+            # Se queda con la versión actual y lo reintenta en la próxima vuelta
+            print(f"⚠️ [ÍNDICE] No se pudo cargar la versión {nombre}: {e}")
+            return False
+        self.version = nombre
+        return True
+
+    def _bucle(self) -> None:
+        while not self._detener.wait(self.intervalo):
+            self.revisar()
@@ -5,6 +5,11 @@ const sendBtn = document.getElementById("sendBtn");
 
 //const API_URL = "https://backend-mauricia.onrender.com/chat";
 const API_URL = "http://127.0.0.1:8000/chat";
+const STREAM_URL = `${API_URL}/stream`;
+
+// Cada pestaña tiene su propia conversación en el servidor
+const SESSION_ID = sessionStorage.getItem("mauricia_session_id") || crypto.randomUUID();
+sessionStorage.setItem("mauricia_session_id", SESSION_ID);
 
 inputField.addEventListener("keypress", (e) => {
     if (e.key === "Enter") sendMessage();
@@ -25,19 +30,16 @@ async function sendMessage() {
     scrollToBottom();
 
     try {
-        const response = await fetch(API_URL, {
+        const response = await fetch(STREAM_URL, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ mensaje: text }),
+            body: JSON.stringify({ mensaje: text, session_id: SESSION_ID }),
         });
 
-        if (!response.ok) throw new Error("Error en la respuesta del servidor");
-        
-        const data = await response.json();
-        loader.style.display = "none";
+        if (!response.ok || !response.body) throw new Error("Error en la respuesta del servidor");
 
-        // 3. Mostrar respuesta de MauricIA con efecto máquina de escribir
-        addMessage(data.respuesta, "bot", true);
+        // 3. Mostrar la respuesta de MauricIA token a token (Server-Sent Events)
+        await streamRespuesta(response);
 
     } catch (error) {
         loader.style.display = "none";
@@ -49,36 +51,80 @@ async function sendMessage() {
     }
 }
 
-function addMessage(text, sender, animate = false) {
-    const div = document.createElement("div");
-    div.className = `message ${sender}`;
-    messagesDiv.appendChild(div);
+async function streamRespuesta(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder("utf-8");
+    let buffer = "";
+    let texto = "";
+    let div = null;
+    let conectado = false; // Llegó al menos un byte: el servidor sí respondió
+
+    try {
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            conectado = true;
+            buffer += decoder.decode(value, { stream: true });
 
-    if (sender === "bot" && animate) {
-        typeWriter(div, text);
-    } else {
-        // Usar marked para parsear Markdown (negritas, listas, etc)
-        div.innerHTML = sender === "bot" ? marked.parse(text) : text;
+            // Cada evento SSE termina con una línea en blanco
+            let corte;
+            while ((corte = buffer.indexOf("\n\n")) !== -1) {
+                const evento = parseEvento(buffer.slice(0, corte));
+                buffer = buffer.slice(corte + 2);
+
+                if (evento.tipo === "error") throw new Error(evento.datos.detail);
+                if (evento.tipo === "fin" || evento.datos.token === undefined) continue;
+
+                // Al primer token cambiamos el loader por la burbuja de MauricIA
+                if (!div) {
+                    loader.style.display = "none";
+                    div = document.createElement("div");
+                    div.className = "message bot";
+                    messagesDiv.appendChild(div);
+                }
+                texto += evento.datos.token;
+                div.innerHTML = marked.parse(texto) + '<span class="cursor">▌</span>';
+                scrollToBottom();
+            }
+        }
+    } catch (error) {
+        // Antes del primer byte es un problema de conexión: lo informa sendMessage
+        if (!conectado) throw error;
+        loader.style.display = "none";
+        if (div) {
+            div.innerHTML = marked.parse(texto); // Lo que alcanzó a llegar, sin el cursor
+            addMessage("⚠️ La respuesta se interrumpió. Intenta preguntar de nuevo.", "bot");
+        } else {
+            addMessage("⚠️ Lo siento, tuve un problema procesando tu solicitud. ¿Podrías intentar de nuevo?", "bot");
+        }
+        return;
+    }
+
+    loader.style.display = "none";
+    if (div) {
+        div.innerHTML = marked.parse(texto); // Al terminar, renderiza Markdown completo
         scrollToBottom();
     }
 }
 
-function typeWriter(element, text) {
-    let i = 0;
-    const speed = 15; // Velocidad en ms
-    
-    function type() {
-        if (i < text.length) {
-            element.innerHTML = text.substring(0, i + 1) + '<span class="cursor">▌</span>';
-            i++;
-            scrollToBottom();
-            setTimeout(type, speed);
-        } else {
-            element.innerHTML = marked.parse(text); // Al terminar, renderiza Markdown completo
-            scrollToBottom();
-        }
+function parseEvento(bloque) {
+    let tipo = "message";
+    let datos = "";
+    for (const linea of bloque.split("\n")) {
+        if (linea.startsWith("event:")) tipo = linea.slice(6).trim();
+        else if (linea.startsWith("data:")) datos += linea.slice(5).trim();
     }
-    type();
+    return { tipo, datos: datos ? JSON.parse(datos) : {} };
+}
+
+function addMessage(text, sender) {
+    const div = document.createElement("div");
+    div.className = `message ${sender}`;
+    messagesDiv.appendChild(div);
+
+    // Usar marked para parsear Markdown (negritas, listas, etc)
+    div.innerHTML = sender === "bot" ? marked.parse(text) : text;
+    scrollToBottom();
 }
 
 function scrollToBottom() {